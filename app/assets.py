@@ -0,0 +1,120 @@
+# app/assets.py
+import base64
+import functools
+import gzip
+import hashlib
+import os
+import re
+from pathlib import Path
+from urllib.request import urlopen
+
+try:
+    import brotli
+except ImportError:  # без пакета Brotli создаются только .gz
+    brotli = None
+
+VENDOR_DIR = Path(__file__).resolve().parent / 'static' / 'vendor'
+
+# Сторонние файлы, которые раньше подключались с CDN: имя в static/vendor/, адрес и SRI-хеш (SHA-384) оригинала
+VENDOR_ASSETS = (
+    (
+        'bootstrap-4.5.2.min.css',
+        'https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css',
+        'sha384-JcKb8q3iqJ61gNV9KGb8thSsNjpSL0n8PARn9HuZOnIxN0hoP+VmmDGMN5t9UJ0Z',
+    ),
+    (
+        'jquery-3.5.1.slim.min.js',
+        'https://code.jquery.com/jquery-3.5.1.slim.min.js',
+        'sha384-DfXdz2htPH0lsSSs5nCTpuj/zy4C+OGpamoFVy38MVBnE+IbbVYUew+OrCXaRkfj',
+    ),
+    (
+        'popper-1.16.1.min.js',
+        'https://cdn.jsdelivr.net/npm/popper.js@1.16.1/dist/umd/popper.min.js',
+        'sha384-9/reFTGAW83EW2RDu2S0VKaIzap3H66lZH81PoYlFhbGU+6BZp6G7niu735Sk7lN',
+    ),
+    (
+        'bootstrap-4.5.2.min.js',
+        'https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/js/bootstrap.min.js',
+        'sha384-B4gt1jrGC7Jh4AgTPSdUtOBvfO8shuf57BaghqFfPlYxofvL8/KUEfYiJOMMV+rV',
+    ),
+)
+
+_VENDOR_SOURCES = {name: (url, expected) for name, url, expected in VENDOR_ASSETS}
+
+# Ссылки на карты исходников: самих карт в vendor/ нет, а collectstatic с манифестом требует их наличия
+_SOURCE_MAP_RE = re.compile(rb'\n?(?://|/\*)# sourceMappingURL=[^\n]*\s*$')
+
+# Что имеет смысл сжимать заранее: текстовые форматы больше COMPRESS_MIN_SIZE байт
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.svg', '.json', '.map', '.txt', '.html', '.xml', '.ico')
+COMPRESS_MIN_SIZE = 256
+
+
+def integrity(content):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(content).digest()).decode()
+
+
+def vendor_source(name):
+    """
+    Адрес стороннего файла и SRI-хеш для подключения. Пока файл не скачан в static/vendor/,
+    используется CDN с проверкой целостности; скачанный файл отдаётся как статика (без SRI:
+    из него удалена ссылка на карту исходников, и хеш отличается от оригинала).
+    """
+    from django.templatetags.static import static
+
+    url, expected = _VENDOR_SOURCES[name]
+    if _vendored(name):
+        return static(f'vendor/{name}'), None
+    return url, expected
+
+
+@functools.lru_cache(maxsize=None)
+def _vendored(name):
+    # Проверяется один раз на процесс, как и индекс статики в serving.py
+    # os.path, а не Path: имя из шаблона — SafeString, который pathlib не принимает
+    return os.path.exists(os.path.join(VENDOR_DIR, name))
+
+
+def missing_vendor_assets():
+    return [name for name, _, _ in VENDOR_ASSETS if not (VENDOR_DIR / name).exists()]
+
+
+def fetch_vendor_asset(name, url, expected, timeout=30):
+    """
+    Скачивает файл, проверяет SRI-хеш и сохраняет в static/vendor/ без ссылки на карту исходников.
+    """
+    with urlopen(url, timeout=timeout) as response:
+        content = response.read()
+    actual = integrity(content)
+    if actual != expected:
+        raise ValueError(f'{name}: хеш {actual} не совпадает с ожидаемым {expected}')
+    VENDOR_DIR.mkdir(parents=True, exist_ok=True)
+    (VENDOR_DIR / name).write_bytes(_SOURCE_MAP_RE.sub(b'\n', content))
+    _vendored.cache_clear()
+
+
+def compress_file(path):
+    """
+    Пишет рядом с файлом path сжатые копии path.gz и (если установлен Brotli) path.br.
+    Копия не сохраняется, если она не меньше оригинала. Возвращает список созданных файлов.
+    """
+    path = Path(path)
+    if path.suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    content = path.read_bytes()
+    if len(content) < COMPRESS_MIN_SIZE:
+        return []
+    variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    created = []
+    for extension, compress in variants:
+        target = path.with_name(path.name + extension)
+        compressed = compress(content)
+        if len(compressed) >= len(content):
+            continue
+        # Запись через временный файл, чтобы сервер не отдал недописанную копию
+        temporary = target.with_name(target.name + '.tmp')
+        temporary.write_bytes(compressed)
+        os.replace(temporary, target)
+        created.append(target)
+    return created
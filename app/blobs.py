@@ -0,0 +1,155 @@
+# app/blobs.py
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .images import IMAGE_FIELDS, VARIANTS_DIR
+from .models import MediaBlob
+from .storage import BLOBS_DIR, is_blob
+
+
+def referenced_field(model):
+    return IMAGE_FIELDS[model][0]
+
+
+def remember_reference(instance):
+    """
+    Запоминает имя файла, с которым запись создана или загружена из базы (вызывается из post_init),
+    чтобы при сохранении сравнить его без запроса. False — поле отложено, имя неизвестно.
+    """
+    value = instance.__dict__.get(referenced_field(type(instance)), False)
+    instance._loaded_media = value if value is False else getattr(value, 'name', value) or None
+
+
+def stored_reference(instance, update_fields=None):
+    """
+    Имя файла, на которое запись ссылается в базе до сохранения (вызывается из pre_save).
+    Возвращает False, если поле не сохраняется (отложено или не входит в update_fields).
+    """
+    field_name = referenced_field(type(instance))
+    if field_name in instance.get_deferred_fields() or (update_fields is not None and field_name not in update_fields):
+        return False
+    if instance._state.adding:
+        return None
+    loaded = getattr(instance, '_loaded_media', False)
+    if loaded is not False:
+        return loaded
+    # Поле было отложено при загрузке и прочитано позже
+    return type(instance).objects.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+
+
+def adjust_references(changes):
+    """
+    Применяет изменения счётчиков ссылок {имя: приращение}: один INSERT недостающих строк
+    и по одному UPDATE на файл. Освободившиеся файлы получают отметку released_at.
+    """
+    changes = {name: delta for name, delta in changes.items() if name and delta}
+    if not changes:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        MediaBlob.objects.bulk_create([MediaBlob(name=name) for name in sorted(changes)], ignore_conflicts=True)
+        for name in sorted(changes):
+            refcount = F('refcount') + changes[name]
+            MediaBlob.objects.filter(name=name).update(
+                refcount=refcount,
+                released_at=Case(When(refcount__lte=-changes[name], then=Value(now)), default=Value(None)),
+            )
+
+
+def reference_changed(old_name, new_name):
+    if old_name != new_name:
+        adjust_references(Counter({new_name: 1, old_name: -1}))
+
+
+def count_references():
+    """
+    Число ссылок на каждый файл по текущему содержимому таблиц (по запросу на модель).
+    """
+    counts = Counter()
+    for model in IMAGE_FIELDS:
+        field_name = referenced_field(model)
+        counts.update(
+            name for name in model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True).iterator()
+        )
+    return counts
+
+
+def rebuild_references():
+    """
+    Пересчитывает счётчики по таблицам (после массовых изменений в обход сигналов).
+    Возвращает число исправленных строк.
+    """
+    counts = count_references()
+    now = timezone.now()
+    with transaction.atomic():
+        existing = set(MediaBlob.objects.values_list('name', flat=True))
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name) for name in counts if name not in existing], ignore_conflicts=True
+        )
+        stale = []
+        for blob in MediaBlob.objects.select_for_update():
+            refcount = counts.get(blob.name, 0)
+            if blob.refcount != refcount:
+                blob.released_at = None if refcount > 0 else (blob.released_at or now)
+                blob.refcount = refcount
+                stale.append(blob)
+        MediaBlob.objects.bulk_update(stale, ['refcount', 'released_at'], batch_size=500)
+    return len(stale)
+
+
+def delete_file(name, storage=default_storage):
+    """
+    Удаляет файл вместе с его вариантами изображений (варианты лежат в подкаталоге variants/).
+    """
+    directory, filename = posixpath.split(name)
+    variants_dir = posixpath.join(directory, VARIANTS_DIR)
+    if storage.exists(variants_dir):
+        for variant in storage.listdir(variants_dir)[1]:
+            if variant.startswith(filename + '.'):
+                storage.delete(posixpath.join(variants_dir, variant))
+    storage.delete(name)
+
+
+def collect_garbage(grace=timedelta(hours=24), dry_run=False, storage=default_storage):
+    """
+    Удаляет файлы, на которые нет ссылок дольше grace, и файлы хранилища blobs/ без записи
+    в MediaBlob (например, сохранённые в откатившейся транзакции), изменённые раньше grace.
+    Возвращает список удалённых имён.
+    """
+    cutoff = timezone.now() - grace
+    removed = []
+    with transaction.atomic():
+        orphans = []
+        for name in (
+            MediaBlob.objects.select_for_update(skip_locked=True)
+            .filter(refcount__lte=0, released_at__lt=cutoff)
+            .values_list('name', flat=True)
+        ):
+            # Хранилище обновляет время изменения файла при повторной загрузке того же содержимого
+            if storage.exists(name) and storage.get_modified_time(name) >= cutoff:
+                continue
+            if not dry_run and storage.exists(name):
+                delete_file(name, storage)
+            orphans.append(name)
+        removed.extend(orphans)
+        if not dry_run:
+            MediaBlob.objects.filter(name__in=orphans, refcount__lte=0).delete()
+
+    if storage.exists(BLOBS_DIR):
+        known = set(MediaBlob.objects.filter(name__startswith=BLOBS_DIR + '/').values_list('name', flat=True))
+        for prefix in storage.listdir(BLOBS_DIR)[0]:
+            directory = posixpath.join(BLOBS_DIR, prefix)
+            for filename in storage.listdir(directory)[1]:
+                name = posixpath.join(directory, filename)
+                if is_blob(name) and name not in known and storage.get_modified_time(name) < cutoff:
+                    if not dry_run:
+                        delete_file(name, storage)
+                    removed.append(name)
+    return removed
@@ -0,0 +1,51 @@
+# app/bundles.py
+from django.db.models import Count, Prefetch
+from django.shortcuts import get_object_or_404
+
+from .models import Test, Question, Answer, TestResult
+
+# Колонки, которые нужны страницам, работающим с содержимым теста
+QUESTION_FIELDS = ('id', 'test_id', 'question_text', 'image', 'image_width', 'image_height', 'content_version')
+ANSWER_FIELDS = ('id', 'question_id', 'answer_text', 'is_correct', 'image', 'image_width', 'image_height')
+
+
+def answers_prefetch():
+    """
+    Prefetch ответов вопроса с минимальным набором колонок.
+    """
+    return Prefetch('answers', queryset=Answer.objects.only(*ANSWER_FIELDS).order_by('id'))
+
+
+def questions_prefetch(with_answers=True):
+    """
+    Prefetch вопросов теста (и, при необходимости, их ответов).
+    """
+    questions = Question.objects.only(*QUESTION_FIELDS).order_by('id')
+    if with_answers:
+        questions = questions.prefetch_related(answers_prefetch())
+    return Prefetch('questions', queryset=questions)
+
+
+def load_test_bundle(test_id, with_answers=True):
+    """
+    Загружает тест вместе с вопросами и ответами за фиксированное число запросов
+    (тест, вопросы, ответы) независимо от количества вопросов.
+    """
+    queryset = Test.objects.prefetch_related(questions_prefetch(with_answers))
+    return get_object_or_404(queryset, id=test_id)
+
+
+def load_question_bundle(question_id):
+    """
+    Загружает вопрос вместе с тестом и ответами за два запроса.
+    """
+    queryset = Question.objects.select_related('test').prefetch_related(answers_prefetch())
+    return get_object_or_404(queryset, id=question_id)
+
+
+def review_queryset():
+    """
+    Результаты тестов для страниц просмотра: тест и пользователь подгружаются JOIN-ом,
+    количество вопросов теста считается в том же запросе.
+    """
+    return TestResult.objects.select_related('test', 'user').annotate(question_count=Count('test__questions'))
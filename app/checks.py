@@ -0,0 +1,20 @@
+# app/checks.py
+from django.core.checks import Tags, Warning, register
+
+from .assets import missing_vendor_assets
+
+
+@register(Tags.staticfiles)
+def check_vendor_assets(app_configs, **kwargs):
+    """
+    Без файлов в static/vendor/ стили и скрипты подключаются с CDN (см. assets.vendor_source),
+    и страницы не работают без доступа в интернет.
+    """
+    missing = missing_vendor_assets()
+    if not missing:
+        return []
+    return [Warning(
+        'Нет сторонних файлов в app/static/vendor/: ' + ', '.join(missing),
+        hint='Выполните manage.py fetch_vendor_assets на машине с доступом в интернет и добавьте файлы в репозиторий.',
+        id='app.W001',
+    )]
@@ -0,0 +1,245 @@
+# app/exports.py
+import csv
+import datetime
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# Колонки выгрузки результатов: заголовок и поле для values_list (связанные таблицы — через JOIN)
+RESULT_EXPORT_COLUMNS = (
+    ('ID', 'id'),
+    ('Пользователь', 'user__full_name'),
+    ('Email', 'user__email'),
+    ('Тест', 'test__title'),
+    ('Дата прохождения', 'test_date'),
+    ('Балл', 'score_achieved'),
+    ('Проходной балл', 'test__passing_score'),
+    ('Статус', 'status'),
+    ('Попытка', 'attempt_number'),
+    ('Одобрен', 'approved'),
+)
+
+EXPORT_CHUNK_SIZE = 2000
+# Начало текста, с которого Excel и LibreOffice считают ячейку CSV формулой
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Ограничение Excel на число строк листа (включая заголовок)
+XLSX_MAX_ROWS = 1048576
+
+
+def export_rows(queryset, columns=RESULT_EXPORT_COLUMNS, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Строки выгрузки кортежами. Порядок по первичному ключу, чтение через .iterator()
+    (на PostgreSQL — серверный курсор), поэтому в памяти не больше одной пачки.
+    """
+    fields = [field for _, field in columns]
+    return queryset.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+class _Buffer:
+    """
+    Файлоподобный объект, из которого генератор забирает записанное после каждой пачки.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(part if isinstance(part, bytes) else part.encode('utf-8') for part in self.parts)
+        self.parts = []
+        return data
+
+
+def _csv_cell(value):
+    # Текст, похожий на формулу (ФИО, название теста), выводится как текст, а не вычисляется
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows, columns=RESULT_EXPORT_COLUMNS, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    CSV по пачкам строк. В начале BOM, чтобы Excel распознал UTF-8.
+    Строки, начинающиеся с =, +, -, @, экранируются апострофом.
+    """
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([header for header, _ in columns])
+    for index, row in enumerate(rows, start=1):
+        writer.writerow([_csv_cell(value) for value in row])
+        if index % chunk_size == 0:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+class _UnseekableBuffer(_Buffer):
+    """
+    Без tell()/seek() zipfile пишет архив последовательно (с дескрипторами данных),
+    поэтому XLSX можно отдавать по мере формирования.
+    """
+
+    def tell(self):
+        raise OSError('unseekable')
+
+    def seek(self, *args):
+        raise OSError('unseekable')
+
+
+_EXCEL_EPOCH = datetime.date(1899, 12, 30)
+# Управляющие символы, недопустимые в XML
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(reference, value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        # Стиль 1 — встроенный формат даты
+        return f'<c r="{reference}" s="1"><v>{(value - _EXCEL_EPOCH).days}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+def _xlsx_row(number, values, letters):
+    cells = ''.join(_xlsx_cell(f'{letter}{number}', value) for letter, value in zip(letters, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="2"><xf xfId="0"/><xf numFmtId="14" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+
+
+def _xlsx_package_parts(sheet_count):
+    sheets = ''.join(
+        f'<sheet name="Лист{number}" sheetId="{number}" r:id="rId{number}"/>' for number in range(1, sheet_count + 1)
+    )
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets>{sheets}</sheets></workbook>'
+    )
+    relationships = ''.join(
+        f'<Relationship Id="rId{number}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{number}.xml"/>'
+        for number in range(1, sheet_count + 1)
+    )
+    relationships += (
+        f'<Relationship Id="rId{sheet_count + 1}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    )
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for number in range(1, sheet_count + 1)
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        f'{overrides}</Types>'
+    )
+    return {
+        '[Content_Types].xml': content_types,
+        '_rels/.rels': _ROOT_RELS,
+        'xl/workbook.xml': workbook,
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relationships}</Relationships>'
+        ),
+        'xl/styles.xml': _STYLES,
+    }
+
+
+def stream_xlsx(rows, columns=RESULT_EXPORT_COLUMNS, chunk_size=EXPORT_CHUNK_SIZE, max_rows=XLSX_MAX_ROWS):
+    """
+    XLSX, который формируется и отдаётся по пачкам строк: листы пишутся в ZIP-поток
+    последовательно, а описание книги — в конце, когда известно число листов.
+    Строки сверх лимита Excel переносятся на следующий лист.
+    """
+    buffer = _UnseekableBuffer()
+    archive = zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED)
+    letters = [_column_letter(index) for index in range(len(columns))]
+    header = [title for title, _ in columns]
+    sheet_count = 0
+    sheet = None
+    number = max_rows
+
+    for index, row in enumerate(rows, start=1):
+        if number >= max_rows:
+            if sheet is not None:
+                sheet.write(_SHEET_END.encode())
+                sheet.close()
+            sheet_count += 1
+            sheet = archive.open(f'xl/worksheets/sheet{sheet_count}.xml', 'w', force_zip64=True)
+            sheet.write((_SHEET_START + _xlsx_row(1, header, letters)).encode())
+            number = 1
+        number += 1
+        sheet.write(_xlsx_row(number, row, letters).encode())
+        if index % chunk_size == 0:
+            yield buffer.drain()
+
+    if sheet is None:
+        sheet_count = 1
+        sheet = archive.open('xl/worksheets/sheet1.xml', 'w')
+        sheet.write((_SHEET_START + _xlsx_row(1, header, letters)).encode())
+    sheet.write(_SHEET_END.encode())
+    sheet.close()
+    for name, content in _xlsx_package_parts(sheet_count).items():
+        archive.writestr(name, content)
+    archive.close()
+    yield buffer.drain()
+
+
+# Форматы выгрузки: ?format= -> (генератор содержимого, Content-Type)
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -1,40 +1,53 @@
 # app/forms.py
 from django import forms
 from django.core.exceptions import ValidationError
-from django.db.models import Value
-from django.db.models.functions import Concat
 
+from .importers import IMPORT_KINDS
 from .models import AppUser, Employee, TestDeletionRequest, Test, Question, Answer
 
 
 class UserSelectionForm(forms.Form):
     """
     Форма выбора пользователя для входа (имитация логина).
+    Список вариантов подгружается на странице через user_autocomplete,
+    а при отправке проверяется только выбранное значение одним запросом по первичному ключу.
     """
-    user_or_employee = forms.ChoiceField(
+    user_or_employee = forms.CharField(
         label="Выберите пользователя или сотрудника",
-        choices=[],
-        widget=forms.Select(attrs={'class': 'form-control'})
+        widget=forms.Select(attrs={'class': 'form-control', 'size': 8})
     )
 
+    # Тип пользователя из значения '<тип>-<id>' -> (модель, подпись в списке)
+    USER_TYPES = {
+        'AppUser': (AppUser, 'Пользователь'),
+        'Employee': (Employee, 'Сотрудник'),
+    }
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Получаем пользователей и сотрудников с аннотированными лейблами
-        app_users = AppUser.objects.annotate(
-            label=Concat('full_name', Value(' (Пользователь)'))
-        ).values_list('id', 'label')
-
-        employees = Employee.objects.annotate(
-            label=Concat('full_name', Value(' (Сотрудник)'))
-        ).values_list('id', 'label')
-
-        # Формируем выборки с префиксом типа пользователя
-        app_user_choices = [(f"AppUser-{user_id}", label) for user_id, label in app_users]
-        employee_choices = [(f"Employee-{emp_id}", label) for emp_id, label in employees]
-
-        # Объединяем выборки
-        combined_choices = app_user_choices + employee_choices
-        self.fields['user_or_employee'].choices = combined_choices
+        self.user_type = None
+        self.principal = None
+
+    @classmethod
+    def choice_label(cls, user_type, full_name):
+        return f"{full_name} ({cls.USER_TYPES[user_type][1]})"
+
+    def clean_user_or_employee(self):
+        value = self.cleaned_data['user_or_employee']
+        user_type, _, user_id = value.partition('-')
+        if user_type not in self.USER_TYPES or not user_id.isdigit():
+            raise ValidationError("Некорректный выбор пользователя или сотрудника.")
+        model = self.USER_TYPES[user_type][0]
+        try:
+            self.principal = model.objects.get(id=int(user_id))
+        except model.DoesNotExist:
+            raise ValidationError("Выбранный пользователь не найден.")
+        self.user_type = user_type
+        # Оставляем выбранный вариант в списке при повторном показе формы
+        self.fields['user_or_employee'].widget.choices = [
+            (value, self.choice_label(user_type, self.principal.full_name))
+        ]
+        return value
 
 
 class AppUserForm(forms.ModelForm):
@@ -205,3 +218,19 @@ class AnswerForm(forms.ModelForm):
         if commit:
             answer.save()
         return answer
+
+
+class ImportForm(forms.Form):
+    """
+    Форма массового импорта пользователей, сотрудников и тестов из файла.
+    """
+    kind = forms.ChoiceField(
+        label="Что импортировать",
+        choices=list(IMPORT_KINDS.items()),
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    file = forms.FileField(label="Файл", widget=forms.ClearableFileInput(attrs={'class': 'form-control-file'}))
+    skip_invalid = forms.BooleanField(
+        label="Импортировать корректные строки, пропуская строки с ошибками (только CSV)", required=False
+    )
+    dry_run = forms.BooleanField(label="Только проверить файл, ничего не сохраняя", required=False)
@@ -0,0 +1,95 @@
+# app/fragments.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, prefetch_related_objects
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .bundles import answers_prefetch
+from .models import Question
+
+QUESTION_CARD_TEMPLATE = 'question_card.html'
+NAVBAR_TEMPLATE = 'navbar.html'
+NAVBAR_PROFILE_TEMPLATE = 'navbar_profile.html'
+NAVBAR_PROFILE_PLACEHOLDER = '<!-- navbar-profile -->'
+# Пункты меню, которые подсвечиваются на своей странице (остальные страницы дают одинаковое меню)
+NAVBAR_ACTIVE_URLS = ('index', 'user_list', 'employee_list', 'import_data', 'statistics')
+
+_template_versions = {}
+
+
+def fragment_cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def fragment_timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def template_version(template_name):
+    """
+    Короткий хеш исходника шаблона: после изменения шаблона старые фрагменты не используются.
+    """
+    version = _template_versions.get(template_name)
+    if version is None:
+        source = get_template(template_name).template.source
+        version = _template_versions[template_name] = hashlib.sha1(source.encode()).hexdigest()[:8]
+    return version
+
+
+def question_card_key(question, number):
+    return f'card:{template_version(QUESTION_CARD_TEMPLATE)}:{question.id}:{question.content_version}:{number}'
+
+
+def render_question_cards(questions):
+    """
+    HTML карточек вопросов теста. Готовые карточки берутся из кэша одним get_many по ключам
+    (id вопроса, версия содержимого вопроса, номер); ответы загружаются одним запросом
+    и шаблон рендерится только для отсутствующих карточек, которые сохраняются одним set_many.
+    """
+    cache = fragment_cache()
+    keys = {question_card_key(question, number): (question, number) for number, question in enumerate(questions, start=1)}
+    cards = cache.get_many(keys)
+    missing = [(key, question, number) for key, (question, number) in keys.items() if key not in cards]
+    if missing:
+        prefetch_related_objects([question for _, question, _ in missing], answers_prefetch())
+        template = get_template(QUESTION_CARD_TEMPLATE)
+        rendered = {
+            key: template.render({'question': question, 'number': number, 'first': number == 1})
+            for key, question, number in missing
+        }
+        cache.set_many(rendered, fragment_timeout())
+        cards.update(rendered)
+    return mark_safe(''.join(cards[key] for key in keys))
+
+
+def invalidate_questions(question_ids):
+    """
+    Увеличивает версию содержимого вопросов, чтобы их карточки отрисовались заново.
+    """
+    Question.objects.filter(pk__in=question_ids).update(content_version=F('content_version') + 1)
+
+
+def render_navbar(context):
+    """
+    Меню зависит от роли и подсвеченного пункта, поэтому рендерится один раз на такое
+    сочетание. Ссылка на профиль своя у каждого пользователя: она рендерится отдельно
+    (navbar_profile.html) и подставляется вместо метки в готовом меню.
+    """
+    request = context.get('request')
+    match = getattr(request, 'resolver_match', None)
+    url_name = match.url_name if match and match.url_name in NAVBAR_ACTIVE_URLS else ''
+    values = {name: context.get(name) for name in ('role', 'user_id', 'employee_id')}
+    key = f"navbar:{template_version(NAVBAR_TEMPLATE)}:{values['role']}:{url_name}"
+    cache = fragment_cache()
+    html = cache.get(key)
+    if html is None:
+        # Вместо request шаблону нужен только подсвеченный пункт
+        html = get_template(NAVBAR_TEMPLATE).render({
+            'role': values['role'], 'active': url_name, 'profile': mark_safe(NAVBAR_PROFILE_PLACEHOLDER),
+        })
+        cache.set(key, html, fragment_timeout())
+    profile = get_template(NAVBAR_PROFILE_TEMPLATE).render(values)
+    return mark_safe(html.replace(NAVBAR_PROFILE_PLACEHOLDER, profile, 1))
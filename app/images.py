@@ -0,0 +1,197 @@
+# app/images.py
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from PIL import Image, ImageOps
+
+from .models import Answer, Employee, Question
+
+# Форматы вариантов: формат Pillow -> (расширение файла, MIME-тип для <source>)
+VARIANT_FORMATS = {
+    'WEBP': ('webp', 'image/webp'),
+    'JPEG': ('jpg', 'image/jpeg'),
+}
+VARIANTS_DIR = 'variants'
+# Поля изображений, которые обрабатываются при загрузке: модель -> (поле, поле ширины, поле высоты)
+IMAGE_FIELDS = {
+    Question: ('image', 'image_width', 'image_height'),
+    Answer: ('image', 'image_width', 'image_height'),
+    Employee: ('photo', 'photo_width', 'photo_height'),
+}
+# Анимацию при пересжатии не сохранить, такие файлы хранятся как загружены
+SKIPPED_EXTENSIONS = ('.gif', '.svg')
+
+
+def is_processable(name):
+    return bool(name) and not name.lower().endswith(SKIPPED_EXTENSIONS)
+
+
+def variant_widths(width):
+    """
+    Ширины вариантов изображения шириной width: из IMAGE_VARIANT_WIDTHS, но не шире оригинала.
+    """
+    if not width:
+        return []
+    return sorted({min(variant, width) for variant in settings.IMAGE_VARIANT_WIDTHS})
+
+
+def variant_name(name, width, image_format):
+    """
+    Имя варианта выводится из имени оригинала, поэтому шаблону не нужно обращаться к хранилищу:
+    question_images/q1.jpg -> question_images/variants/q1.jpg.640w.webp
+    """
+    directory, filename = posixpath.split(name)
+    extension = VARIANT_FORMATS[image_format][0]
+    return posixpath.join(directory, VARIANTS_DIR, f'{filename}.{width}w.{extension}')
+
+
+def _save_options(image_format):
+    if image_format == 'JPEG':
+        return {'quality': settings.IMAGE_QUALITY, 'optimize': True, 'progressive': True}
+    if image_format == 'WEBP':
+        return {'quality': settings.IMAGE_QUALITY, 'method': 4}
+    if image_format == 'PNG':
+        return {'optimize': True}
+    return {}
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _flatten(image):
+    """
+    Изображение в режиме RGB; прозрачные области (для JPEG) заливаются белым.
+    """
+    if _has_alpha(image):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize(file):
+    """
+    Возвращает (содержимое, (ширина, высота)) изображения без метаданных (EXIF, XMP, GPS),
+    с применённым поворотом из EXIF и уменьшенного до IMAGE_MAX_SIZE по большей стороне.
+    Формат и цветовой профиль сохраняются.
+    """
+    file.seek(0)
+    with Image.open(file) as original:
+        image_format = original.format
+        image = ImageOps.exif_transpose(original)
+        icc_profile = original.info.get('icc_profile')
+    # Из info при сохранении берутся метаданные; оставляем только прозрачность палитры
+    image.info = {key: value for key, value in image.info.items() if key == 'transparency'}
+    image.thumbnail((settings.IMAGE_MAX_SIZE, settings.IMAGE_MAX_SIZE), Image.LANCZOS)
+    options = _save_options(image_format)
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    output = io.BytesIO()
+    image.save(output, format=image_format, **options)
+    return output.getvalue(), image.size
+
+
+def prepare_upload(instance, update_fields=None):
+    """
+    Вызывается перед сохранением модели: заменяет ещё не сохранённый загруженный файл
+    нормализованным и записывает его размеры. Возвращает True, если нужно создать варианты.
+    """
+    field_name, width_field, height_field = IMAGE_FIELDS[type(instance)]
+    if field_name in instance.get_deferred_fields() or (update_fields is not None and field_name not in update_fields):
+        return False
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        setattr(instance, width_field, None)
+        setattr(instance, height_field, None)
+        return False
+    if field_file._committed:
+        return False
+    if is_processable(field_file.name):
+        content, size = normalize(field_file.file)
+        field_file.file = ContentFile(content, name=field_file.name)
+    else:
+        size = get_image_dimensions(field_file.file)
+    setattr(instance, width_field, size[0])
+    setattr(instance, height_field, size[1])
+    return is_processable(field_file.name)
+
+
+def make_variants(name, storage):
+    """
+    Сохраняет варианты изображения name всех ширин в WebP и JPEG. Существующие варианты
+    с теми же именами перезаписываются; в хранилище по хешу (app/storage.py) файл с тем же
+    именем — это тот же файл, и если все варианты уже есть, они не пересоздаются.
+    """
+    content_addressed = getattr(storage, 'content_addressed', False)
+    with storage.open(name) as file, Image.open(file) as image:
+        # Image.open читает только заголовок, поэтому проверка существующих вариантов дешёвая
+        targets = {
+            (width, image_format): variant_name(name, width, image_format)
+            for width in variant_widths(image.width) for image_format in VARIANT_FORMATS
+        }
+        if content_addressed and all(storage.exists(target) for target in targets.values()):
+            return
+        image.load()
+    rgb = _flatten(image)
+    # WebP сохраняет прозрачность, для JPEG используется залитая белым копия
+    webp = image.convert('RGBA') if _has_alpha(image) else rgb
+    for width in variant_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        for image_format, base in (('WEBP', webp), ('JPEG', rgb)):
+            target = targets[width, image_format]
+            if storage.exists(target):
+                if content_addressed:
+                    continue
+                storage.delete(target)
+            source = base if width == image.width else base.resize((width, height), Image.LANCZOS)
+            output = io.BytesIO()
+            source.save(output, format=image_format, **_save_options(image_format))
+            storage.save(target, ContentFile(output.getvalue()))
+
+
+def delete_variants(name, width, storage):
+    for variant_width in variant_widths(width):
+        for image_format in VARIANT_FORMATS:
+            storage.delete(variant_name(name, variant_width, image_format))
+
+
+def dimensions(field_file):
+    """
+    Ширина и высота из полей модели без чтения файла; (None, None), если изображение не обработано.
+    """
+    fields = IMAGE_FIELDS.get(type(field_file.instance))
+    if fields is None:
+        return None, None
+    return getattr(field_file.instance, fields[1]), getattr(field_file.instance, fields[2])
+
+
+def process_stored(instance):
+    """
+    Обрабатывает уже сохранённое изображение (загруженное до появления обработки):
+    нормализует оригинал на месте, создаёт варианты и заполняет поля размеров
+    (сама запись в базу — на вызывающем). Возвращает False, если файла нет в хранилище.
+    """
+    field_name, width_field, height_field = IMAGE_FIELDS[type(instance)]
+    field_file = getattr(instance, field_name)
+    storage = field_file.storage
+    if not storage.exists(field_file.name):
+        return False
+    if is_processable(field_file.name):
+        with storage.open(field_file.name) as file:
+            content, size = normalize(file)
+        if not getattr(storage, 'content_addressed', False):
+            storage.delete(field_file.name)
+        # В хранилище по хешу обработанный файл получает новое имя, прежний удалит collect_media
+        field_file.name = storage.save(field_file.name, ContentFile(content))
+        make_variants(field_file.name, storage)
+    else:
+        with storage.open(field_file.name) as file:
+            size = get_image_dimensions(file)
+    setattr(instance, width_field, size[0])
+    setattr(instance, height_field, size[1])
+    return True
@@ -0,0 +1,323 @@
+# app/importers.py
+import base64
+import binascii
+import csv
+import io
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
+
+from . import blobs, images
+from .models import AppUser, Employee, Test, Question, Answer
+from .versioning import bump_list_version
+
+try:
+    import yaml
+except ImportError:  # YAML-банки тестов поддерживаются, только если установлен PyYAML
+    yaml = None
+
+# Колонки CSV для импорта людей (первая строка файла — заголовок с этими именами)
+PEOPLE_IMPORT_FIELDS = {
+    AppUser: ('full_name', 'email', 'age'),
+    Employee: ('full_name', 'email', 'age', 'role', 'years_of_experience', 'position', 'salary'),
+}
+
+IMPORT_BATCH_SIZE = 1000
+
+
+@dataclass
+class ImportReport:
+    """
+    Итог импорта: сколько записей создано и ошибки по строкам (номер строки или путь в файле, текст).
+    """
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def add_error(self, location, message):
+        self.errors.append((location, message))
+
+
+def _messages(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f'{name}: {" ".join(texts)}' for name, texts in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def validate_instance(instance, exclude=()):
+    """
+    Проверка полей и clean() модели без запросов к базе: уникальность проверяется
+    отдельно, одним запросом на пачку.
+    """
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as error:
+        # clean() ожидает уже преобразованные значения полей
+        return _messages(error)
+    try:
+        instance.clean()
+    except ValidationError as error:
+        return _messages(error)
+    return None
+
+
+def read_csv(fileobj):
+    """
+    Строки CSV словарями с номером строки файла. Разделитель (запятая или точка с запятой) определяется по началу файла.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(text, dialect=dialect)
+    for row in reader:
+        yield reader.line_num, row
+    text.detach()
+
+
+def import_people(model, fileobj, skip_invalid=False, dry_run=False):
+    """
+    Импорт пользователей или сотрудников из CSV.
+    Строки проверяются пачками: email проверяется на повтор внутри файла и одним запросом
+    на пачку — на совпадение с базой. Запись — bulk_create в одной транзакции.
+    Если есть ошибки и skip_invalid не задан, ничего не записывается.
+    """
+    fields = PEOPLE_IMPORT_FIELDS[model]
+    report = ImportReport()
+    valid = []
+    seen_emails = set()
+    batch = []
+
+    def check_batch():
+        existing = set(model.objects.filter(email__in=[item.email for _, item in batch]).values_list('email', flat=True))
+        for line, instance in batch:
+            if instance.email in existing:
+                report.add_error(line, f'email: {instance.email} уже зарегистрирован.')
+            else:
+                valid.append(instance)
+        batch.clear()
+
+    try:
+        rows = read_csv(fileobj)
+        for line, row in rows:
+            missing = [name for name in fields if name not in row]
+            if missing:
+                report.add_error(line, 'Нет колонок: ' + ', '.join(missing))
+                break
+            instance = model(**{name: (row[name] or '').strip() for name in fields})
+            error = validate_instance(instance, exclude=[f.name for f in model._meta.fields if f.name not in fields])
+            if error:
+                report.add_error(line, error)
+                continue
+            if instance.email in seen_emails:
+                report.add_error(line, f'email: {instance.email} повторяется в файле.')
+                continue
+            seen_emails.add(instance.email)
+            batch.append((line, instance))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                check_batch()
+        if batch:
+            check_batch()
+    except (UnicodeDecodeError, csv.Error) as error:
+        report.add_error(0, f'Не удалось прочитать CSV: {error}')
+        return report
+
+    if (report.errors and not skip_invalid) or dry_run:
+        return report
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(valid, batch_size=IMPORT_BATCH_SIZE)
+            # bulk_create не вызывает сигналы
+            bump_list_version(model)
+    except IntegrityError as error:
+        # Email заняли параллельно с импортом
+        report.add_error(0, f'Импорт отменён: {error}')
+        return report
+    report.created = len(valid)
+    return report
+
+
+def load_test_bank(fileobj, filename):
+    """
+    Читает банк тестов из JSON или YAML: один тест (объект) или список тестов.
+    """
+    data = fileobj.read()
+    if filename.lower().endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise ValueError('Для импорта YAML установите PyYAML.')
+        try:
+            bank = yaml.safe_load(data)
+        except yaml.YAMLError as error:
+            raise ValueError(error)
+    else:
+        bank = json.loads(data)
+    return bank if isinstance(bank, list) else [bank]
+
+
+def decode_image(value, location):
+    """
+    Изображение из {"name": ..., "data": base64} или строки data:image/...;base64,...
+    Проверяется так же, как загрузка через форму (Pillow).
+    """
+    if isinstance(value, dict):
+        name, data = value.get('name') or 'image', value.get('data') or ''
+    else:
+        header, _, data = str(value).partition(',')
+        name = 'image.' + header.split('/')[-1].split(';')[0] if header.startswith('data:image/') else 'image'
+    try:
+        content = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValidationError(f'{location}: изображение не в base64.')
+    return forms.ImageField().clean(SimpleUploadedFile(name, content))
+
+
+def _build_test(item, path, report):
+    """
+    Проверяет один тест банка и возвращает (тест, [(вопрос, [ответы])]) без записи в базу.
+    """
+    if not isinstance(item, dict):
+        report.add_error(path, 'Ожидается объект теста.')
+        return None
+    test = Test(
+        title=str(item.get('title', '')).strip(),
+        description=item.get('description') or None,
+        passing_score=item.get('passing_score'),
+        time_to_complete=item.get('time_to_complete'),
+    )
+    error = validate_instance(test, exclude=['id', 'content_version', 'updated_at'])
+    if error:
+        report.add_error(path, error)
+        return None
+
+    questions = []
+    for number, question_item in enumerate(item.get('questions') or [], start=1):
+        question_path = f'{path}, вопрос {number}'
+        if not isinstance(question_item, dict) or not str(question_item.get('text', '')).strip():
+            report.add_error(question_path, 'Нет текста вопроса.')
+            continue
+        question = Question(question_text=str(question_item['text']).strip())
+        answers = []
+        for answer_number, answer_item in enumerate(question_item.get('answers') or [], start=1):
+            answer_path = f'{question_path}, ответ {answer_number}'
+            if not isinstance(answer_item, dict) or not str(answer_item.get('text', '')).strip():
+                report.add_error(answer_path, 'Нет текста ответа.')
+                continue
+            answer = Answer(answer_text=str(answer_item['text']).strip(), is_correct=bool(answer_item.get('correct')))
+            answer.pending_image = _pending_image(answer_item, answer_path, report)
+            answers.append(answer)
+        if not answers:
+            report.add_error(question_path, 'У вопроса нет ответов.')
+        if sum(answer.is_correct for answer in answers) > 1:
+            report.add_error(question_path, 'У вопроса может быть только один правильный ответ.')
+        question.pending_image = _pending_image(question_item, question_path, report)
+        questions.append((question, answers))
+
+    if test.passing_score is not None and test.passing_score > len(questions):
+        report.add_error(path, 'Проходной балл больше числа вопросов.')
+    return test, questions
+
+
+def _pending_image(item, location, report):
+    if not item.get('image'):
+        return None
+    try:
+        return decode_image(item['image'], location)
+    except ValidationError as error:
+        report.add_error(location, ' '.join(error.messages))
+        return None
+
+
+def import_test_bank(fileobj, filename, dry_run=False):
+    """
+    Импорт тестов с вопросами, ответами и изображениями. Весь банк проверяется до записи;
+    при любой ошибке ничего не сохраняется. Каждый уровень (тесты, вопросы, ответы)
+    записывается одним bulk_create.
+    """
+    report = ImportReport()
+    try:
+        bank = load_test_bank(fileobj, filename)
+    except (ValueError, UnicodeDecodeError) as error:
+        report.add_error(0, f'Не удалось прочитать файл: {error}')
+        return report
+
+    built = [_build_test(item, f'тест {number}', report) for number, item in enumerate(bank, start=1)]
+    if report.errors or dry_run:
+        return report
+
+    stored = []
+    try:
+        with transaction.atomic():
+            tests = Test.objects.bulk_create([test for test, _ in built])
+            questions = []
+            answers = []
+            for test, test_questions in zip(tests, (items for _, items in built)):
+                for question, question_answers in test_questions:
+                    question.test = test
+                    _store_image(question, 'image', stored)
+                    questions.append(question)
+                    for answer in question_answers:
+                        answer.question = question
+                        answers.append(answer)
+            Question.objects.bulk_create(questions, batch_size=IMPORT_BATCH_SIZE)
+            for answer in answers:
+                _store_image(answer, 'image', stored)
+            Answer.objects.bulk_create(answers, batch_size=IMPORT_BATCH_SIZE)
+            # bulk_create не вызывает сигналы, ссылки на файлы учитываются здесь
+            blobs.adjust_references(Counter(field_file.name for field_file in stored))
+    except Exception:
+        # Файлы уже сохранённых изображений не нужны, если транзакция откатилась.
+        # В хранилище по хешу файл мог совпасть с уже используемым: его удалит collect_media
+        for field_file in stored:
+            if getattr(field_file.storage, 'content_addressed', False):
+                continue
+            images.delete_variants(field_file.name, images.dimensions(field_file)[0], field_file.storage)
+            field_file.delete(save=False)
+        raise
+    report.created = len(tests)
+    return report
+
+
+def _store_image(instance, field_name, stored):
+    """
+    Сохраняет файл изображения до bulk_create. Сигналы при bulk_create не вызываются,
+    поэтому обработка изображения (app/images.py) выполняется здесь.
+    """
+    image = instance.pending_image
+    if image is None:
+        return
+    setattr(instance, field_name, image)
+    make_variants = images.prepare_upload(instance)
+    field_file = getattr(instance, field_name)
+    field_file.save(field_file.name, field_file.file, save=False)
+    stored.append(field_file)
+    if make_variants:
+        images.make_variants(field_file.name, field_file.storage)
+
+
+# Виды импорта: ключ -> подпись в форме (какую функцию вызвать, решает run_import)
+IMPORT_KINDS = {
+    'users': 'Пользователи (CSV)',
+    'employees': 'Сотрудники (CSV)',
+    'tests': 'Тесты (JSON или YAML)',
+}
+
+
+def run_import(kind, fileobj, filename, skip_invalid=False, dry_run=False):
+    if kind == 'users':
+        return import_people(AppUser, fileobj, skip_invalid=skip_invalid, dry_run=dry_run)
+    if kind == 'employees':
+        return import_people(Employee, fileobj, skip_invalid=skip_invalid, dry_run=dry_run)
+    if kind == 'tests':
+        return import_test_bank(fileobj, filename, dry_run=dry_run)
+    raise ValueError(f'Неизвестный вид импорта: {kind}')
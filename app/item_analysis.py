@@ -0,0 +1,166 @@
+# app/item_analysis.py
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import TestResultResponse, TestStats
+from .scoring import get_answer_key
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для анализа вопросов
+    np = None
+
+# Пороговые значения для пометок в отчёте
+EASY_DIFFICULTY = 0.9
+HARD_DIFFICULTY = 0.2
+LOW_DISCRIMINATION = 0.2
+
+
+class ItemAnalysisUnavailable(Exception):
+    """
+    Анализ невозможен: не установлен numpy.
+    """
+
+
+@dataclass(frozen=True)
+class ItemStats:
+    """
+    Показатели одного вопроса: доля правильных ответов (difficulty),
+    точечно-бисериальная корреляция с баллом за остальные вопросы (discrimination)
+    и доля выбравших каждый вариант ответа.
+    """
+    question_id: int
+    difficulty: float
+    discrimination: float
+    selection_rates: dict
+
+    @property
+    def flags(self):
+        flags = []
+        if self.difficulty >= EASY_DIFFICULTY:
+            flags.append('слишком лёгкий')
+        elif self.difficulty <= HARD_DIFFICULTY:
+            flags.append('слишком трудный')
+        if self.discrimination is None or self.discrimination < LOW_DISCRIMINATION:
+            flags.append('плохо различает')
+        return flags
+
+
+@dataclass(frozen=True)
+class ItemAnalysis:
+    """
+    Анализ вопросов теста по полным наборам ответов (результатам, где есть ответ на каждый текущий вопрос).
+    """
+    test_id: int
+    respondents: int
+    alpha: float
+    items: tuple
+
+
+def load_response_matrix(test):
+    """
+    Загружает ответы по тесту одним запросом и возвращает (матрица правильности
+    «результат × вопрос» из 0/1, список списков выбранных ответов по строкам, ключ ответов).
+    Строки с ответами не на все текущие вопросы отбрасываются.
+    """
+    if np is None:
+        raise ItemAnalysisUnavailable('Для анализа вопросов установите numpy.')
+    answer_key = get_answer_key(test)
+    question_index = {question_id: index for index, question_id in enumerate(answer_key.question_ids)}
+    rows = list(
+        TestResultResponse.objects.filter(question__test_id=test.id)
+        .values_list('result_id', 'question_id', 'is_correct', 'answer_ids')
+        .order_by()
+    )
+    if not rows:
+        return np.zeros((0, len(question_index))), [], answer_key
+
+    result_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    columns = np.fromiter((question_index.get(row[1], -1) for row in rows), dtype=np.int64, count=len(rows))
+    correct = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    known = columns >= 0
+    results, row_index = np.unique(result_ids[known], return_inverse=True)
+
+    matrix = np.full((len(results), len(question_index)), np.nan)
+    matrix[row_index, columns[known]] = correct[known]
+    complete = ~np.isnan(matrix).any(axis=1)
+
+    selections = [[] for _ in range(len(results))]
+    for position, row in zip(np.flatnonzero(known), row_index):
+        selections[row].extend(rows[position][3])
+    selections = [selected for selected, keep in zip(selections, complete) if keep]
+    return matrix[complete], selections, answer_key
+
+
+def analyze_matrix(matrix, selections, answer_key):
+    """
+    Считает показатели по матрице 0/1 без циклов по ответам пользователей.
+    """
+    respondents, items = matrix.shape
+    if respondents == 0 or items == 0:
+        return ItemAnalysis(answer_key.test_id, respondents, None, ())
+
+    difficulty = matrix.mean(axis=0)
+    totals = matrix.sum(axis=1)
+    # Балл за остальные вопросы, чтобы вопрос не коррелировал сам с собой
+    rest = totals[:, None] - matrix
+    item_centered = matrix - difficulty
+    rest_centered = rest - rest.mean(axis=0)
+    denominator = np.sqrt((item_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        discrimination = np.where(denominator > 0, (item_centered * rest_centered).sum(axis=0) / denominator, np.nan)
+
+    alpha = None
+    if items > 1 and respondents > 1:
+        total_variance = totals.var(ddof=1)
+        if total_variance > 0:
+            alpha = float(items / (items - 1) * (1 - matrix.var(axis=0, ddof=1).sum() / total_variance))
+
+    # Доли выбора вариантов: позиция каждого выбранного ответа в отсортированном списке ответов теста
+    answer_ids = np.sort(np.fromiter(answer_key.answer_questions, dtype=np.int64))
+    chosen = np.fromiter((answer_id for selected in selections for answer_id in selected), dtype=np.int64)
+    positions = np.searchsorted(answer_ids, chosen)
+    valid = positions < len(answer_ids)
+    valid[valid] = answer_ids[positions[valid]] == chosen[valid]
+    counts = np.bincount(positions[valid], minlength=len(answer_ids))
+    rates = {}
+    for answer_id, rate in zip(answer_ids.tolist(), (counts / respondents).tolist()):
+        rates.setdefault(answer_key.answer_questions[answer_id], {})[answer_id] = rate
+
+    return ItemAnalysis(
+        test_id=answer_key.test_id,
+        respondents=respondents,
+        alpha=alpha,
+        items=tuple(
+            ItemStats(
+                question_id=question_id,
+                difficulty=float(difficulty[index]),
+                discrimination=None if np.isnan(discrimination[index]) else float(discrimination[index]),
+                selection_rates=rates.get(question_id, {}),
+            )
+            for index, question_id in enumerate(answer_key.question_ids)
+        ),
+    )
+
+
+def analyze_test(test):
+    return analyze_matrix(*load_response_matrix(test))
+
+
+def cached_analysis(test):
+    """
+    Анализ из кэша Django. Ключ включает версию содержимого теста и время последнего
+    изменения сводной статистики: оно меняется при каждом создании, изменении и удалении
+    результата, поэтому новый результат или правка вопросов дают новый отчёт
+    (число попыток не меняется, если один результат удалили, а другой добавили).
+    """
+    updated_at = TestStats.objects.filter(test_id=test.id).values_list('updated_at', flat=True).first()
+    stats_version = updated_at.timestamp() if updated_at else 0
+    key = f'item-analysis:{test.id}:{test.content_version}:{stats_version}'
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = analyze_test(test)
+        cache.set(key, analysis, getattr(settings, 'ITEM_ANALYSIS_CACHE_TIMEOUT', 3600))
+    return analysis
@@ -0,0 +1,32 @@
+# app/management/commands/analyze_items.py
+from django.core.management.base import BaseCommand, CommandError
+
+from app.item_analysis import ItemAnalysisUnavailable, analyze_test
+from app.models import Test
+
+
+class Command(BaseCommand):
+    help = 'Анализ вопросов тестов: трудность, различающая способность, выбор вариантов и α Кронбаха.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_ids', nargs='*', type=int, help='ID тестов (по умолчанию все тесты).')
+
+    def handle(self, *args, **options):
+        tests = Test.objects.order_by('id')
+        if options['test_ids']:
+            tests = tests.filter(id__in=options['test_ids'])
+        for test in tests:
+            try:
+                analysis = analyze_test(test)
+            except ItemAnalysisUnavailable as error:
+                raise CommandError(str(error))
+            alpha = '—' if analysis.alpha is None else f'{analysis.alpha:.2f}'
+            self.stdout.write(f'Тест #{test.id} «{test.title}»: результатов {analysis.respondents}, α = {alpha}')
+            for item in analysis.items:
+                discrimination = '—' if item.discrimination is None else f'{item.discrimination:.2f}'
+                rates = ', '.join(f'{answer_id}: {rate:.0%}' for answer_id, rate in item.selection_rates.items())
+                flags = f' [{", ".join(item.flags)}]' if item.flags else ''
+                self.stdout.write(
+                    f'  вопрос {item.question_id}: трудность {item.difficulty:.2f}, '
+                    f'различение {discrimination}, выбор ответов {{{rates}}}{flags}'
+                )
@@ -0,0 +1,73 @@
+# app/management/commands/benchmark_serializers.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.models import AppUser, Employee
+from app.serializers import UserSerializer, EmployeeSerializer, user_encoder, employee_encoder
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает DRF-сериализаторы списков API с ValuesEncoder: совпадение вывода и скорость.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Добавить N пользователей и сотрудников на время замера (изменения откатываются).')
+        parser.add_argument('--repeat', type=int, default=3, help='Число повторов, берётся лучшее время.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                self.compare('users', AppUser, UserSerializer, user_encoder, options['repeat'])
+                self.compare('employees', Employee, EmployeeSerializer, employee_encoder, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def compare(self, name, model, serializer_class, encoder, repeat):
+        queryset = model.objects.order_by('id')
+
+        def serialize():
+            return serializer_class(queryset.all(), many=True).data
+
+        def encode():
+            return [encoder.encode(row) for row in encoder.values_list(queryset.all())]
+
+        expected = [dict(item) for item in serialize()]
+        actual = encode()
+        if expected != actual:
+            mismatch = next(i for i, (a, b) in enumerate(zip(expected, actual)) if a != b) if actual else 0
+            raise CommandError(f'{name}: вывод отличается, первая запись с расхождением #{mismatch}')
+
+        serializer_time = min(self.timed(serialize) for _ in range(repeat))
+        encoder_time = min(self.timed(encode) for _ in range(repeat))
+        speedup = serializer_time / encoder_time if encoder_time else float('inf')
+        self.stdout.write(
+            f'{name}: {len(actual)} записей, сериализатор {serializer_time * 1000:.1f} мс, '
+            f'ValuesEncoder {encoder_time * 1000:.1f} мс, ускорение ×{speedup:.1f} (вывод совпадает)'
+        )
+
+    @staticmethod
+    def timed(func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    def seed(self, count):
+        AppUser.objects.bulk_create(
+            AppUser(full_name=f'Bench User {i}', email=f'bench-user-{i}@example.com', age=20 + i % 40)
+            for i in range(count)
+        )
+        Employee.objects.bulk_create(
+            Employee(full_name=f'Bench Employee {i}', email=f'bench-employee-{i}@example.com', age=30,
+                     years_of_experience=i % 10, position='Bench', salary=f'{1000 + i}.{i % 100:02d}',
+                     photo=f'employee_photos/bench-{i}.jpg' if i % 2 else None)
+            for i in range(count)
+        )
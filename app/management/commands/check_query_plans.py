@@ -0,0 +1,143 @@
+# app/management/commands/check_query_plans.py
+import datetime
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from app.models import AppUser, Employee, Test, TestResult, TestDeletionRequest
+from app.search import search_employees, search_results, search_tests, search_users
+
+# Полный просмотр таблицы: «Seq Scan» в PostgreSQL, «SCAN <таблица>» без индекса в SQLite
+_SEQUENTIAL_SCAN_RE = re.compile(r'Seq Scan|\bSCAN (?:TABLE )?"?\w+"?\s*$', re.MULTILINE)
+
+
+class Rollback(Exception):
+    pass
+
+
+def hot_queries(user_id):
+    """
+    Запросы списков и очередей в том виде, в каком их выполняют представления,
+    и индексы, которыми они должны обслуживаться.
+    """
+    return [
+        ('user_list', ('user_full_name_idx',),
+         AppUser.objects.order_by('full_name', 'id')[:10]),
+        ('employee_list', ('employee_full_name_idx',),
+         Employee.objects.order_by('full_name', 'id')[:10]),
+        ('test_list', ('test_title_idx',),
+         Test.objects.order_by('title', 'id')[:10]),
+        ('test_results', ('testresult_user_approved_idx',),
+         TestResult.objects.filter(user_id=user_id, approved=True).order_by('-test_date', '-id')[:10]),
+        ('admin_test_results', ('testresult_date_idx',),
+         TestResult.objects.order_by('-test_date', '-id')[:10]),
+        ('pending_test_results', ('testresult_pending_idx',),
+         TestResult.objects.filter(approved=False).order_by('id')[:10]),
+        ('test_deletion_requests', ('deletionrequest_pending_idx',),
+         TestDeletionRequest.objects.filter(approved__isnull=True).order_by('requested_at', 'id')[:10]),
+    ]
+
+
+def search_queries(query='seed'):
+    """
+    Поиск по спискам (app/search.py). Триграммные GIN-индексы есть только в PostgreSQL,
+    на остальных СУБД поиск — полный просмотр, и список пуст.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    return [
+        ('user_search', ('user_full_name_trgm', 'user_email_trgm'),
+         search_users(AppUser.objects.all(), query)),
+        ('employee_search', ('employee_full_name_trgm', 'employee_email_trgm'),
+         search_employees(Employee.objects.all(), query)),
+        ('test_search', ('test_title_trgm', 'test_description_trgm'),
+         search_tests(Test.objects.all(), query)),
+        ('result_search', ('test_title_trgm', 'user_full_name_trgm'),
+         search_results(TestResult.objects.all(), query)),
+    ]
+
+
+def disable_sequential_scans():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # На небольших таблицах планировщик предпочитает seq scan — запрещаем его,
+            # чтобы проверить, что индекс вообще применим к форме запроса
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('ANALYZE')
+
+
+def plan_problems(plan, index_names):
+    """
+    Что не так с планом запроса: полный просмотр таблицы и ожидаемые, но не использованные индексы.
+    """
+    problems = []
+    if _SEQUENTIAL_SCAN_RE.search(plan):
+        problems.append('полный просмотр таблицы')
+    problems.extend(f'не используется {index_name}' for index_name in index_names if index_name not in plan)
+    return problems
+
+
+class Command(BaseCommand):
+    help = 'Проверяет через EXPLAIN, что запросы списков, поиска и очередей используют индексы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Заполнить таблицы N тестовыми строками на время проверки (изменения откатываются).')
+        parser.add_argument('--verbose-plans', action='store_true', help='Печатать планы запросов целиком.')
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                user_id = AppUser.objects.values_list('id', flat=True).first() or 0
+                failures = self.check_plans(user_id, options['verbose_plans'])
+                raise Rollback
+        except Rollback:
+            pass
+        if failures:
+            raise CommandError('Запросы без индекса: ' + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Все запросы используют индексы.'))
+
+    def check_plans(self, user_id, verbose):
+        failures = []
+        disable_sequential_scans()
+        for name, index_names, queryset in hot_queries(user_id) + search_queries():
+            plan = queryset.explain()
+            problems = plan_problems(plan, index_names)
+            status = self.style.ERROR('; '.join(problems)) if problems else self.style.SUCCESS('OK')
+            self.stdout.write(f'{name}: {status} ({", ".join(index_names)})')
+            if verbose or problems:
+                self.stdout.write(plan)
+            if problems:
+                failures.append(name)
+        return failures
+
+    @staticmethod
+    def seed(count):
+        today = datetime.date.today()
+        users = AppUser.objects.bulk_create(
+            AppUser(full_name=f'Seed User {i}', email=f'seed-user-{i}@example.com', age=20 + i % 40)
+            for i in range(count)
+        )
+        employees = Employee.objects.bulk_create(
+            Employee(full_name=f'Seed Employee {i}', email=f'seed-employee-{i}@example.com', age=30,
+                     years_of_experience=5, position='Seed', salary=1000, is_fired=i % 10 == 0)
+            for i in range(count)
+        )
+        tests = Test.objects.bulk_create(
+            Test(title=f'Seed Test {i}', passing_score=1, time_to_complete=10) for i in range(max(count // 100, 1))
+        )
+        TestResult.objects.bulk_create(
+            TestResult(user=users[i % len(users)], test=tests[i % len(tests)],
+                       test_date=today - datetime.timedelta(days=i % 365), score_achieved=0,
+                       status='failed', attempt_number=i + 1, approved=i % 20 != 0)
+            for i in range(count)
+        )
+        TestDeletionRequest.objects.bulk_create(
+            TestDeletionRequest(test=tests[i % len(tests)], requested_by=employees[i % len(employees)],
+                                approved=None if i % 20 == 0 else True)
+            for i in range(count)
+        )
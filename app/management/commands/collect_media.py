@@ -0,0 +1,28 @@
+# app/management/commands/collect_media.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.blobs import collect_garbage, rebuild_references
+
+
+class Command(BaseCommand):
+    help = 'Удаляет медиафайлы, на которые не ссылается ни одно изображение, вместе с их вариантами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24),
+            help='Сколько часов файл без ссылок хранится до удаления',
+        )
+        parser.add_argument('--rebuild', action='store_true', help='Сначала пересчитать счётчики ссылок по таблицам')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write(f'Исправлено счётчиков ссылок: {rebuild_references()}')
+        removed = collect_garbage(grace=timedelta(hours=options['grace_hours']), dry_run=options['dry_run'])
+        for name in removed:
+            self.stdout.write(f'  {name}')
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'{verb} файлов: {len(removed)}')
@@ -0,0 +1,31 @@
+# app/management/commands/fetch_vendor_assets.py
+from django.core.management.base import BaseCommand, CommandError
+
+from app.assets import VENDOR_ASSETS, VENDOR_DIR, fetch_vendor_asset, missing_vendor_assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Скачивает сторонние CSS/JS (Bootstrap, jQuery, Popper) в app/static/vendor/ с проверкой SRI-хеша. '
+        'Запускается на машине с доступом в интернет; скачанные файлы хранятся в репозитории.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Скачать заново уже имеющиеся файлы')
+        parser.add_argument('--check', action='store_true', help='Только проверить, что все файлы на месте')
+
+    def handle(self, *args, **options):
+        missing = missing_vendor_assets()
+        if options['check']:
+            if missing:
+                raise CommandError('Нет файлов: ' + ', '.join(missing))
+            self.stdout.write('Все файлы на месте.')
+            return
+        for name, url, expected in VENDOR_ASSETS:
+            if name not in missing and not options['force']:
+                continue
+            try:
+                fetch_vendor_asset(name, url, expected)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'{name}: {error}')
+            self.stdout.write(f'{VENDOR_DIR / name}')
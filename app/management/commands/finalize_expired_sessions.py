@@ -0,0 +1,20 @@
+# app/management/commands/finalize_expired_sessions.py
+from django.core.management.base import BaseCommand
+
+from app.timed_sessions import finalize_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Завершает просроченные сессии прохождения тестов с автосохранёнными ответами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Размер пачки сессий.')
+
+    def handle(self, *args, **options):
+        finalized = 0
+        while True:
+            count = finalize_expired_sessions(options['batch_size'])
+            finalized += count
+            if count < options['batch_size']:
+                break
+        self.stdout.write(f'Завершено сессий: {finalized}')
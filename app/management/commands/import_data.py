@@ -0,0 +1,31 @@
+# app/management/commands/import_data.py
+from django.core.management.base import BaseCommand, CommandError
+
+from app.importers import IMPORT_KINDS, run_import
+
+
+class Command(BaseCommand):
+    help = 'Массовый импорт: пользователи и сотрудники из CSV, тесты с вопросами и ответами из JSON/YAML.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(IMPORT_KINDS), help='Что импортировать.')
+        parser.add_argument('path', help='Путь к файлу.')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Импортировать корректные строки CSV, пропуская строки с ошибками.')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = run_import(
+                    options['kind'], fileobj, options['path'],
+                    skip_invalid=options['skip_invalid'], dry_run=options['dry_run'],
+                )
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть файл: {error}')
+
+        for location, message in report.errors:
+            self.stderr.write(f'{location}: {message}')
+        self.stdout.write(f'Создано записей: {report.created}, ошибок: {len(report.errors)}')
+        if report.errors and not report.created:
+            raise CommandError('Импорт не выполнен.')
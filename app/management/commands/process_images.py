@@ -0,0 +1,75 @@
+# app/management/commands/process_images.py
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from app import fragments
+from app.blobs import adjust_references
+from app.images import IMAGE_FIELDS, process_stored
+from app.models import Answer, Employee, Question
+from app.versioning import bump_list_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Обрабатывает изображения, загруженные до появления обработки: убирает метаданные, '
+        'поворачивает по EXIF, создаёт варианты для srcset и записывает размеры.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Обработать заново и уже обработанные изображения')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, (field_name, width_field, height_field) in IMAGE_FIELDS.items():
+            queryset = model.objects.exclude(Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}))
+            if not options['all']:
+                queryset = queryset.filter(**{f'{width_field}__isnull': True})
+            processed, missing = 0, []
+            batch, references = [], Counter()
+
+            def flush():
+                # bulk_update не вызывает сигналы и не трогает updated_at, поэтому счётчики ссылок
+                # на файлы (имя меняется в хранилище по хешу) и версии для ETag обновляются здесь
+                fields = [field_name, width_field, height_field]
+                with transaction.atomic():
+                    if model is Employee:
+                        # Путь к фото отдаётся API, ETag записи и списка должен смениться
+                        now = timezone.now()
+                        for item in batch:
+                            item.updated_at = now
+                        model.objects.bulk_update(batch, fields + ['updated_at'])
+                        bump_list_version(model)
+                    else:
+                        model.objects.bulk_update(batch, fields)
+                    adjust_references(references)
+                    # Размеры изображения попадают в разметку карточек вопросов
+                    if model is Question:
+                        fragments.invalidate_questions([item.pk for item in batch])
+                    elif model is Answer:
+                        fragments.invalidate_questions({item.question_id for item in batch})
+                batch.clear()
+                references.clear()
+
+            columns = ('pk', 'question_id', field_name) if model is Answer else ('pk', field_name)
+            for instance in queryset.only(*columns).order_by('pk').iterator(chunk_size=batch_size):
+                old_name = getattr(instance, field_name).name
+                if not process_stored(instance):
+                    missing.append(old_name)
+                    continue
+                new_name = getattr(instance, field_name).name
+                if new_name != old_name:
+                    references.update({new_name: 1, old_name: -1})
+                batch.append(instance)
+                processed += 1
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+            self.stdout.write(f'{model._meta.verbose_name_plural}: обработано {processed}')
+            for name in missing:
+                self.stderr.write(f'  нет файла: {name}')
@@ -0,0 +1,71 @@
+# app/management/commands/process_submissions.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app.submissions import process_batch, supports_parallel_workers
+
+logger = logging.getLogger('app.submissions')
+
+
+class Command(BaseCommand):
+    help = 'Проверяет отправки тестов из очереди TestSubmission и сохраняет результаты пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Число потоков-обработчиков.')
+        parser.add_argument('--batch-size', type=int, default=200, help='Размер пачки отправок.')
+        parser.add_argument('--once', action='store_true', help='Разобрать очередь и завершиться.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза (в секундах) при пустой очереди в постоянном режиме.')
+        parser.add_argument('--max-backoff', type=float, default=60.0,
+                            help='Наибольшая пауза (в секундах) после ошибки обработки пачки.')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        if workers > 1 and not supports_parallel_workers():
+            self.stderr.write('СУБД не поддерживает SKIP LOCKED, используется один обработчик.')
+            workers = 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.work, options['batch_size'], options['once'], options['interval'],
+                                options['max_backoff'])
+                for _ in range(workers)
+            ]
+            processed = sum(future.result() for future in futures)
+        self.stdout.write(f'Обработано отправок: {processed}')
+
+    @staticmethod
+    def work(batch_size, once, interval, max_backoff):
+        """
+        Цикл одного обработчика. Ошибка пачки (например, потеря соединения с базой) записывается
+        в лог, и после паузы, растущей с каждой ошибкой подряд, обработка продолжается.
+        В режиме --once ошибка завершает команду.
+        """
+        processed = 0
+        backoff = 1.0
+        try:
+            while True:
+                try:
+                    count = process_batch(batch_size)
+                except Exception:
+                    if once:
+                        raise
+                    logger.exception('Ошибка обработки пачки отправок, повтор через %.1f с', backoff)
+                    # Соединение после ошибки могло стать непригодным, следующая пачка откроет новое
+                    connection.close_if_unusable_or_obsolete()
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, max_backoff)
+                    continue
+                backoff = 1.0
+                processed += count
+                if count:
+                    continue
+                if once:
+                    return processed
+                time.sleep(interval)
+        finally:
+            # У каждого потока своё соединение с базой
+            connection.close()
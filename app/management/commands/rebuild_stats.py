@@ -0,0 +1,18 @@
+# app/management/commands/rebuild_stats.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import TestResult, UserStats
+from app.stats import rebuild_test_stats, refresh_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает сводную статистику тестов и пользователей по таблице результатов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tests = rebuild_test_stats()
+            user_ids = set(TestResult.objects.values_list('user_id', flat=True).distinct())
+            user_ids |= set(UserStats.objects.values_list('user_id', flat=True))
+            refresh_user_stats(user_ids)
+        self.stdout.write(f'Пересчитана статистика: тестов {tests}, пользователей {len(user_ids)}')
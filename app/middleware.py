@@ -0,0 +1,154 @@
+# app/middleware.py
+import copy
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+
+from . import template_timing
+
+from .models import AppUser, Employee
+
+# Модели, которые могут быть текущим пользователем, по значению session['user_type']
+PRINCIPAL_MODELS = {
+    'AppUser': AppUser,
+    'Employee': Employee,
+}
+
+
+class IdentityCache:
+    """
+    Процессный кэш разрешённых пользователей с коротким TTL, ключ — ключ сессии.
+    Записи сбрасываются сигналами при изменении или удалении пользователя.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._sessions_by_principal = {}
+
+    def get(self, session_key, user_type, user_id):
+        with self._lock:
+            entry = self._entries.get(session_key)
+            if entry is None:
+                return None
+            cached_type, cached_id, principal, expires_at = entry
+            if cached_type != user_type or cached_id != user_id or expires_at <= time.monotonic():
+                self._discard(session_key)
+                return None
+        # Отдаём копию, чтобы изменения во вьюхе не попадали в общий кэш
+        return copy.copy(principal)
+
+    def set(self, session_key, user_type, user_id, principal, ttl):
+        with self._lock:
+            self._discard(session_key)
+            self._entries[session_key] = (user_type, user_id, copy.copy(principal), time.monotonic() + ttl)
+            self._sessions_by_principal.setdefault((user_type, user_id), set()).add(session_key)
+
+    def invalidate(self, user_type, user_id):
+        with self._lock:
+            for session_key in self._sessions_by_principal.pop((user_type, user_id), ()):
+                self._entries.pop(session_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sessions_by_principal.clear()
+
+    def _discard(self, session_key):
+        entry = self._entries.pop(session_key, None)
+        if entry is not None:
+            sessions = self._sessions_by_principal.get((entry[0], entry[1]))
+            if sessions is not None:
+                sessions.discard(session_key)
+                if not sessions:
+                    del self._sessions_by_principal[(entry[0], entry[1])]
+
+
+identity_cache = IdentityCache()
+
+
+def resolve_current_user(request):
+    """
+    Определяет пользователя по данным сессии. Возвращает (пользователь, роль) или (None, None).
+    """
+    user_id = request.session.get('user_id')
+    user_type = request.session.get('user_type')
+    if not user_id or not user_type:
+        return None, None
+    model = PRINCIPAL_MODELS.get(user_type, Employee)
+    role_name = request.session.get('user_role', None)
+
+    ttl = getattr(settings, 'CURRENT_USER_CACHE_TTL', 0)
+    session_key = request.session.session_key
+    if ttl and session_key:
+        principal = identity_cache.get(session_key, user_type, user_id)
+        if principal is not None:
+            return principal, role_name
+
+    try:
+        principal = model.objects.get(id=user_id)
+    except model.DoesNotExist:
+        return None, None
+
+    if ttl and session_key:
+        identity_cache.set(session_key, user_type, user_id, principal, ttl)
+    return principal, role_name
+
+
+class CurrentUserMiddleware:
+    """
+    Сохраняет в request.current_identity пару (пользователь, роль), которая определяется
+    при первом обращении (get_current_user) и затем переиспользуется. Запросы, которым
+    пользователь не нужен (API, статические страницы), не обращаются ни к базе, ни к кэшу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.current_identity = SimpleLazyObject(lambda: resolve_current_user(request))
+        return self.get_response(request)
+
+
+class TemplateTimingMiddleware:
+    """
+    Замеряет отрисовку шаблонов за запрос (включается настройкой TEMPLATE_TIMING).
+    Время и число отрисовок каждого шаблона, включая подключаемые через include,
+    пишутся в лог app.template_timing и в заголовок Server-Timing (виден в DevTools).
+    """
+    logger = logging.getLogger('app.template_timing')
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'TEMPLATE_TIMING', False):
+            raise MiddlewareNotUsed
+        template_timing.install()
+        self.get_response = get_response
+        self.limit = getattr(settings, 'TEMPLATE_TIMING_LIMIT', 10)
+
+    def __call__(self, request):
+        with template_timing.collect() as collector:
+            response = self.get_response(request)
+        if collector.templates:
+            slowest = collector.slowest(self.limit)
+            response['Server-Timing'] = self.server_timing(collector.elapsed, slowest)
+            self.logger.info(
+                '%s %s: шаблоны %.1f мс (%s)', request.method, request.path, collector.elapsed * 1000,
+                ', '.join(
+                    f'{name} x{timing.count} {timing.own * 1000:.1f}/{timing.total * 1000:.1f} мс'
+                    for name, timing in slowest
+                ),
+            )
+        return response
+
+    @staticmethod
+    def server_timing(elapsed, slowest):
+        # dur — собственное время шаблона без вложенных, в desc — имя и число отрисовок
+        metrics = [f'tpl;dur={elapsed * 1000:.2f};desc="templates"']
+        for index, (name, timing) in enumerate(slowest, start=1):
+            description = name.replace('\\', '/').replace('"', "'")
+            metrics.append(f'tpl{index};dur={timing.own * 1000:.2f};desc="{description} x{timing.count}"')
+        return ', '.join(metrics)
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:49
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def renumber_duplicate_attempts(apps, schema_editor):
+    """
+    Перенумеровывает попытки в группах (пользователь, тест), где номера повторяются,
+    чтобы можно было добавить уникальное ограничение.
+    """
+    TestResult = apps.get_model('app', 'TestResult')
+    duplicated = (
+        TestResult.objects.values('user_id', 'test_id', 'attempt_number')
+        .annotate(rows=Count('id')).filter(rows__gt=1)
+        .values_list('user_id', 'test_id').distinct()
+    )
+    for user_id, test_id in set(duplicated):
+        results = list(TestResult.objects.filter(user_id=user_id, test_id=test_id).order_by('attempt_number', 'id'))
+        for number, result in enumerate(results, start=1):
+            result.attempt_number = number
+        TestResult.objects.bulk_update(results, ['attempt_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_test_content_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='testresult',
+            constraint=models.UniqueConstraint(fields=('user', 'test', 'attempt_number'), name='testresult_unique_attempt'),
+        ),
+    ]
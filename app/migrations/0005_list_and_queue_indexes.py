@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_testresult_unique_attempt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(fields=['full_name', 'id'], name='user_full_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['full_name', 'id'], name='employee_full_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(fields=['title', 'id'], name='test_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testdeletionrequest',
+            index=models.Index(condition=models.Q(('approved__isnull', True)), fields=['requested_at', 'id'], name='deletionrequest_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['-test_date', '-id'], name='testresult_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['user', '-test_date', '-id'], name='testresult_user_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['id'], name='testresult_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Триграммные GIN-индексы для поиска по подстроке (только PostgreSQL)
+
+from django.db import migrations
+
+# (имя индекса, таблица, колонка)
+TRIGRAM_INDEXES = [
+    ('user_full_name_trgm', 'User', 'Full Name'),
+    ('user_email_trgm', 'User', 'Email'),
+    ('employee_full_name_trgm', 'Employee', 'Full Name'),
+    ('employee_email_trgm', 'Employee', 'Email'),
+    ('test_title_trgm', 'Test', 'Title'),
+    ('test_description_trgm', 'Test', 'Description'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        # Индекс строится по UPPER(col), потому что icontains на PostgreSQL — это UPPER(col) LIKE UPPER(...)
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_list_and_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
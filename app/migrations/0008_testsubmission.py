@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestSubmission',
+            fields=[
+                ('id', models.BigAutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('answers', models.JSONField(db_column='Answers', default=list)),
+                ('submitted_at', models.DateTimeField(auto_now_add=True, db_column='Submitted At')),
+                ('processed_at', models.DateTimeField(blank=True, db_column='Processed At', null=True)),
+                ('error', models.TextField(blank=True, db_column='Error', null=True)),
+                ('result', models.OneToOneField(blank=True, db_column='Result ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submission', to='app.testresult')),
+                ('test', models.ForeignKey(db_column='Test ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='app.test')),
+                ('user', models.ForeignKey(db_column='User ID', on_delete=django.db.models.deletion.CASCADE, related_name='test_submissions', to='app.appuser')),
+            ],
+            options={
+                'verbose_name': 'Отправка теста',
+                'verbose_name_plural': 'Отправки тестов',
+                'db_table': 'TestSubmission',
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='testsubmission_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_testsubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestSession',
+            fields=[
+                ('id', models.BigAutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField(db_column='Started At', default=django.utils.timezone.now)),
+                ('deadline', models.DateTimeField(db_column='Deadline')),
+                ('answers', models.JSONField(db_column='Answers', default=list)),
+                ('saved_at', models.DateTimeField(blank=True, db_column='Saved At', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, db_column='Finished At', null=True)),
+                ('result', models.OneToOneField(blank=True, db_column='Result ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='session', to='app.testresult')),
+                ('test', models.ForeignKey(db_column='Test ID', on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='app.test')),
+                ('user', models.ForeignKey(db_column='User ID', on_delete=django.db.models.deletion.CASCADE, related_name='test_sessions', to='app.appuser')),
+            ],
+            options={
+                'verbose_name': 'Сессия прохождения теста',
+                'verbose_name_plural': 'Сессии прохождения тестов',
+                'db_table': 'TestSession',
+                'indexes': [models.Index(condition=models.Q(('finished_at__isnull', True)), fields=['deadline'], name='testsession_deadline_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='testsession',
+            constraint=models.UniqueConstraint(condition=models.Q(('finished_at__isnull', True)), fields=('user', 'test'), name='testsession_open_unique'),
+        ),
+    ]
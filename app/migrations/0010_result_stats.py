@@ -0,0 +1,84 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:02
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    """
+    Заполняет сводную статистику по уже накопленным результатам.
+    """
+    TestResult = apps.get_model('app', 'TestResult')
+    TestStats = apps.get_model('app', 'TestStats')
+    UserStats = apps.get_model('app', 'UserStats')
+
+    results = TestResult.objects.filter(test__isnull=False)
+    histograms = {}
+    for row in results.values('test_id', 'score_achieved').annotate(count=Count('id')).order_by():
+        histograms.setdefault(row['test_id'], {})[str(row['score_achieved'])] = row['count']
+    TestStats.objects.bulk_create([
+        TestStats(histogram=histograms[row['test_id']], **row)
+        for row in results.values('test_id').annotate(
+            attempts=Count('id'),
+            passed=Count('id', filter=Q(status='passed')),
+            approved=Count('id', filter=Q(approved=True)),
+            score_sum=Sum('score_achieved'),
+        ).order_by()
+    ], batch_size=1000)
+
+    UserStats.objects.bulk_create([
+        UserStats(**row)
+        for row in TestResult.objects.values('user_id').annotate(
+            attempts=Count('id'),
+            tests_taken=Count('test', distinct=True),
+            tests_passed=Count('test', filter=Q(status='passed'), distinct=True),
+            best_score=Max('score_achieved'),
+            last_attempt=Max('test_date'),
+        ).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_testsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestStats',
+            fields=[
+                ('test', models.OneToOneField(db_column='Test ID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='app.test')),
+                ('attempts', models.PositiveIntegerField(db_column='Attempts', default=0)),
+                ('passed', models.PositiveIntegerField(db_column='Passed', default=0)),
+                ('approved', models.PositiveIntegerField(db_column='Approved', default=0)),
+                ('score_sum', models.PositiveBigIntegerField(db_column='Score Sum', default=0)),
+                ('histogram', models.JSONField(db_column='Histogram', default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Статистика теста',
+                'verbose_name_plural': 'Статистика тестов',
+                'db_table': 'TestStats',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(db_column='User ID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='app.appuser')),
+                ('attempts', models.PositiveIntegerField(db_column='Attempts', default=0)),
+                ('tests_taken', models.PositiveIntegerField(db_column='Tests Taken', default=0)),
+                ('tests_passed', models.PositiveIntegerField(db_column='Tests Passed', default=0)),
+                ('best_score', models.PositiveIntegerField(blank=True, db_column='Best Score', null=True)),
+                ('last_attempt', models.DateField(blank=True, db_column='Last Attempt', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+                'db_table': 'UserStats',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_result_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestResultResponse',
+            fields=[
+                ('id', models.BigAutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('is_correct', models.BooleanField(db_column='Is Correct')),
+                ('answer_ids', models.JSONField(db_column='Answer IDs', default=list)),
+                ('question', models.ForeignKey(db_column='Question ID', on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='app.question')),
+                ('result', models.ForeignKey(db_column='Result ID', on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='app.testresult')),
+            ],
+            options={
+                'verbose_name': 'Ответ на вопрос',
+                'verbose_name_plural': 'Ответы на вопросы',
+                'db_table': 'TestResultResponse',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='testresultresponse',
+            constraint=models.UniqueConstraint(fields=('result', 'question'), name='testresultresponse_unique_question'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_testresultresponse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, db_column='Image Height', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, db_column='Image Width', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='photo_height',
+            field=models.PositiveIntegerField(blank=True, db_column='Photo Height', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='photo_width',
+            field=models.PositiveIntegerField(blank=True, db_column='Photo Width', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, db_column='Image Height', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, db_column='Image Width', editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:15
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """
+    Заполняет счётчики ссылок по уже загруженным изображениям.
+    """
+    MediaBlob = apps.get_model('app', 'MediaBlob')
+    counts = Counter()
+    for model_name, field_name in (('Question', 'image'), ('Answer', 'image'), ('Employee', 'photo')):
+        model = apps.get_model('app', model_name)
+        counts.update(
+            model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True)
+        )
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, refcount=refcount) for name, refcount in counts.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(db_column='Name', max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.IntegerField(db_column='Reference Count', default=0)),
+                ('released_at', models.DateTimeField(blank=True, db_column='Released At', null=True)),
+            ],
+            options={
+                'verbose_name': 'Медиафайл',
+                'verbose_name_plural': 'Медиафайлы',
+                'db_table': 'MediaBlob',
+                'indexes': [models.Index(condition=models.Q(('refcount__lte', 0)), fields=['released_at'], name='mediablob_orphan_idx')],
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
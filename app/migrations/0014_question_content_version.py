@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_version',
+            field=models.PositiveIntegerField(db_column='Content Version', default=1, editable=False),
+        ),
+    ]
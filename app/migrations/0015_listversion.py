@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:32
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_versions(apps, schema_editor):
+    """
+    Начальные версии списков, отдаваемых API с ETag.
+    """
+    ListVersion = apps.get_model('app', 'ListVersion')
+    now = timezone.now()
+    ListVersion.objects.bulk_create(
+        [ListVersion(resource=resource, updated_at=now) for resource in ('app.AppUser', 'app.Employee')]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_question_content_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListVersion',
+            fields=[
+                ('resource', models.CharField(db_column='Resource', max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(db_column='Version', default=1)),
+                ('updated_at', models.DateTimeField(db_column='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Версия списка',
+                'verbose_name_plural': 'Версии списков',
+                'db_table': 'ListVersion',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_listversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testsubmission',
+            name='session',
+            field=models.OneToOneField(blank=True, db_column='Session ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submission', to='app.testsession'),
+        ),
+    ]
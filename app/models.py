@@ -1,6 +1,12 @@
 # app/models.py
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
+from django.db.models import Q, Subquery
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 # Общие константы для выбора ролей
 ROLE_CHOICES = [
@@ -25,11 +31,16 @@ class AppUser(models.Model):
     full_name = models.CharField(max_length=255, db_column='Full Name')
     email = models.EmailField(max_length=254, unique=True, db_column='Email')
     age = models.PositiveIntegerField(db_column='Age')
+    updated_at = models.DateTimeField(auto_now=True, db_column='Updated At')
 
     class Meta:
         db_table = 'User'
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(fields=['full_name', 'id'], name='user_full_name_idx'),
+            models.Index(fields=['updated_at'], name='user_updated_at_idx'),
+        ]
 
     def clean(self):
         super().clean()
@@ -53,12 +64,20 @@ class Employee(models.Model):
     position = models.CharField(max_length=255, db_column='Position')
     salary = models.DecimalField(max_digits=10, decimal_places=2, db_column='Salary')
     photo = models.ImageField(null=True, blank=True, upload_to='employee_photos/', db_column='Photo')
+    # Размеры обработанного изображения (app/images.py); не width_field, чтобы не читать файл при загрузке модели
+    photo_width = models.PositiveIntegerField(null=True, blank=True, editable=False, db_column='Photo Width')
+    photo_height = models.PositiveIntegerField(null=True, blank=True, editable=False, db_column='Photo Height')
     is_fired = models.BooleanField(default=False, db_column='Is Fired')
+    updated_at = models.DateTimeField(auto_now=True, db_column='Updated At')
 
     class Meta:
         db_table = 'Employee'
         verbose_name = 'Сотрудник'
         verbose_name_plural = 'Сотрудники'
+        indexes = [
+            models.Index(fields=['full_name', 'id'], name='employee_full_name_idx'),
+            models.Index(fields=['updated_at'], name='employee_updated_at_idx'),
+        ]
 
     def clean(self):
         super().clean()
@@ -76,7 +95,20 @@ class Employee(models.Model):
         return f"{self.full_name} ({self.position})"
 
 
-class Test(models.Model):
+class ContentVersionMixin:
+    """
+    content_version увеличивается только запросом UPDATE ... F() + 1 (см. signals.py).
+    Обычное сохранение существующей записи его не записывает: иначе версия, загруженная
+    до чужого увеличения, вернула бы счётчик назад, и в кэше нашлись бы устаревшие данные.
+    Остальное поведение save() не меняется: если записи уже нет, она вставляется заново.
+    """
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        values = [value for value in values if value[0].attname != 'content_version']
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+
+class Test(ContentVersionMixin, models.Model):
     """
     Модель теста.
     """
@@ -85,11 +117,18 @@ class Test(models.Model):
     passing_score = models.PositiveIntegerField(db_column='Passing Score')
     description = models.TextField(null=True, blank=True, db_column='Description')
     time_to_complete = models.PositiveIntegerField(db_column='Time to Complete')
+    # Увеличивается при любом изменении вопросов и ответов теста (см. signals.py)
+    content_version = models.PositiveIntegerField(default=1, editable=False, db_column='Content Version')
+    updated_at = models.DateTimeField(auto_now=True, db_column='Updated At')
 
     class Meta:
         db_table = 'Test'
         verbose_name = 'Тест'
         verbose_name_plural = 'Тесты'
+        indexes = [
+            models.Index(fields=['title', 'id'], name='test_title_idx'),
+            models.Index(fields=['updated_at'], name='test_updated_at_idx'),
+        ]
 
     def clean(self):
         super().clean()
@@ -105,7 +144,7 @@ class Test(models.Model):
         return self.title
 
 
-class Question(models.Model):
+class Question(ContentVersionMixin, models.Model):
     """
     Модель вопроса к тесту.
     """
@@ -113,6 +152,10 @@ class Question(models.Model):
     test = models.ForeignKey('Test', on_delete=models.CASCADE, db_column='Test ID', related_name='questions')
     question_text = models.TextField(db_column='Question Text')
     image = models.ImageField(null=True, blank=True, upload_to='question_images/', db_column='Image for the Question')
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False, db_column='Image Width')
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False, db_column='Image Height')
+    # Увеличивается при изменении вопроса и его ответов; ключ кэша карточки вопроса (см. fragments.py)
+    content_version = models.PositiveIntegerField(default=1, editable=False, db_column='Content Version')
 
     class Meta:
         db_table = 'Question'
@@ -131,6 +174,8 @@ class Answer(models.Model):
     answer_text = models.TextField(db_column='Answer Text')
     is_correct = models.BooleanField(db_column='Correct Answer', default=False)
     image = models.ImageField(null=True, blank=True, upload_to='answer_images/', db_column='Image for the Answer')
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False, db_column='Image Width')
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False, db_column='Image Height')
 
     class Meta:
         db_table = 'Answer'
@@ -143,6 +188,39 @@ class Answer(models.Model):
         return f"{prefix} {self.answer_text}"
 
 
+class TestResultManager(models.Manager):
+    """
+    Менеджер результатов тестов с атомарной выдачей номеров попыток.
+    """
+    attempt_retries = 5
+
+    def next_attempt_expression(self, user, test):
+        """
+        Выражение «последняя попытка пользователя по тесту + 1», вычисляемое внутри INSERT.
+        Благодаря индексу (user, test, attempt_number) это поиск по индексу, а не COUNT.
+        """
+        last_attempt = self.filter(user=user, test=test).order_by('-attempt_number').values('attempt_number')[:1]
+        return Coalesce(Subquery(last_attempt), 0) + 1
+
+    def create_attempt(self, user, test, **fields):
+        """
+        Создаёт результат с очередным номером попытки одним INSERT.
+        Одновременные отправки разводятся уникальным ограничением и повтором вставки.
+        """
+        for retry in range(self.attempt_retries):
+            try:
+                with transaction.atomic():
+                    result = self.create(
+                        user=user, test=test, attempt_number=self.next_attempt_expression(user, test), **fields
+                    )
+            except IntegrityError:
+                if retry == self.attempt_retries - 1:
+                    raise
+                continue
+            result.refresh_from_db(fields=['attempt_number'])
+            return result
+
+
 class TestResult(models.Model):
     """
     Модель результата прохождения теста пользователем.
@@ -157,10 +235,23 @@ class TestResult(models.Model):
     attempt_number = models.PositiveIntegerField(db_column='Attempt Number')
     approved = models.BooleanField(null=True, db_column='Approved')
 
+    objects = TestResultManager()
+
     class Meta:
         db_table = 'TestResult'
         verbose_name = 'Результат Теста'
         verbose_name_plural = 'Результаты Тестов'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'test', 'attempt_number'], name='testresult_unique_attempt'),
+        ]
+        indexes = [
+            # «Все результаты»: сортировка по дате
+            models.Index(fields=['-test_date', '-id'], name='testresult_date_idx'),
+            # «Мои результаты»: только одобренные результаты пользователя по дате
+            models.Index(fields=['user', '-test_date', '-id'], condition=Q(approved=True), name='testresult_user_approved_idx'),
+            # Очередь результатов, ожидающих одобрения
+            models.Index(fields=['id'], condition=Q(approved=False), name='testresult_pending_idx'),
+        ]
 
     def clean(self):
         super().clean()
@@ -175,11 +266,228 @@ class TestResult(models.Model):
         if errors:
             raise ValidationError(errors)
 
+    # Поля, изменение которых учитывается в статистике (см. stats.py)
+    STATS_FIELDS = ('user_id', 'test_id', 'score_achieved', 'status', 'approved')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения на момент загрузки, чтобы при сохранении знать, что изменилось
+        instance._loaded_stats = {field: getattr(instance, field) for field in cls.STATS_FIELDS if field in field_names}
+        return instance
+
     def __str__(self):
         test_title = self.test.title if self.test else "Тест удален"
         return f"Результат: {test_title} для {self.user.full_name}, статус: {self.status}"
 
 
+class TestResultResponse(models.Model):
+    """
+    Ответ пользователя на один вопрос в результате теста: выбранные ответы
+    и правильность на момент проверки (для анализа вопросов, см. item_analysis.py).
+    """
+    id = models.BigAutoField(primary_key=True, db_column='ID')
+    result = models.ForeignKey('TestResult', on_delete=models.CASCADE, db_column='Result ID', related_name='responses')
+    question = models.ForeignKey('Question', on_delete=models.CASCADE, db_column='Question ID', related_name='responses')
+    is_correct = models.BooleanField(db_column='Is Correct')
+    # Отсортированный список id выбранных ответов
+    answer_ids = models.JSONField(default=list, db_column='Answer IDs')
+
+    class Meta:
+        db_table = 'TestResultResponse'
+        verbose_name = 'Ответ на вопрос'
+        verbose_name_plural = 'Ответы на вопросы'
+        constraints = [
+            models.UniqueConstraint(fields=['result', 'question'], name='testresultresponse_unique_question'),
+        ]
+
+    def __str__(self):
+        return f"Ответ на вопрос {self.question_id} в результате {self.result_id}"
+
+
+class TestSubmission(models.Model):
+    """
+    Необработанная отправка теста из очереди проверки.
+    Исходные данные не изменяются, обработчик только отмечает результат проверки.
+    """
+    id = models.BigAutoField(primary_key=True, db_column='ID')
+    user = models.ForeignKey('AppUser', on_delete=models.CASCADE, db_column='User ID', related_name='test_submissions')
+    test = models.ForeignKey('Test', on_delete=models.SET_NULL, null=True, db_column='Test ID', related_name='submissions')
+    answers = models.JSONField(default=list, db_column='Answers')
+    submitted_at = models.DateTimeField(auto_now_add=True, db_column='Submitted At')
+    processed_at = models.DateTimeField(null=True, blank=True, db_column='Processed At')
+    result = models.OneToOneField('TestResult', on_delete=models.SET_NULL, null=True, blank=True, db_column='Result ID', related_name='submission')
+    # Сессия прохождения, завершённая этой отправкой: обработчик записывает в неё результат
+    session = models.OneToOneField('TestSession', on_delete=models.SET_NULL, null=True, blank=True, db_column='Session ID', related_name='submission')
+    error = models.TextField(null=True, blank=True, db_column='Error')
+
+    class Meta:
+        db_table = 'TestSubmission'
+        verbose_name = 'Отправка теста'
+        verbose_name_plural = 'Отправки тестов'
+        indexes = [
+            # Очередь необработанных отправок
+            models.Index(fields=['id'], condition=Q(processed_at__isnull=True), name='testsubmission_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Отправка #{self.id} от {self.user_id}"
+
+
+class TestSession(models.Model):
+    """
+    Сессия прохождения теста: срок сдачи и автосохранённые ответы пользователя.
+    """
+    id = models.BigAutoField(primary_key=True, db_column='ID')
+    user = models.ForeignKey('AppUser', on_delete=models.CASCADE, db_column='User ID', related_name='test_sessions')
+    test = models.ForeignKey('Test', on_delete=models.CASCADE, db_column='Test ID', related_name='sessions')
+    started_at = models.DateTimeField(default=timezone.now, db_column='Started At')
+    deadline = models.DateTimeField(db_column='Deadline')
+    # Отсортированный список id выбранных ответов
+    answers = models.JSONField(default=list, db_column='Answers')
+    saved_at = models.DateTimeField(null=True, blank=True, db_column='Saved At')
+    finished_at = models.DateTimeField(null=True, blank=True, db_column='Finished At')
+    result = models.OneToOneField('TestResult', on_delete=models.SET_NULL, null=True, blank=True, db_column='Result ID', related_name='session')
+
+    class Meta:
+        db_table = 'TestSession'
+        verbose_name = 'Сессия прохождения теста'
+        verbose_name_plural = 'Сессии прохождения тестов'
+        constraints = [
+            # Не больше одной незавершённой сессии пользователя по тесту
+            models.UniqueConstraint(fields=['user', 'test'], condition=Q(finished_at__isnull=True),
+                                    name='testsession_open_unique'),
+        ]
+        indexes = [
+            # Поиск просроченных сессий
+            models.Index(fields=['deadline'], condition=Q(finished_at__isnull=True), name='testsession_deadline_idx'),
+        ]
+
+    def __str__(self):
+        return f"Сессия #{self.id}: {self.user_id} / {self.test_id}"
+
+    def is_expired(self, now=None, grace=None):
+        if grace is None:
+            grace = getattr(settings, 'TEST_SESSION_GRACE_SECONDS', 30)
+        return (now or timezone.now()) > self.deadline + timedelta(seconds=grace)
+
+    def remaining_seconds(self, now=None):
+        return max(int((self.deadline - (now or timezone.now())).total_seconds()), 0)
+
+
+class TestStats(models.Model):
+    """
+    Сводная статистика по тесту, обновляемая при изменении результатов (см. stats.py).
+    """
+    test = models.OneToOneField('Test', on_delete=models.CASCADE, primary_key=True, db_column='Test ID', related_name='stats')
+    attempts = models.PositiveIntegerField(default=0, db_column='Attempts')
+    passed = models.PositiveIntegerField(default=0, db_column='Passed')
+    approved = models.PositiveIntegerField(default=0, db_column='Approved')
+    score_sum = models.PositiveBigIntegerField(default=0, db_column='Score Sum')
+    # Количество попыток по каждому баллу: {"балл": количество}
+    histogram = models.JSONField(default=dict, db_column='Histogram')
+    updated_at = models.DateTimeField(auto_now=True, db_column='Updated At')
+
+    class Meta:
+        db_table = 'TestStats'
+        verbose_name = 'Статистика теста'
+        verbose_name_plural = 'Статистика тестов'
+
+    def __str__(self):
+        return f"Статистика теста {self.test_id}"
+
+    @property
+    def pass_rate(self):
+        return self.passed / self.attempts if self.attempts else None
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.attempts if self.attempts else None
+
+    @property
+    def median_score(self):
+        """
+        Медиана по гистограмме: проход по различным баллам, а не по попыткам.
+        """
+        if not self.attempts:
+            return None
+        buckets = sorted((int(score), count) for score, count in self.histogram.items() if count)
+        middle = self.attempts / 2
+        seen = 0
+        for index, (score, count) in enumerate(buckets):
+            seen += count
+            if seen > middle:
+                return score
+            if seen == middle:
+                # Чётное число попыток и граница между корзинами
+                return (score + buckets[index + 1][0]) / 2
+        return buckets[-1][0]
+
+    def histogram_rows(self):
+        return [(int(score), count) for score, count in sorted(self.histogram.items(), key=lambda item: int(item[0])) if count]
+
+
+class UserStats(models.Model):
+    """
+    Сводная статистика по пользователю, обновляемая при изменении его результатов (см. stats.py).
+    """
+    user = models.OneToOneField('AppUser', on_delete=models.CASCADE, primary_key=True, db_column='User ID', related_name='stats')
+    attempts = models.PositiveIntegerField(default=0, db_column='Attempts')
+    tests_taken = models.PositiveIntegerField(default=0, db_column='Tests Taken')
+    tests_passed = models.PositiveIntegerField(default=0, db_column='Tests Passed')
+    best_score = models.PositiveIntegerField(null=True, blank=True, db_column='Best Score')
+    last_attempt = models.DateField(null=True, blank=True, db_column='Last Attempt')
+    updated_at = models.DateTimeField(auto_now=True, db_column='Updated At')
+
+    class Meta:
+        db_table = 'UserStats'
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f"Статистика пользователя {self.user_id}"
+
+
+class MediaBlob(models.Model):
+    """
+    Число ссылок на медиафайл из полей изображений (см. blobs.py). Файлы без ссылок
+    удаляет manage.py collect_media через некоторое время после освобождения.
+    """
+    name = models.CharField(max_length=255, primary_key=True, db_column='Name')
+    refcount = models.IntegerField(default=0, db_column='Reference Count')
+    # Когда пропала последняя ссылка (для задержки перед удалением файла)
+    released_at = models.DateTimeField(null=True, blank=True, db_column='Released At')
+
+    class Meta:
+        db_table = 'MediaBlob'
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+        indexes = [
+            models.Index(fields=['released_at'], condition=Q(refcount__lte=0), name='mediablob_orphan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class ListVersion(models.Model):
+    """
+    Версия списка записей модели для условных запросов к API (см. versioning.py).
+    Увеличивается сигналами при создании, изменении и удалении записей.
+    """
+    resource = models.CharField(max_length=100, primary_key=True, db_column='Resource')
+    version = models.PositiveBigIntegerField(default=1, db_column='Version')
+    updated_at = models.DateTimeField(db_column='Updated At')
+
+    class Meta:
+        db_table = 'ListVersion'
+        verbose_name = 'Версия списка'
+        verbose_name_plural = 'Версии списков'
+
+    def __str__(self):
+        return f"{self.resource} v{self.version}"
+
+
 class TestDeletionRequest(models.Model):
     """
     Модель запроса на удаление теста.
@@ -194,6 +502,10 @@ class TestDeletionRequest(models.Model):
         db_table = 'TestDeletionRequest'
         verbose_name = 'Запрос на удаление теста'
         verbose_name_plural = 'Запросы на удаление тестов'
+        indexes = [
+            # Очередь нерассмотренных запросов на удаление
+            models.Index(fields=['requested_at', 'id'], condition=Q(approved__isnull=True), name='deletionrequest_pending_idx'),
+        ]
 
     def clean(self):
         super().clean()
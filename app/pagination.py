@@ -0,0 +1,168 @@
+# app/pagination.py
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def approximate_count(queryset):
+    """
+    Оценка числа строк по статистике планировщика (EXPLAIN) без COUNT(*).
+    Возвращает None, если СУБД не умеет давать оценку.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    """
+    Страница keyset-пагинации: записи и курсоры соседних страниц.
+    """
+
+    def __init__(self, paginator, object_list, next_cursor, previous_cursor):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Пагинация поиском по ключу сортировки (seek) вместо OFFSET: страница N стоит
+    столько же, сколько первая. Сортировка должна однозначно упорядочивать записи,
+    поэтому последним ключом всегда идёт первичный ключ. Ключи сортировки не должны быть NULL.
+    """
+
+    def __init__(self, queryset, per_page, ordering, count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        pk_name = queryset.model._meta.pk.name
+        if self.ordering[-1].lstrip('-') not in (pk_name, 'pk'):
+            # Направление первичного ключа совпадает с последним ключом, чтобы хватало одного индекса
+            self.ordering.append(('-' if self.ordering[-1].startswith('-') else '') + pk_name)
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in self.ordering]
+        self.count_mode = count
+
+    @cached_property
+    def count(self):
+        """
+        Количество записей: 'exact' — COUNT(*), 'approximate' — оценка планировщика, иначе None.
+        Вычисляется один раз на пагинатор (шаблон обращается к нему несколько раз).
+        """
+        if self.count_mode == 'exact':
+            return self.queryset.count()
+        if self.count_mode == 'approximate':
+            return approximate_count(self.queryset)
+        return None
+
+    def get_page(self, cursor=None):
+        """
+        Возвращает страницу по курсору; некорректный курсор означает первую страницу.
+        """
+        direction, values = self.decode_cursor(cursor)
+        backwards = direction == 'previous'
+        ordering = [self._reverse(key) for key in self.ordering] if backwards else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(self, rows, None, None)
+        has_next = has_more if not backwards else True
+        has_previous = values is not None if not backwards else has_more
+        next_cursor = self.encode_cursor('next', rows[-1]) if has_next else None
+        previous_cursor = self.encode_cursor('previous', rows[0]) if has_previous else None
+        return KeysetPage(self, rows, next_cursor, previous_cursor)
+
+    def encode_cursor(self, direction, obj):
+        values = [self._value(obj, field) for field, _ in self.keys]
+        payload = json.dumps([direction, values], cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return 'next', None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('next', 'previous') or len(values) != len(self.keys):
+                raise ValueError
+            values = [self._to_python(field, value) for (field, _), value in zip(self.keys, values)]
+        except (ValueError, TypeError, UnicodeDecodeError, ValidationError):
+            return 'next', None
+        return direction, values
+
+    def _seek_filter(self, values, backwards):
+        """
+        (k1, k2, ..., id) «после» курсора: k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...
+        Дополнительное условие k1 >= v1 позволяет СУБД начать сканирование индекса с курсора.
+        """
+        condition = Q()
+        for index, (field, descending) in enumerate(self.keys):
+            after = self._after_lookup(descending, backwards, strict=True)
+            clause = {prev_field: values[prev] for prev, (prev_field, _) in enumerate(self.keys[:index])}
+            clause[f'{field}__{after}'] = values[index]
+            condition |= Q(**clause)
+        first_field, first_descending = self.keys[0]
+        leading = {f'{first_field}__{self._after_lookup(first_descending, backwards, strict=False)}': values[0]}
+        return Q(**leading) & condition
+
+    @staticmethod
+    def _after_lookup(descending, backwards, strict):
+        ascending = descending == backwards
+        if strict:
+            return 'gt' if ascending else 'lt'
+        return 'gte' if ascending else 'lte'
+
+    @staticmethod
+    def _reverse(key):
+        return key[1:] if key.startswith('-') else '-' + key
+
+    @staticmethod
+    def _value(obj, path):
+        if isinstance(obj, dict):
+            # Строки .values()
+            return obj[path]
+        for attribute in path.split('__'):
+            obj = getattr(obj, attribute)
+        return obj
+
+    def _to_python(self, path, value):
+        model = self.queryset.model
+        field = None
+        try:
+            for attribute in path.split('__'):
+                field = model._meta.get_field(attribute)
+                model = field.related_model
+        except FieldDoesNotExist:
+            # Аннотации (например, search_rank) передаются как есть
+            return value
+        return field.to_python(value)
@@ -0,0 +1,20 @@
+# app/renderers.py
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Рендерер для потоковой выдачи списков (одна JSON-запись на строку).
+    Сами списки отдаются StreamingHttpResponse, а через рендерер проходят
+    только обычные ответы (например, ошибки) — одной строкой.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset) + b'\n'
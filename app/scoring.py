@@ -0,0 +1,188 @@
+# app/scoring.py
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Question
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """
+    Ключ ответов теста: к какому вопросу относится каждый ответ
+    и какие ответы каждого вопроса правильные.
+    """
+    test_id: int
+    question_ids: tuple
+    answer_questions: MappingProxyType
+    correct_answers: MappingProxyType
+
+    @property
+    def question_count(self):
+        return len(self.question_ids)
+
+
+@dataclass(frozen=True)
+class GradedSubmission:
+    """
+    Результат проверки: балл, правильность по каждому вопросу,
+    принятые и отклонённые значения из формы.
+    """
+    score: int
+    question_results: MappingProxyType
+    selected_answers: frozenset
+    invalid_values: tuple
+
+    @property
+    def is_valid(self):
+        return not self.invalid_values
+
+
+def build_answer_key(test_id, rows):
+    """
+    Строит ключ ответов из строк (id вопроса, id ответа, правильный ли ответ).
+    """
+    question_ids = []
+    answer_questions = {}
+    correct_answers = {}
+    for question_id, answer_id, is_correct in rows:
+        if question_id not in correct_answers:
+            question_ids.append(question_id)
+            correct_answers[question_id] = set()
+        if answer_id is None:
+            continue
+        answer_questions[answer_id] = question_id
+        if is_correct:
+            correct_answers[question_id].add(answer_id)
+    return AnswerKey(
+        test_id=test_id,
+        question_ids=tuple(question_ids),
+        answer_questions=MappingProxyType(answer_questions),
+        correct_answers=MappingProxyType({qid: frozenset(ids) for qid, ids in correct_answers.items()}),
+    )
+
+
+def load_answer_key_rows(test_id):
+    """
+    Строки ключа ответов теста одним запросом (вопросы LEFT JOIN ответы).
+    """
+    return tuple(
+        Question.objects.filter(test_id=test_id).order_by('id', 'answers__id').values_list(
+            'id', 'answers__id', 'answers__is_correct'
+        )
+    )
+
+
+def load_answer_key(test_id):
+    """
+    Загружает ключ ответов теста из базы, минуя кэш.
+    """
+    return build_answer_key(test_id, load_answer_key_rows(test_id))
+
+
+class AnswerKeyCache:
+    """
+    Кэш ключей ответов по (id теста, версия содержимого).
+    Первый уровень — LRU в памяти процесса, второй (необязательный) — общий кэш Django,
+    заданный настройкой ANSWER_KEY_CACHE_ALIAS. Версия меняется при каждом изменении
+    вопросов и ответов, поэтому устаревший ключ никогда не будет найден.
+    """
+
+    def __init__(self, max_entries=None, cache_alias=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._cache_alias = cache_alias
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, 'ANSWER_KEY_CACHE_SIZE', 256)
+
+    @property
+    def shared_cache(self):
+        alias = self._cache_alias or getattr(settings, 'ANSWER_KEY_CACHE_ALIAS', None)
+        return caches[alias] if alias else None
+
+    def get(self, test):
+        local_key = (test.id, test.content_version)
+        with self._lock:
+            answer_key = self._entries.get(local_key)
+            if answer_key is not None:
+                self._entries.move_to_end(local_key)
+                return answer_key
+
+        shared_cache = self.shared_cache
+        shared_key = f'answer-key:{test.id}:{test.content_version}'
+        rows = shared_cache.get(shared_key) if shared_cache is not None else None
+        if rows is None:
+            rows = load_answer_key_rows(test.id)
+            if shared_cache is not None:
+                shared_cache.set(shared_key, rows)
+        answer_key = build_answer_key(test.id, rows)
+
+        with self._lock:
+            self._entries[local_key] = answer_key
+            self._entries.move_to_end(local_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return answer_key
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+answer_key_cache = AnswerKeyCache()
+
+
+def get_answer_key(test):
+    """
+    Ключ ответов для текущей версии содержимого теста (без запросов при попадании в кэш).
+    """
+    return answer_key_cache.get(test)
+
+
+def grade_submission(answer_key, submitted_values):
+    """
+    Проверяет ответы из формы за один проход по ним.
+    Нечисловые значения и ответы чужих тестов попадают в invalid_values, повторы игнорируются.
+    Вопрос засчитывается, если выбраны ровно все его правильные ответы.
+    """
+    answer_questions = answer_key.answer_questions
+    selected = set()
+    selected_by_question = {}
+    invalid = []
+    for value in submitted_values:
+        try:
+            answer_id = int(value)
+        except (TypeError, ValueError):
+            invalid.append(value)
+            continue
+        question_id = answer_questions.get(answer_id)
+        if question_id is None:
+            invalid.append(value)
+            continue
+        if answer_id in selected:
+            continue
+        selected.add(answer_id)
+        selected_by_question.setdefault(question_id, set()).add(answer_id)
+
+    question_results = {}
+    score = 0
+    for question_id in answer_key.question_ids:
+        correct = answer_key.correct_answers[question_id]
+        is_correct = bool(correct) and selected_by_question.get(question_id) == correct
+        question_results[question_id] = is_correct
+        score += is_correct
+    return GradedSubmission(
+        score=score,
+        question_results=MappingProxyType(question_results),
+        selected_answers=frozenset(selected),
+        invalid_values=tuple(invalid),
+    )
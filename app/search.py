@@ -0,0 +1,78 @@
+# app/search.py
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import AppUser, Test
+
+# Поля, по которым ищут списки (для каждого есть триграммный индекс, см. миграцию 0006)
+USER_SEARCH_FIELDS = ('full_name', 'email')
+EMPLOYEE_SEARCH_FIELDS = ('full_name', 'email')
+TEST_SEARCH_FIELDS = ('title', 'description')
+
+
+def uses_trigram_search(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_filter(query, fields):
+    """
+    Условие «подстрока встречается хотя бы в одном поле».
+    На PostgreSQL icontains превращается в UPPER(col) LIKE '%...%',
+    который обслуживается GIN-индексом gin_trgm_ops по UPPER(col).
+    """
+    return reduce(or_, (Q(**{f'{field}__icontains': query}) for field in fields))
+
+
+def search(queryset, query, fields):
+    """
+    Фильтрует queryset по строке поиска и добавляет аннотацию search_rank
+    (триграммное сходство на PostgreSQL, 0 на остальных СУБД).
+    """
+    if not query:
+        return queryset
+    queryset = queryset.filter(search_filter(query, fields))
+    if uses_trigram_search(queryset):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similarities = [TrigramWordSimilarity(query, field) for field in fields]
+        rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    else:
+        rank = Value(0.0, output_field=FloatField())
+    return queryset.annotate(search_rank=rank)
+
+
+def matching_ids(model, query, fields):
+    """
+    Подзапрос id записей модели, подходящих под строку поиска.
+    """
+    return model.objects.filter(search_filter(query, fields)).values('id')
+
+
+def search_users(queryset, query):
+    return search(queryset, query, USER_SEARCH_FIELDS)
+
+
+def search_employees(queryset, query):
+    return search(queryset, query, EMPLOYEE_SEARCH_FIELDS)
+
+
+def search_tests(queryset, query):
+    return search(queryset, query, TEST_SEARCH_FIELDS)
+
+
+def search_results(queryset, query, by_user=True):
+    """
+    Поиск результатов по названию теста и (для администратора) ФИО пользователя.
+    Вместо OR по JOIN-у используются подзапросы id, каждый из которых идёт
+    по триграммному индексу своей таблицы, а затем по индексам внешних ключей TestResult.
+    """
+    if not query:
+        return queryset
+    condition = Q(test__in=matching_ids(Test, query, ('title',)))
+    if by_user:
+        condition |= Q(user__in=matching_ids(AppUser, query, ('full_name',)))
+    return queryset.filter(condition)
@@ -1,4 +1,8 @@
 # app/serializers.py
+from decimal import Decimal
+from operator import itemgetter
+
+from django.db.models import FileField
 from rest_framework import serializers
 from .models import AppUser, Employee
 
@@ -17,3 +21,73 @@ class EmployeeSerializer(serializers.Serializer):
     Position = serializers.CharField(source='position')
     Salary = serializers.DecimalField(max_digits=10, decimal_places=2, source='salary')
     Photo = serializers.CharField(source='photo', allow_null=True, required=False)
+
+class TestStatsSerializer(serializers.Serializer):
+    Test_ID = serializers.IntegerField(source='test_id')
+    Title = serializers.CharField(source='test.title')
+    Attempts = serializers.IntegerField(source='attempts')
+    Passed = serializers.IntegerField(source='passed')
+    Approved = serializers.IntegerField(source='approved')
+    Pass_Rate = serializers.FloatField(source='pass_rate', allow_null=True)
+    Mean_Score = serializers.FloatField(source='mean_score', allow_null=True)
+    Median_Score = serializers.FloatField(source='median_score', allow_null=True)
+    Histogram = serializers.DictField(source='histogram', child=serializers.IntegerField())
+
+class UserStatsSerializer(serializers.Serializer):
+    User_ID = serializers.IntegerField(source='user_id')
+    Attempts = serializers.IntegerField(source='attempts')
+    Tests_Taken = serializers.IntegerField(source='tests_taken')
+    Tests_Passed = serializers.IntegerField(source='tests_passed')
+    Best_Score = serializers.IntegerField(source='best_score', allow_null=True)
+    Last_Attempt = serializers.DateField(source='last_attempt', allow_null=True)
+
+
+class ValuesEncoder:
+    """
+    Быстрый кодировщик списков для API: строит то же представление, что и сериализатор
+    (те же ключи и значения), но напрямую из кортежей .values_list(), без создания
+    экземпляров моделей и вызова to_representation каждого поля.
+    """
+
+    def __init__(self, serializer_class, model):
+        self.keys = []
+        self.sources = []
+        self.converters = []
+        for name, field in serializer_class().fields.items():
+            self.keys.append(name)
+            self.sources.append(field.source)
+            converter = self._converter(field, model._meta.get_field(field.source))
+            if converter is not None:
+                self.converters.append((len(self.keys) - 1, converter))
+        self.keys = tuple(self.keys)
+        self.sources = tuple(self.sources)
+        self._getter = itemgetter(*self.sources)
+
+    @staticmethod
+    def _converter(field, model_field):
+        if isinstance(field, serializers.DecimalField):
+            quantum = Decimal(1).scaleb(-field.decimal_places)
+            return lambda value: None if value is None else '{:f}'.format(value.quantize(quantum))
+        if isinstance(model_field, FileField):
+            # Сериализатор получает FieldFile, строковое представление которого — имя файла или ''
+            return lambda value: value or ''
+        # Целые и строки приходят из БД уже в нужном виде
+        return None
+
+    def values_list(self, queryset):
+        return queryset.values_list(*self.sources)
+
+    def encode(self, row):
+        if not self.converters:
+            return dict(zip(self.keys, row))
+        row = list(row)
+        for index, converter in self.converters:
+            row[index] = converter(row[index])
+        return dict(zip(self.keys, row))
+
+    def encode_mapping(self, values):
+        return self.encode(self._getter(values))
+
+
+user_encoder = ValuesEncoder(UserSerializer, AppUser)
+employee_encoder = ValuesEncoder(EmployeeSerializer, Employee)
@@ -0,0 +1,275 @@
+# app/serving.py
+import asyncio
+import json
+import mimetypes
+import os
+import stat
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from wsgiref.util import FileWrapper
+
+from .storage import is_blob
+
+# Файлы с хешем содержимого в имени не меняются: браузер может не перепроверять их год
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Остальные файлы кэшируются, но перепроверяются по ETag при каждом использовании
+REVALIDATE = 'public, max-age=0, must-revalidate'
+# Заранее сжатые копии в порядке предпочтения: кодировка -> расширение
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+BLOCK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Representation:
+    path: str
+    size: int
+    etag: str
+    encoding: str = None
+
+
+@dataclass(frozen=True)
+class ServedFile:
+    """
+    Файл для отдачи: оригинал, сжатые копии и заголовки кэширования.
+    """
+    original: Representation
+    content_type: str
+    last_modified: float
+    cache_control: str
+    encoded: dict = field(default_factory=dict)
+
+    def choose(self, accept_encoding):
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.encoded and encoding in accepted:
+                return self.encoded[encoding]
+        return self.original
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def _etag(stat_result, suffix=''):
+    return f'"{int(stat_result.st_mtime):x}-{stat_result.st_size:x}{suffix}"'
+
+
+def _regular_file(path):
+    try:
+        stat_result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return None
+    return stat_result if stat.S_ISREG(stat_result.st_mode) else None
+
+
+def served_file(path, cache_control, with_encodings=False):
+    stat_result = _regular_file(path)
+    if stat_result is None:
+        return None
+    content_type, _ = mimetypes.guess_type(path)
+    if content_type is None:
+        content_type = 'application/octet-stream'
+    elif content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    encoded = {}
+    if with_encodings:
+        for encoding, extension in ENCODINGS:
+            encoded_stat = _regular_file(path + extension)
+            if encoded_stat is not None:
+                encoded[encoding] = Representation(
+                    path + extension, encoded_stat.st_size, _etag(stat_result, '-' + encoding), encoding
+                )
+    return ServedFile(
+        original=Representation(path, stat_result.st_size, _etag(stat_result)),
+        content_type=content_type,
+        last_modified=stat_result.st_mtime,
+        cache_control=cache_control,
+        encoded=encoded,
+    )
+
+
+def _url_prefix(url):
+    """
+    Путь из STATIC_URL/MEDIA_URL; None, если файлы отдаются с другого хоста (CDN).
+    """
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if parts.netloc:
+        return None
+    return '/' + parts.path.strip('/') + '/'
+
+
+class FileServer:
+    """
+    Отдача статики из STATIC_ROOT (после collectstatic) и загруженных файлов из MEDIA_ROOT
+    без прохода через Django. Статика индексируется один раз при старте процесса: ответ —
+    поиск в словаре. Имена из манифеста collectstatic (с хешем) и файлы хранилища по хешу
+    кэшируются навсегда; при наличии .br/.gz отдаётся сжатая копия.
+    """
+
+    def __init__(self, static_root=None, static_url=None, media_root=None, media_url=None):
+        self.static_prefix = _url_prefix(static_url) if static_root else None
+        self.media_prefix = _url_prefix(media_url) if media_root else None
+        self.media_root = os.path.realpath(media_root) if media_root else None
+        self.static_files = self._index_static(os.path.realpath(static_root)) if self.static_prefix else {}
+
+    @classmethod
+    def from_settings(cls):
+        from django.conf import settings
+        return cls(
+            static_root=getattr(settings, 'STATIC_ROOT', None), static_url=settings.STATIC_URL,
+            media_root=settings.MEDIA_ROOT, media_url=settings.MEDIA_URL,
+        )
+
+    @staticmethod
+    def _index_static(root):
+        if not os.path.isdir(root):
+            return {}
+        hashed = set()
+        try:
+            with open(os.path.join(root, 'staticfiles.json'), encoding='utf-8') as manifest:
+                hashed = set(json.load(manifest).get('paths', {}).values())
+        except (FileNotFoundError, ValueError):
+            pass
+        files = {}
+        compressed_extensions = tuple(extension for _, extension in ENCODINGS)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(compressed_extensions + ('.tmp',)):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                served = served_file(path, IMMUTABLE if name in hashed else REVALIDATE, with_encodings=True)
+                if served is not None:
+                    files[name] = served
+        return files
+
+    def _media_file(self, name):
+        parts = name.split('/')
+        if any(part in ('', '.', '..') or part.startswith('.') or '\\' in part or '\x00' in part for part in parts):
+            return None
+        path = os.path.realpath(os.path.join(self.media_root, *parts))
+        if not path.startswith(self.media_root + os.sep):
+            return None
+        # Файлы хранилища по хешу неизменяемы, остальные могут быть перезаписаны
+        return served_file(path, IMMUTABLE if is_blob(name) else REVALIDATE)
+
+    def find(self, path):
+        if self.static_prefix and path.startswith(self.static_prefix):
+            return self.static_files.get(path[len(self.static_prefix):])
+        if self.media_prefix and path.startswith(self.media_prefix):
+            return self._media_file(path[len(self.media_prefix):])
+        return None
+
+    def respond(self, served, headers):
+        """
+        Возвращает (код, заголовки, представление или None для ответа без тела).
+        headers — функция получения заголовка запроса по имени.
+        """
+        representation = served.choose(headers('accept-encoding'))
+        response_headers = [
+            ('Content-Type', served.content_type),
+            ('Cache-Control', served.cache_control),
+            ('ETag', representation.etag),
+            ('Last-Modified', formatdate(served.last_modified, usegmt=True)),
+        ]
+        if served.encoded:
+            response_headers.append(('Vary', 'Accept-Encoding'))
+        if representation.encoding:
+            response_headers.append(('Content-Encoding', representation.encoding))
+        if _not_modified(representation, served, headers):
+            return 304, response_headers, None
+        response_headers.append(('Content-Length', str(representation.size)))
+        return 200, response_headers, representation
+
+
+def _not_modified(representation, served, headers):
+    if_none_match = headers('if-none-match')
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or representation.etag in tags
+    if_modified_since = headers('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(served.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class WSGIFileServer:
+    """
+    WSGI-обёртка: найденные файлы отдаются через wsgi.file_wrapper (sendfile у gunicorn и uWSGI),
+    остальные запросы передаются приложению.
+    """
+
+    def __init__(self, application, server=None):
+        self.application = application
+        self.server = server or FileServer.from_settings()
+
+    def __call__(self, environ, start_response):
+        served = None
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            served = self.server.find(environ.get('PATH_INFO', ''))
+        if served is None:
+            return self.application(environ, start_response)
+
+        def header(name):
+            return environ.get('HTTP_' + name.upper().replace('-', '_'))
+
+        status, headers, representation = self.server.respond(served, header)
+        start_response(f'{status} {HTTPStatus(status).phrase}', headers)
+        if representation is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(representation.path, 'rb'), BLOCK_SIZE)
+
+
+class ASGIFileServer:
+    """
+    ASGI-обёртка с тем же поведением. Если сервер поддерживает расширение
+    http.response.zerocopysend, файл передаётся без копирования; иначе читается
+    по частям в потоке, не блокируя цикл событий.
+    """
+
+    def __init__(self, application, server=None):
+        self.application = application
+        self.server = server or FileServer.from_settings()
+
+    async def __call__(self, scope, receive, send):
+        served = None
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            served = self.server.find(scope['path'])
+        if served is None:
+            return await self.application(scope, receive, send)
+
+        request_headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        status, headers, representation = self.server.respond(served, request_headers.get)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        })
+        if representation is None or scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        with open(representation.path, 'rb') as file:
+            if 'http.response.zerocopysend' in scope.get('extensions', {}):
+                await send({'type': 'http.response.zerocopysend', 'file': file, 'count': representation.size})
+                return
+            while True:
+                chunk = await asyncio.to_thread(file.read, BLOCK_SIZE)
+                more = len(chunk) == BLOCK_SIZE
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+                if not more:
+                    break
@@ -0,0 +1,155 @@
+# app/signals.py
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import blobs, fragments, images, stats
+from .middleware import identity_cache
+from .versioning import bump_list_version
+from .models import AppUser, Employee, Test, Question, Answer, TestResult
+
+
+@receiver([post_save, post_delete], sender=AppUser)
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_cached_identity(sender, instance, **kwargs):
+    """
+    Сбрасывает закэшированного текущего пользователя после изменения его записи.
+    """
+    identity_cache.invalidate(sender.__name__, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=AppUser)
+@receiver([post_save, post_delete], sender=Employee)
+def bump_api_list_version(sender, instance, **kwargs):
+    """
+    Меняет ETag списков API (см. versioning.py) при любом изменении записей.
+    """
+    bump_list_version(sender)
+
+
+@receiver(post_init, sender=Question)
+@receiver(post_init, sender=Answer)
+@receiver(post_init, sender=Employee)
+def remember_media_reference(sender, instance, **kwargs):
+    blobs.remember_reference(instance)
+
+
+@receiver(pre_save, sender=Question)
+@receiver(pre_save, sender=Answer)
+@receiver(pre_save, sender=Employee)
+def process_uploaded_image(sender, instance, **kwargs):
+    """
+    Нормализует только что загруженное изображение до записи файла в хранилище
+    и запоминает прежнее имя файла для счётчиков ссылок.
+    """
+    instance._make_image_variants = images.prepare_upload(instance, kwargs.get('update_fields'))
+    instance._stored_media = blobs.stored_reference(instance, kwargs.get('update_fields'))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_save, sender=Employee)
+def make_image_variants(sender, instance, **kwargs):
+    """
+    Создаёт уменьшенные варианты после сохранения файла (имя в хранилище уже известно).
+    """
+    if getattr(instance, '_make_image_variants', False):
+        instance._make_image_variants = False
+        field_file = getattr(instance, images.IMAGE_FIELDS[sender][0])
+        images.make_variants(field_file.name, field_file.storage)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_save, sender=Employee)
+def count_media_reference(sender, instance, **kwargs):
+    """
+    Переносит ссылку с прежнего файла на новый в счётчиках MediaBlob.
+    """
+    old_name = getattr(instance, '_stored_media', False)
+    if old_name is not False:
+        instance._stored_media = False
+        new_name = getattr(instance, blobs.referenced_field(sender)).name or None
+        blobs.reference_changed(old_name or None, new_name)
+        instance._loaded_media = new_name
+
+
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=Answer)
+@receiver(post_delete, sender=Employee)
+def release_media_reference(sender, instance, **kwargs):
+    blobs.reference_changed(getattr(instance, blobs.referenced_field(sender)).name or None, None)
+
+
+def _deleted_with_test(kwargs, models=(Test,)):
+    # При удалении самого теста (или вопроса) увеличивать версию уже некому
+    origin = kwargs.get('origin')
+    return isinstance(origin, models) or getattr(origin, 'model', None) in models
+
+
+@receiver([post_save, post_delete], sender=Question)
+def bump_test_version_on_question_change(sender, instance, **kwargs):
+    """
+    Увеличивает версию содержимого теста при изменении его вопросов.
+    """
+    if _deleted_with_test(kwargs):
+        return
+    Test.objects.filter(pk=instance.test_id).update(content_version=F('content_version') + 1, updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def bump_test_version_on_answer_change(sender, instance, **kwargs):
+    """
+    Увеличивает версию содержимого теста при изменении ответов его вопросов.
+    """
+    if _deleted_with_test(kwargs):
+        return
+    Test.objects.filter(questions__id=instance.question_id).update(
+        content_version=F('content_version') + 1, updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Question)
+def bump_question_version(sender, instance, created, **kwargs):
+    """
+    Увеличивает версию содержимого вопроса, по которой кэшируется его карточка (см. fragments.py).
+    """
+    if not created:
+        fragments.invalidate_questions([instance.pk])
+        # Версия в памяти могла устареть (её увеличивают и изменения ответов)
+        instance.refresh_from_db(fields=['content_version'])
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def bump_question_version_on_answer_change(sender, instance, **kwargs):
+    if _deleted_with_test(kwargs, models=(Test, Question)):
+        return
+    fragments.invalidate_questions([instance.question_id])
+
+
+@receiver(post_save, sender=TestResult)
+def update_stats_on_result_save(sender, instance, created, **kwargs):
+    """
+    Обновляет сводную статистику при создании, одобрении или изменении результата.
+    """
+    stats.result_saved(instance, created)
+
+
+@receiver(post_delete, sender=TestResult)
+def update_stats_on_result_delete(sender, instance, **kwargs):
+    stats.result_deleted(instance)
+
+
+@receiver(pre_delete, sender=Test)
+def remember_test_users(sender, instance, **kwargs):
+    # Результаты удалённого теста остаются без теста (SET_NULL) без сигналов,
+    # поэтому пользователей для пересчёта запоминаем заранее
+    instance._stats_user_ids = list(instance.results.values_list('user_id', flat=True).distinct())
+
+
+@receiver(post_delete, sender=Test)
+def refresh_user_stats_on_test_delete(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_stats_user_ids', None)
+    if user_ids:
+        stats.refresh_user_stats(user_ids)
@@ -0,0 +1,61 @@
+# app/sorting.py
+
+
+class SortableColumns:
+    """
+    Разрешённые сортировки списка: ключ из GET-параметра sort -> поля order_by.
+    Каждая сортировка заканчивается id, чтобы порядок был однозначным, и должна
+    обслуживаться индексом. Неизвестные ключи и направления заменяются значениями по умолчанию.
+    """
+
+    def __init__(self, columns, default, default_order='asc'):
+        self.columns = {key: tuple(fields) for key, fields in columns.items()}
+        self.default = default
+        self.default_order = default_order
+
+    def resolve(self, request):
+        """
+        Возвращает (ключ, направление, список полей для order_by) для запроса.
+        """
+        key = request.GET.get('sort', self.default)
+        if key not in self.columns:
+            key = self.default
+        order = request.GET.get('order', self.default_order)
+        if order not in ('asc', 'desc'):
+            order = self.default_order
+        fields = self.columns[key]
+        if order == 'desc':
+            fields = tuple('-' + field for field in fields)
+        return key, order, list(fields)
+
+
+# Индексы: user_full_name_idx (full_name, id), уникальный индекс по email
+USER_LIST_SORTS = SortableColumns({
+    'id': ('id',),
+    'full_name': ('full_name', 'id'),
+    'email': ('email', 'id'),
+}, default='id')
+
+# Индексы: employee_full_name_idx (full_name, id), уникальный индекс по email
+EMPLOYEE_LIST_SORTS = SortableColumns({
+    'id': ('id',),
+    'full_name': ('full_name', 'id'),
+    'email': ('email', 'id'),
+}, default='id')
+
+# Индекс: test_title_idx (title, id)
+TEST_LIST_SORTS = SortableColumns({
+    'id': ('id',),
+    'title': ('title', 'id'),
+}, default='title')
+
+# Индекс: testresult_user_approved_idx (user, test_date DESC, id DESC) WHERE approved
+USER_RESULT_SORTS = SortableColumns({
+    'test_date': ('test_date', 'id'),
+}, default='test_date', default_order='desc')
+
+# Индекс: testresult_date_idx (test_date DESC, id DESC)
+ADMIN_RESULT_SORTS = SortableColumns({
+    'test_date': ('test_date', 'id'),
+    'id': ('id',),
+}, default='test_date', default_order='desc')
@@ -0,0 +1,271 @@
+# app/stats.py
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import TestResult, TestResultResponse, TestSession, TestStats, TestSubmission, UserStats
+
+USER_STATS_FIELDS = ('attempts', 'tests_taken', 'tests_passed', 'best_score', 'last_attempt')
+
+
+@dataclass
+class TestDelta:
+    """
+    Изменение счётчиков статистики одного теста.
+    """
+    attempts: int = 0
+    passed: int = 0
+    approved: int = 0
+    score_sum: int = 0
+    histogram: Counter = field(default_factory=Counter)
+
+
+class StatsDelta:
+    """
+    Накопленные изменения статистики: приращения счётчиков тестов и пользователи,
+    чью статистику нужно пересчитать. Лучший балл и число разных тестов нельзя
+    уменьшить приращением, поэтому пользовательская статистика пересчитывается
+    по результатам самого пользователя (индекс по user), а не по всей таблице.
+    """
+
+    def __init__(self):
+        self.tests = {}
+        self.user_ids = set()
+
+    def __bool__(self):
+        return bool(self.tests or self.user_ids)
+
+    def test(self, test_id):
+        return self.tests.setdefault(test_id, TestDelta())
+
+    def add_result(self, values, sign=1):
+        """
+        Учитывает появление (sign=1) или исчезновение (sign=-1) результата
+        со значениями values (словарь полей TestResult.STATS_FIELDS).
+        """
+        self.user_ids.add(values['user_id'])
+        if values['test_id'] is None:
+            return
+        delta = self.test(values['test_id'])
+        delta.attempts += sign
+        delta.passed += sign * (values['status'] == 'passed')
+        delta.approved += sign * bool(values['approved'])
+        delta.score_sum += sign * values['score_achieved']
+        delta.histogram[str(values['score_achieved'])] += sign
+
+    def merge(self, other):
+        for test_id, delta in other.tests.items():
+            target = self.test(test_id)
+            target.attempts += delta.attempts
+            target.passed += delta.passed
+            target.approved += delta.approved
+            target.score_sum += delta.score_sum
+            target.histogram.update(delta.histogram)
+        self.user_ids |= other.user_ids
+
+
+def stats_values(result):
+    return {name: getattr(result, name) for name in TestResult.STATS_FIELDS}
+
+
+_local = threading.local()
+
+
+@contextmanager
+def batch():
+    """
+    Копит изменения статистики внутри блока и применяет их один раз при выходе.
+    Используется вокруг массовых операций (например, QuerySet.delete(), который
+    вызывает post_delete для каждой записи). Блок должен быть внутри transaction.atomic().
+    """
+    if getattr(_local, 'delta', None) is not None:
+        yield
+        return
+    _local.delta = StatsDelta()
+    try:
+        yield
+        delta = _local.delta
+    finally:
+        _local.delta = None
+    apply_delta(delta)
+
+
+def submit(delta):
+    pending = getattr(_local, 'delta', None)
+    if pending is not None:
+        pending.merge(delta)
+    else:
+        apply_delta(delta)
+
+
+def apply_delta(delta):
+    """
+    Применяет изменения: три запроса на все затронутые тесты (создание недостающих строк,
+    блокировка, обновление; четвёртый — удаление опустевших строк) и два — на пересчёт
+    затронутых пользователей.
+    """
+    if not delta:
+        return
+    with transaction.atomic():
+        if delta.tests:
+            test_ids = sorted(delta.tests)
+            TestStats.objects.bulk_create([TestStats(test_id=test_id) for test_id in test_ids], ignore_conflicts=True)
+            # Блокировка в порядке id, чтобы параллельные обновления не взаимоблокировались
+            rows = list(TestStats.objects.select_for_update().filter(test_id__in=test_ids).order_by('test_id'))
+            now = timezone.now()
+            for stats in rows:
+                change = delta.tests[stats.test_id]
+                stats.attempts += change.attempts
+                stats.passed += change.passed
+                stats.approved += change.approved
+                stats.score_sum += change.score_sum
+                histogram = Counter(stats.histogram)
+                histogram.update(change.histogram)
+                stats.histogram = {score: count for score, count in histogram.items() if count > 0}
+                stats.updated_at = now
+            TestStats.objects.bulk_update(
+                rows, ['attempts', 'passed', 'approved', 'score_sum', 'histogram', 'updated_at']
+            )
+            # Как и при полном пересчёте, у теста без результатов строки статистики нет
+            empty = [stats.test_id for stats in rows if stats.attempts <= 0]
+            if empty:
+                TestStats.objects.filter(test_id__in=empty).delete()
+        if delta.user_ids:
+            refresh_user_stats(delta.user_ids)
+
+
+def refresh_user_stats(user_ids):
+    """
+    Пересчитывает статистику пользователей по их результатам одним сгруппированным запросом.
+    """
+    user_ids = set(user_ids)
+    rows = (
+        TestResult.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(
+            attempts=Count('id'),
+            tests_taken=Count('test', distinct=True),
+            tests_passed=Count('test', filter=Q(status='passed'), distinct=True),
+            best_score=Max('score_achieved'),
+            last_attempt=Max('test_date'),
+        )
+        .order_by()
+    )
+    stats = [UserStats(user_id=row.pop('user_id'), **row) for row in rows]
+    if stats:
+        UserStats.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=['user'], update_fields=[*USER_STATS_FIELDS, 'updated_at']
+        )
+    # У пользователей без результатов статистики нет
+    UserStats.objects.filter(user_id__in=user_ids - {item.user_id for item in stats}).delete()
+
+
+def rebuild_test_stats(test_ids=None):
+    """
+    Полный пересчёт статистики тестов по таблице результатов (для восстановления после сбоев).
+    """
+    results = TestResult.objects.filter(test__isnull=False)
+    if test_ids is not None:
+        results = results.filter(test_id__in=test_ids)
+    totals = results.values('test_id').annotate(
+        attempts=Count('id'),
+        passed=Count('id', filter=Q(status='passed')),
+        approved=Count('id', filter=Q(approved=True)),
+        score_sum=Sum('score_achieved'),
+    ).order_by()
+    histograms = {}
+    for row in results.values('test_id', 'score_achieved').annotate(count=Count('id')).order_by():
+        histograms.setdefault(row['test_id'], {})[str(row['score_achieved'])] = row['count']
+
+    with transaction.atomic():
+        stats = [TestStats(histogram=histograms.get(row['test_id'], {}), **row) for row in totals]
+        stale = TestStats.objects.all() if test_ids is None else TestStats.objects.filter(test_id__in=test_ids)
+        stale.exclude(test_id__in=[item.test_id for item in stats]).delete()
+        TestStats.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=['test'],
+            update_fields=['attempts', 'passed', 'approved', 'score_sum', 'histogram', 'updated_at'],
+        )
+    return len(stats)
+
+
+def results_created(results):
+    """
+    Учитывает результаты, созданные в обход сигналов (bulk_create).
+    """
+    delta = StatsDelta()
+    for result in results:
+        delta.add_result(stats_values(result))
+        result._loaded_stats = stats_values(result)
+    submit(delta)
+
+
+def result_saved(result, created):
+    """
+    Учитывает создание или изменение одного результата (из post_save).
+    """
+    delta = StatsDelta()
+    loaded = getattr(result, '_loaded_stats', None)
+    if not created:
+        if loaded is None or len(loaded) != len(TestResult.STATS_FIELDS):
+            # Прежние значения неизвестны: пересчитываем затронутый тест целиком
+            if result.test_id is not None:
+                rebuild_test_stats([result.test_id])
+            delta.user_ids.add(result.user_id)
+            submit(delta)
+            result._loaded_stats = stats_values(result)
+            return
+        delta.add_result(loaded, sign=-1)
+    delta.add_result(stats_values(result))
+    result._loaded_stats = stats_values(result)
+    submit(delta)
+
+
+def result_deleted(result):
+    delta = StatsDelta()
+    delta.add_result(getattr(result, '_loaded_stats', None) or stats_values(result), sign=-1)
+    submit(delta)
+
+
+def results_approved(queryset):
+    """
+    Одобряет результаты queryset одним UPDATE и учитывает это в статистике.
+    Возвращает число одобренных результатов. Выполняется в транзакции.
+    """
+    with transaction.atomic():
+        test_ids = list(queryset.filter(approved=False).select_for_update().values_list('test_id', flat=True))
+        approved = queryset.filter(approved=False).update(approved=True)
+        delta = StatsDelta()
+        for test_id, count in Counter(test_ids).items():
+            if test_id is not None:
+                delta.test(test_id).approved += count
+        submit(delta)
+    return approved
+
+
+def results_deleted(queryset):
+    """
+    Удаляет результаты queryset и учитывает это в статистике. Возвращает число удалённых.
+    QuerySet.delete() из-за сигнала post_delete загружал бы каждую запись в Python и удалял
+    пачками; здесь читаются только поля статистики, а связанные строки (ответы по вопросам,
+    ссылки из отправок и сессий) и сами результаты удаляются по одному запросу на таблицу.
+    Сигналы post_delete для результатов не отправляются. Выполняется в транзакции.
+    """
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values('id', *TestResult.STATS_FIELDS))
+        if not rows:
+            return 0
+        ids = [row.pop('id') for row in rows]
+        TestResultResponse.objects.filter(result_id__in=ids)._raw_delete(TestResultResponse.objects.db)
+        TestSubmission.objects.filter(result_id__in=ids).update(result=None)
+        TestSession.objects.filter(result_id__in=ids).update(result=None)
+        deleted = TestResult.objects.filter(id__in=ids)._raw_delete(TestResult.objects.db)
+        delta = StatsDelta()
+        for values in rows:
+            delta.add_result(values, sign=-1)
+        submit(delta)
+    return deleted
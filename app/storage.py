@@ -0,0 +1,92 @@
+# app/storage.py
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+
+from .assets import compress_file
+
+BLOBS_DIR = 'blobs'
+# Файлы, производные от блоба (варианты изображений), сохраняются под своими именами
+DERIVED_DIRS = ('variants',)
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/(?:variants/)?(?P<digest>[0-9a-f]{64})(?:\.[\w.]+)?$')
+
+
+class _BlobExists(Exception):
+    pass
+
+
+def content_digest(content):
+    """
+    SHA-256 содержимого файла, читаемого по частям.
+    """
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_blob(name):
+    return bool(name) and BLOB_NAME_RE.match(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище медиафайлов по хешу содержимого: файл сохраняется как
+    blobs/<2 символа хеша>/<sha256><расширение> независимо от upload_to и исходного имени.
+    Одинаковые файлы хранятся один раз; содержимое по имени никогда не меняется,
+    поэтому такие URL можно кэшировать навсегда. Удалять файлы, на которые больше
+    нет ссылок, — задача manage.py collect_media (см. app/blobs.py).
+    """
+    content_addressed = True
+
+    def is_derived(self, name):
+        return posixpath.basename(posixpath.dirname(name)) in DERIVED_DIRS
+
+    def blob_name(self, name, content):
+        extension = posixpath.splitext(name)[1].lower()
+        digest = content_digest(content)
+        return posixpath.join(BLOBS_DIR, digest[:2], digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        if is_blob(name) and self.exists(name):
+            # Тот же хеш — то же содержимое: второй копии не нужно
+            raise _BlobExists(name)
+        return super().get_available_name(name, max_length=max_length)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if not self.is_derived(name):
+            name = self.blob_name(name, content)
+        try:
+            return super().save(name, content, max_length=max_length)
+        except _BlobExists:
+            # Отметка о новом использовании, чтобы collect_media не удалил файл в этот момент
+            os.utime(self.path(name))
+            return name
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хешем содержимого в именах файлов (см. ManifestStaticFilesStorage) и заранее
+    сжатыми копиями .gz/.br, которые отдаёт сервер файлов из app/serving.py.
+    Сжатие выполняется в collectstatic после расстановки хешей.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for original, hashed in self.hashed_files.items():
+            for name in {original, hashed}:
+                if self.exists(name):
+                    compress_file(self.path(name))
@@ -0,0 +1,174 @@
+# app/submissions.py
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import stats
+from .models import TestResult, TestResultResponse, TestSession, TestSubmission
+from .scoring import get_answer_key, grade_submission
+
+logger = logging.getLogger('app.submissions')
+
+
+def queue_enabled():
+    return getattr(settings, 'TEST_SUBMISSION_QUEUE', False)
+
+
+def enqueue_submission(user, test, submitted_values, session=None):
+    """
+    Записывает необработанную отправку в очередь: один INSERT без подсчёта попыток.
+    session — завершённая отправкой сессия прохождения, результат в неё запишет обработчик.
+    """
+    return TestSubmission.objects.create(user=user, test=test, answers=list(submitted_values), session=session)
+
+
+def claim_batch(batch_size):
+    """
+    Забирает пачку необработанных отправок. На PostgreSQL строки, уже захваченные
+    другим обработчиком, пропускаются (SKIP LOCKED), поэтому обработчики не ждут друг друга.
+    Вызывается внутри транзакции.
+    """
+    return list(
+        TestSubmission.objects.filter(processed_at__isnull=True)
+        .select_for_update(skip_locked=True, of=('self',))
+        .select_related('test')
+        .order_by('id')[:batch_size]
+    )
+
+
+def last_attempts(submissions):
+    """
+    Последние номера попыток по парам (пользователь, тест) пачки одним запросом.
+    """
+    user_ids = {submission.user_id for submission in submissions}
+    test_ids = {submission.test_id for submission in submissions}
+    rows = (
+        TestResult.objects.filter(user_id__in=user_ids, test_id__in=test_ids)
+        .values('user_id', 'test_id')
+        .annotate(last=Max('attempt_number'))
+        .order_by()
+    )
+    return {(row['user_id'], row['test_id']): row['last'] for row in rows}
+
+
+def build_responses(result, answer_key, graded):
+    """
+    Записи ответов по каждому вопросу теста для результата (ещё не сохранённые).
+    """
+    selected_by_question = {}
+    for answer_id in graded.selected_answers:
+        selected_by_question.setdefault(answer_key.answer_questions[answer_id], []).append(answer_id)
+    return [
+        TestResultResponse(
+            result=result, question_id=question_id, is_correct=is_correct,
+            answer_ids=sorted(selected_by_question.get(question_id, ())),
+        )
+        for question_id, is_correct in graded.question_results.items()
+    ]
+
+
+def grade_result(user_id, test, submitted_values, test_date):
+    """
+    Проверяет ответы и возвращает несохранённый TestResult (без номера попытки)
+    или текст ошибки, если проверить ответы нельзя. Ответы, которых больше нет в тесте
+    (тест изменили после отправки), просто не засчитываются: при отправке они уже
+    проверены по актуальному на тот момент ключу.
+    """
+    if test is None:
+        return None, 'Тест удалён до проверки.'
+    answer_key = get_answer_key(test)
+    graded = grade_submission(answer_key, submitted_values)
+    result = TestResult(
+        user_id=user_id,
+        test=test,
+        test_date=test_date,
+        score_achieved=graded.score,
+        status='passed' if graded.score >= test.passing_score else 'failed',
+        approved=False,
+    )
+    # Сохраняются вместе с результатом в save_results
+    result.pending_responses = build_responses(result, answer_key, graded)
+    return result, None
+
+
+def build_result(submission):
+    return grade_result(submission.user_id, submission.test, submission.answers, submission.submitted_at.date())
+
+
+def save_results(pending):
+    """
+    Сохраняет результаты пачки одним bulk_create, назначая номера попыток по порядку.
+    pending — список пар (отправка или сессия теста, несохранённый результат).
+    Если номер успела занять синхронная отправка, пачка сохраняется построчно через create_attempt.
+    """
+    attempts = last_attempts([submission for submission, _ in pending])
+    for submission, result in pending:
+        key = (submission.user_id, submission.test_id)
+        attempts[key] = attempts.get(key, 0) + 1
+        result.attempt_number = attempts[key]
+    try:
+        with transaction.atomic():
+            # bulk_create не вызывает сигналы, поэтому статистика обновляется явно
+            stats.results_created(TestResult.objects.bulk_create([result for _, result in pending]))
+    except IntegrityError:
+        for index, (submission, result) in enumerate(pending):
+            saved = TestResult.objects.create_attempt(
+                user=submission.user, test=result.test, test_date=result.test_date,
+                score_achieved=result.score_achieved, status=result.status, approved=False,
+            )
+            for response in result.pending_responses:
+                response.result = saved
+            saved.pending_responses = result.pending_responses
+            pending[index] = (submission, saved)
+    TestResultResponse.objects.bulk_create(
+        [response for _, result in pending for response in result.pending_responses], batch_size=1000
+    )
+    return [result for _, result in pending]
+
+
+def process_batch(batch_size=200):
+    """
+    Обрабатывает одну пачку очереди в одной транзакции. Возвращает число обработанных отправок.
+    """
+    with transaction.atomic():
+        submissions = claim_batch(batch_size)
+        if not submissions:
+            return 0
+        pending = []
+        for submission in submissions:
+            try:
+                # Точка сохранения: ошибка запроса при проверке не прерывает транзакцию пачки
+                with transaction.atomic():
+                    result, error = build_result(submission)
+            except Exception as exc:
+                # Отправка, которую не удаётся проверить, отмечается ошибкой, иначе её забирала бы каждая пачка
+                logger.exception('Не удалось проверить отправку #%s', submission.pk)
+                result, error = None, f'Ошибка проверки: {exc}'
+            if error:
+                submission.error = error
+            else:
+                pending.append((submission, result))
+        if pending:
+            for (submission, _), result in zip(pending, save_results(pending)):
+                submission.result = result
+            # Сессии, завершённые отправками, до этого момента оставались без результата
+            sessions = [
+                TestSession(pk=submission.session_id, result=submission.result)
+                for submission, _ in pending if submission.session_id is not None
+            ]
+            TestSession.objects.bulk_update(sessions, ['result'])
+        processed_at = timezone.now()
+        for submission in submissions:
+            submission.processed_at = processed_at
+        TestSubmission.objects.bulk_update(submissions, ['result', 'processed_at', 'error'])
+    return len(submissions)
+
+
+def supports_parallel_workers():
+    """
+    Параллельные обработчики безопасны, только если СУБД умеет SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    return connection.features.has_select_for_update_skip_locked
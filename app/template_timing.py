@@ -0,0 +1,94 @@
+# app/template_timing.py
+import contextvars
+import time
+from dataclasses import dataclass
+
+from django.template.base import Template
+
+# Сборщик времени отрисовки текущего запроса; None — замер выключен
+_collector = contextvars.ContextVar('template_timing', default=None)
+_original_render = None
+
+
+@dataclass
+class TemplateTiming:
+    count: int = 0
+    # Полное время отрисовки, включая вложенные шаблоны (extends, include), в секундах
+    total: float = 0.0
+    # Время без учёта вложенных шаблонов
+    own: float = 0.0
+
+
+class RenderCollector:
+    """
+    Время и число отрисовок по именам шаблонов за один запрос. Вложенные шаблоны
+    ({% include %}, родители {% extends %}, фрагменты из fragments.py) учитываются
+    отдельно, их время вычитается из собственного времени внешнего шаблона.
+    """
+
+    def __init__(self):
+        self.templates = {}
+        self._stack = []
+
+    def start(self):
+        self._stack.append(0.0)
+        return time.perf_counter()
+
+    def finish(self, name, started):
+        elapsed = time.perf_counter() - started
+        nested = self._stack.pop()
+        if self._stack:
+            self._stack[-1] += elapsed
+        timing = self.templates.setdefault(name, TemplateTiming())
+        timing.count += 1
+        timing.total += elapsed
+        timing.own += elapsed - nested
+
+    @property
+    def elapsed(self):
+        # Время верхнего уровня: сумма собственного времени всех шаблонов
+        return sum(timing.own for timing in self.templates.values())
+
+    def slowest(self, limit=None):
+        return sorted(self.templates.items(), key=lambda item: item[1].own, reverse=True)[:limit]
+
+
+def template_name(template):
+    name = template.origin.template_name if template.origin else None
+    return name or template.name or '<string>'
+
+
+def _timed_render(self, context):
+    collector = _collector.get()
+    if collector is None:
+        return _original_render(self, context)
+    started = collector.start()
+    try:
+        return _original_render(self, context)
+    finally:
+        collector.finish(template_name(self), started)
+
+
+def install():
+    """
+    Оборачивает Template._render (через него проходят все шаблоны, включая include и extends).
+    Вне collect() обёртка только проверяет ContextVar.
+    """
+    global _original_render
+    if _original_render is None:
+        _original_render = Template._render
+        Template._render = _timed_render
+
+
+class collect:
+    """
+    Контекстный менеджер: замеряет отрисовку шаблонов внутри блока with.
+    """
+
+    def __enter__(self):
+        self.collector = RenderCollector()
+        self._token = _collector.set(self.collector)
+        return self.collector
+
+    def __exit__(self, *exc_info):
+        _collector.reset(self._token)
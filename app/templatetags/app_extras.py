@@ -1,7 +1,10 @@
 # app/templatetags/app_extras.py
 from django import template
+from django.utils.html import format_html, format_html_join
 import base64
 
+from app import assets, fragments, images
+
 register = template.Library()
 
 @register.filter
@@ -15,3 +18,66 @@ def to(value, arg):
 @register.filter
 def get_item(dictionary, key):
     return dictionary.get(key)
+
+@register.simple_tag(takes_context=True)
+def query_with(context, **kwargs):
+    """
+    Текущая строка запроса с заменёнными параметрами (например, курсором страницы).
+    """
+    query = context['request'].GET.copy()
+    for key, value in kwargs.items():
+        if value is None:
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return '?' + query.urlencode()
+
+
+@register.simple_tag
+def vendor_asset(name):
+    """
+    <link>/<script> для стороннего файла из assets.VENDOR_ASSETS (см. assets.vendor_source).
+    """
+    url, expected = assets.vendor_source(name)
+    integrity = format_html(' integrity="{}" crossorigin="anonymous"', expected) if expected else ''
+    if name.endswith('.css'):
+        return format_html('<link rel="stylesheet" href="{}"{}>', url, integrity)
+    return format_html('<script src="{}"{}></script>', url, integrity)
+
+
+@register.simple_tag(takes_context=True)
+def navbar(context):
+    """
+    Навигационная панель из кэша фрагментов (см. fragments.render_navbar).
+    """
+    return fragments.render_navbar(context)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', loading='lazy', **attrs):
+    """
+    <picture> с вариантами изображения в WebP и JPEG (srcset), размерами и отложенной загрузкой.
+    Остальные именованные аргументы (alt, class, style) становятся атрибутами <img>.
+    Изображение без вариантов (не обработанное) выводится обычным <img> с loading.
+    """
+    if not image:
+        return ''
+    width, height = images.dimensions(image)
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    widths = images.variant_widths(width) if images.is_processable(image.name) else []
+    if not widths:
+        size = format_html(' width="{}" height="{}"', width, height) if width and height else ''
+        return format_html('<img src="{}"{}{} loading="{}" decoding="async">', image.url, size, extra, loading)
+
+    def srcset(image_format):
+        return ', '.join(
+            f'{image.storage.url(images.variant_name(image.name, variant, image_format))} {variant}w' for variant in widths
+        )
+
+    return format_html(
+        '<picture><source type="{}" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}"{} loading="{}" decoding="async"></picture>',
+        images.VARIANT_FORMATS['WEBP'][1], srcset('WEBP'), sizes,
+        image.storage.url(images.variant_name(image.name, widths[-1], 'JPEG')), srcset('JPEG'), sizes,
+        width, height, extra, loading,
+    )
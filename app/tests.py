@@ -1,3 +1,1205 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Value
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .management.commands import check_query_plans, process_submissions
+from . import blobs, importers, item_analysis, serving, stats, submissions as submissions_module
+from .models import (
+    AppUser, Employee, Test, Question, Answer, ListVersion, MediaBlob, TestResult, TestResultResponse,
+    TestSession, TestStats, TestSubmission, UserStats,
+)
+from .exports import stream_csv, stream_xlsx
+from .fragments import fragment_cache
+from .middleware import resolve_current_user
+from .pagination import KeysetPaginator
+from .scoring import answer_key_cache, get_answer_key, grade_submission, load_answer_key
+from .timed_sessions import SessionClosed, apply_answer_diff, finalize_expired_sessions, start_session
+
+
+def create_test(questions=3, answers=3, passing_score=2):
+    """
+    Тест с вопросами, у каждого из которых первый ответ верный.
+    """
+    # После отката транзакции прошлого теста SQLite выдаёт те же id, и ключ ответов
+    # в кэше процесса (id теста и версия содержимого) оказался бы чужим
+    answer_key_cache.clear()
+    test = Test.objects.create(title='Python', passing_score=passing_score, description='', time_to_complete=30)
+    for number in range(questions):
+        question = Question.objects.create(test=test, question_text=f'Вопрос {number}')
+        for index in range(answers):
+            Answer.objects.create(question=question, answer_text=f'Ответ {number}.{index}', is_correct=index == 0)
+    return test
+
+
+def create_employee(role='employee', email='employee@example.com'):
+    return Employee.objects.create(
+        full_name='Сотрудник', email=email, age=40, role=role,
+        years_of_experience=5, position='HR', salary=Decimal('1000.00'),
+    )
+
+
+def login(client, principal):
+    session = client.session
+    session['user_id'] = principal.id
+    session['user_type'] = 'AppUser' if isinstance(principal, AppUser) else 'Employee'
+    session['user_role'] = 'user' if isinstance(principal, AppUser) else principal.role
+    session.save()
+
+
+class CurrentUserMiddlewareTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee()
+        login(self.client, self.employee)
+
+    def test_resolved_once_and_only_when_needed(self):
+        with mock.patch('app.middleware.resolve_current_user', wraps=resolve_current_user) as resolve:
+            # login_required, вьюха и context processor используют одно разрешение
+            self.assertEqual(self.client.get(reverse('test_list')).status_code, 200)
+            self.assertEqual(resolve.call_count, 1)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse('api_user_list')).status_code, 200)
+        self.assertEqual(resolve.call_count, 1)
+        self.assertFalse([query['sql'] for query in queries if '"Employee"' in query['sql']])
+
+
+class StartTestAccessTests(TestCase):
+    def setUp(self):
+        self.test = create_test()
+        self.url = reverse('start_test', args=[self.test.id])
+
+    def test_user_gets_session(self):
+        user = AppUser.objects.create(full_name='Иван', email='ivan@example.com', age=30)
+        login(self.client, user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(TestSession.objects.filter(user=user, test=self.test).exists())
+
+    def test_employee_and_admin_are_forbidden(self):
+        for role in ('employee', 'admin'):
+            with self.subTest(role=role):
+                login(self.client, create_employee(role, email=f'{role}@example.com'))
+                self.assertEqual(self.client.get(self.url).status_code, 403)
+                self.assertEqual(self.client.post(self.url, {'answers': []}).status_code, 403)
+        self.assertFalse(TestSession.objects.exists())
+
+
+class TestSessionTests(TestCase):
+    def setUp(self):
+        self.test = create_test()
+        self.user = AppUser.objects.create(full_name='Иван', email='ivan@example.com', age=30)
+        self.url = reverse('start_test', args=[self.test.id])
+        questions = self.test.questions.order_by('id')
+        self.correct = [question.answers.get(is_correct=True).id for question in questions]
+        self.wrong = [question.answers.filter(is_correct=False).first().id for question in questions]
+
+    def expire(self, session, seconds=3600):
+        TestSession.objects.filter(pk=session.pk).update(deadline=timezone.now() - datetime.timedelta(seconds=seconds))
+        session.refresh_from_db()
+
+    def test_apply_answer_diff(self):
+        session = start_session(self.user, self.test)
+        answer_key = get_answer_key(self.test)
+        apply_answer_diff(session, answer_key, [self.correct[1], self.correct[0], self.wrong[0]], [])
+        apply_answer_diff(session, answer_key, [self.correct[2]], [self.wrong[0], self.wrong[1]])
+        self.assertEqual(TestSession.objects.get(pk=session.pk).answers, sorted(self.correct))
+        self.assertIsNotNone(session.saved_at)
+
+        other_answer = create_test(questions=1).questions.get().answers.first()
+        with self.assertRaises(ValueError):
+            apply_answer_diff(session, answer_key, [other_answer.id], [])
+        self.expire(session)
+        with self.assertRaises(SessionClosed):
+            apply_answer_diff(session, answer_key, [self.wrong[2]], [])
+        self.assertEqual(TestSession.objects.get(pk=session.pk).answers, sorted(self.correct))
+
+    def test_expired_post_counts_autosaved_answers(self):
+        login(self.client, self.user)
+        self.client.get(self.url)
+        session = TestSession.objects.get(user=self.user, test=self.test)
+        response = self.client.post(
+            reverse('autosave_test_session', args=[session.id]),
+            json.dumps({'add': self.correct[:1]}), content_type='application/json',
+        )
+        self.assertEqual(response.json()['saved'], 1)
+        self.expire(session)
+
+        response = self.client.post(self.url, {'answers': self.correct})
+        self.assertRedirects(response, reverse('test_results'), fetch_redirect_response=False)
+        session.refresh_from_db()
+        self.assertIsNotNone(session.finished_at)
+        self.assertEqual(session.answers, self.correct[:1])
+        self.assertEqual((session.result.score_achieved, session.result.status), (1, 'failed'))
+
+    @override_settings(TEST_SUBMISSION_QUEUE=True)
+    def test_queued_submission_links_session_result(self):
+        login(self.client, self.user)
+        self.client.get(self.url)
+        self.client.post(self.url, {'answers': self.correct})
+        session = TestSession.objects.get(user=self.user, test=self.test)
+        self.assertIsNotNone(session.finished_at)
+        self.assertIsNone(session.result)
+
+        submissions_module.process_batch()
+        session.refresh_from_db()
+        self.assertEqual(session.result, TestSubmission.objects.get(session=session).result)
+        self.assertEqual(session.result.score_achieved, 3)
+
+    def test_finalize_expired_sessions(self):
+        other_user = AppUser.objects.create(full_name='Анна', email='anna@example.com', age=25)
+        TestResult.objects.create_attempt(
+            user=self.user, test=self.test, test_date=datetime.date.today(),
+            score_achieved=0, status='failed', approved=False,
+        )
+        expired = start_session(self.user, self.test)
+        apply_answer_diff(expired, get_answer_key(self.test), self.correct, [])
+        self.expire(expired)
+        other_expired = start_session(other_user, self.test)
+        self.expire(other_expired)
+        # Срок прошёл, но запас на задержки сети ещё не истёк
+        within_grace = start_session(other_user, create_test())
+        self.expire(within_grace, seconds=5)
+
+        self.assertEqual(finalize_expired_sessions(), 2)
+        self.assertEqual(finalize_expired_sessions(), 0)
+        expired.refresh_from_db()
+        other_expired.refresh_from_db()
+        within_grace.refresh_from_db()
+        self.assertEqual((expired.result.attempt_number, expired.result.score_achieved), (2, 3))
+        self.assertEqual((other_expired.result.attempt_number, other_expired.result.score_achieved), (1, 0))
+        self.assertEqual(expired.result.responses.filter(is_correct=True).count(), 3)
+        self.assertIsNone(within_grace.finished_at)
+        test_stats = TestStats.objects.get(test=self.test)
+        self.assertEqual((test_stats.attempts, test_stats.passed), (3, 1))
+        self.assertEqual(UserStats.objects.get(user=self.user).attempts, 2)
+
+
+class ScoringTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test = create_test(questions=4)
+        # Вопрос с двумя правильными ответами и вопрос без правильных
+        questions = list(cls.test.questions.order_by('id'))
+        Answer.objects.filter(pk=questions[1].answers.filter(is_correct=False).first().pk).update(is_correct=True)
+        questions[2].answers.update(is_correct=False)
+        cls.other_answer = create_test(questions=1).questions.get().answers.first()
+
+    def per_question_score(self, selected):
+        """
+        Эталон: по каждому вопросу сравнивается множество выбранных ответов с множеством правильных.
+        """
+        score = 0
+        for question in self.test.questions.all():
+            answers = question.answers.all()
+            correct = {answer.id for answer in answers if answer.is_correct}
+            chosen = {answer.id for answer in answers if answer.id in selected}
+            score += bool(correct) and chosen == correct
+        return score
+
+    def test_matches_per_question_loop(self):
+        answer_key = load_answer_key(self.test.id)
+        answer_ids = list(Answer.objects.filter(question__test=self.test).values_list('id', flat=True))
+        rng = random.Random(0)
+        for _ in range(200):
+            selected = rng.sample(answer_ids, rng.randint(0, len(answer_ids)))
+            graded = grade_submission(answer_key, [str(answer_id) for answer_id in selected])
+            self.assertTrue(graded.is_valid)
+            self.assertEqual(graded.score, self.per_question_score(set(selected)), selected)
+
+    def test_all_checkboxes_do_not_score(self):
+        answer_key = load_answer_key(self.test.id)
+        answer_ids = Answer.objects.filter(question__test=self.test).values_list('id', flat=True)
+        self.assertEqual(grade_submission(answer_key, [str(answer_id) for answer_id in answer_ids]).score, 0)
+
+    def test_invalid_and_repeated_values(self):
+        answer_key = load_answer_key(self.test.id)
+        first = self.test.questions.order_by('id')[0].answers.get(is_correct=True)
+        graded = grade_submission(answer_key, [str(first.id), str(first.id), 'abc', str(self.other_answer.id)])
+        self.assertEqual(graded.score, 1)
+        self.assertEqual(graded.selected_answers, {first.id})
+        self.assertEqual(graded.invalid_values, ('abc', str(self.other_answer.id)))
+        self.assertFalse(graded.is_valid)
+
+
+class ContentVersionTests(TestCase):
+    """
+    Сохранение объекта, загруженного до изменения вопросов и ответов, не возвращает версию назад.
+    """
+
+    def setUp(self):
+        self.test = create_test()
+        self.test.refresh_from_db()
+
+    def test_stale_test_save_keeps_version(self):
+        stale = Test.objects.get(pk=self.test.pk)
+        answer = Answer.objects.filter(question__test=self.test, is_correct=False).first()
+        answer.is_correct = True
+        answer.save()
+        bumped = Test.objects.get(pk=self.test.pk).content_version
+        self.assertGreater(bumped, stale.content_version)
+
+        employee = create_employee()
+        login(self.client, employee)
+        response = self.client.post(reverse('edit_test', args=[stale.pk]), {
+            'title': 'Новое название', 'passing_score': stale.passing_score,
+            'description': '', 'time_to_complete': stale.time_to_complete,
+        })
+        self.assertEqual(response.status_code, 302)
+        stale.title = 'Ещё название'
+        stale.save()
+
+        current = Test.objects.get(pk=self.test.pk)
+        self.assertEqual(current.title, 'Ещё название')
+        self.assertEqual(current.content_version, bumped)
+        self.assertIn(answer.id, get_answer_key(current).correct_answers[answer.question_id])
+
+    def test_save_after_delete_inserts_again(self):
+        stale = Test.objects.get(pk=self.test.pk)
+        Test.objects.filter(pk=stale.pk).delete()
+        stale.title = 'Восстановленный тест'
+        stale.save()
+        restored = Test.objects.get(pk=stale.pk)
+        self.assertEqual((restored.title, restored.content_version), ('Восстановленный тест', stale.content_version))
+        self.assertFalse(restored.questions.exists())
+
+    def test_question_save_reads_current_version(self):
+        question = self.test.questions.first()
+        question.question_text = 'Изменённый вопрос'
+        question.save()
+        Answer.objects.create(question=question, answer_text='Новый ответ')
+        stored = Question.objects.get(pk=question.pk).content_version
+        question.save()
+        self.assertEqual(question.content_version, stored + 1)
+        self.assertEqual(Question.objects.get(pk=question.pk).content_version, stored + 1)
+
+
+class AttemptNumberTests(TestCase):
+    def setUp(self):
+        self.test = create_test()
+        self.user = AppUser.objects.create(full_name='Иван', email='ivan@example.com', age=30)
+        self.other_user = AppUser.objects.create(full_name='Анна', email='anna@example.com', age=25)
+
+    def create_attempt(self, user):
+        return TestResult.objects.create_attempt(
+            user=user, test=self.test, test_date=datetime.date.today(),
+            score_achieved=0, status='failed', approved=False,
+        )
+
+    def test_numbers_are_sequential_per_user(self):
+        numbers = [self.create_attempt(self.user).attempt_number for _ in range(3)]
+        self.assertEqual(numbers, [1, 2, 3])
+        self.assertEqual(self.create_attempt(self.other_user).attempt_number, 1)
+
+    def test_retries_after_integrity_error(self):
+        self.create_attempt(self.user)
+        real_expression = TestResult.objects.next_attempt_expression
+        # Первая вставка получает уже занятый номер, как при одновременной отправке
+        side_effect = [Value(1), real_expression(self.user, self.test)]
+        with mock.patch.object(TestResult.objects, 'next_attempt_expression', side_effect=side_effect) as expression:
+            result = self.create_attempt(self.user)
+        self.assertEqual(expression.call_count, 2)
+        self.assertEqual(result.attempt_number, 2)
+        self.assertEqual(TestResult.objects.filter(user=self.user).count(), 2)
+
+    def test_gives_up_after_retries(self):
+        self.create_attempt(self.user)
+        with mock.patch.object(TestResult.objects, 'next_attempt_expression', return_value=Value(1)) as expression:
+            with self.assertRaises(IntegrityError):
+                self.create_attempt(self.user)
+        self.assertEqual(expression.call_count, TestResult.objects.attempt_retries)
+
+
+class SubmissionQueueTests(TestCase):
+    def setUp(self):
+        self.test = create_test()
+        self.user = AppUser.objects.create(full_name='Иван', email='ivan@example.com', age=30)
+
+    def correct_answers(self):
+        return [str(answer_id) for answer_id in Answer.objects.filter(
+            question__test=self.test, is_correct=True).values_list('id', flat=True)]
+
+    def create_attempt(self):
+        return TestResult.objects.create_attempt(
+            user=self.user, test=self.test, test_date=datetime.date.today(),
+            score_achieved=0, status='failed', approved=False,
+        )
+
+    def assertResponsesWritten(self, result, score):
+        responses = list(result.responses.order_by('question_id'))
+        self.assertEqual([response.question_id for response in responses],
+                         list(self.test.questions.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(sum(response.is_correct for response in responses), score)
+        self.assertEqual(result.score_achieved, score)
+
+    def test_results_get_sequential_attempts(self):
+        other_user = AppUser.objects.create(full_name='Анна', email='anna@example.com', age=25)
+        self.create_attempt()
+        queued = [
+            submissions_module.enqueue_submission(self.user, self.test, self.correct_answers()),
+            submissions_module.enqueue_submission(other_user, self.test, self.correct_answers()[:1]),
+            submissions_module.enqueue_submission(self.user, self.test, []),
+        ]
+        self.assertEqual(submissions_module.process_batch(), 3)
+
+        processed = list(TestSubmission.objects.select_related('result').order_by('id'))
+        self.assertEqual([submission.pk for submission in processed], [submission.pk for submission in queued])
+        self.assertTrue(all(submission.processed_at and not submission.error for submission in processed))
+        results = [submission.result for submission in processed]
+        self.assertEqual([(result.user_id, result.attempt_number) for result in results],
+                         [(self.user.id, 2), (other_user.id, 1), (self.user.id, 3)])
+        self.assertEqual([result.status for result in results], ['passed', 'failed', 'failed'])
+        for result, score in zip(results, (3, 1, 0)):
+            self.assertResponsesWritten(result, score)
+        # bulk_create не вызывает сигналы, статистика обновлена явно
+        self.assertEqual(TestStats.objects.get(test=self.test).attempts, 4)
+
+    def test_test_edited_after_submission(self):
+        submission = submissions_module.enqueue_submission(self.user, self.test, self.correct_answers())
+        # Ответ удалён, а вопрос изменён до того, как обработчик дошёл до отправки
+        removed = Answer.objects.get(pk=submission.answers[0])
+        removed.delete()
+        Answer.objects.filter(question_id=removed.question_id).update(is_correct=True)
+        submissions_module.process_batch()
+        submission.refresh_from_db()
+        self.assertIsNone(submission.error)
+        self.assertEqual(submission.result.attempt_number, 1)
+        self.assertResponsesWritten(submission.result, 2)
+
+    def test_invalid_submission_is_recorded(self):
+        submission = submissions_module.enqueue_submission(self.user, self.test, self.correct_answers())
+        self.test.delete()
+        submissions_module.process_batch()
+        submission.refresh_from_db()
+        self.assertEqual(submission.error, 'Тест удалён до проверки.')
+        self.assertFalse(TestResult.objects.exists())
+
+    def test_falls_back_when_attempt_is_taken(self):
+        submissions = [submissions_module.enqueue_submission(self.user, self.test, self.correct_answers())
+                       for _ in range(2)]
+        real_last_attempts = submissions_module.last_attempts
+        synchronous = []
+
+        def last_attempts(pending):
+            attempts = real_last_attempts(pending)
+            # Синхронная отправка занимает следующий номер между чтением номеров и bulk_create
+            synchronous.append(self.create_attempt())
+            return attempts
+
+        with mock.patch.object(submissions_module, 'last_attempts', side_effect=last_attempts):
+            self.assertEqual(submissions_module.process_batch(), 2)
+        self.assertEqual(synchronous[0].attempt_number, 1)
+        results = [TestSubmission.objects.get(pk=submission.pk).result for submission in submissions]
+        self.assertEqual([result.attempt_number for result in results], [2, 3])
+        for result in results:
+            self.assertResponsesWritten(result, 3)
+        self.assertEqual(TestResult.objects.filter(user=self.user).count(), 3)
+        # Статистика неудавшейся пачки откатилась, строки учтены сигналами create_attempt
+        self.assertEqual(TestStats.objects.get(test=self.test).attempts, 3)
+
+    def test_grading_error_is_recorded(self):
+        submissions = [submissions_module.enqueue_submission(self.user, self.test, self.correct_answers())
+                       for _ in range(2)]
+        real_build_result = submissions_module.build_result
+
+        def build_result(submission):
+            if submission.pk == submissions[0].pk:
+                raise ZeroDivisionError('деление на ноль')
+            return real_build_result(submission)
+
+        with mock.patch.object(submissions_module, 'build_result', side_effect=build_result), \
+                self.assertLogs('app.submissions', 'ERROR'):
+            self.assertEqual(submissions_module.process_batch(), 2)
+        self.assertEqual(submissions_module.process_batch(), 0)
+        failed, graded = TestSubmission.objects.order_by('id')
+        self.assertIn('деление на ноль', failed.error)
+        self.assertIsNone(failed.result)
+        self.assertEqual(graded.result.attempt_number, 1)
+
+    @mock.patch('app.management.commands.process_submissions.connection')
+    def test_worker_survives_batch_errors(self, connection):
+        class Stop(BaseException):
+            pass
+
+        # Ошибка пачки, затем две успешные пачки, затем пустая очередь
+        batches = mock.Mock(side_effect=[OperationalError('нет соединения'), 3, 0])
+        sleep = mock.Mock(side_effect=[None, Stop])
+        with mock.patch.object(process_submissions, 'process_batch', batches), \
+                mock.patch.object(process_submissions.time, 'sleep', sleep), \
+                self.assertLogs('app.submissions', 'ERROR'), self.assertRaises(Stop):
+            process_submissions.Command.work(10, once=False, interval=5, max_backoff=60)
+        self.assertEqual(batches.call_count, 3)
+        self.assertEqual(sleep.call_args_list, [mock.call(1.0), mock.call(5)])
+        connection.close.assert_called_once()
+
+        batches = mock.Mock(side_effect=OperationalError('нет соединения'))
+        with mock.patch.object(process_submissions, 'process_batch', batches), self.assertRaises(OperationalError):
+            process_submissions.Command.work(10, once=True, interval=5, max_backoff=60)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Много одинаковых имён: порядок внутри них задаёт только id
+        AppUser.objects.bulk_create(
+            AppUser(full_name=f'Имя {index % 4}', email=f'user{index}@example.com', age=20 + index % 7)
+            for index in range(23)
+        )
+
+    def walk(self, paginator):
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_round_trip_with_ties_and_descending_keys(self):
+        for ordering in (['full_name'], ['-full_name'], ['-age', 'full_name'], ['age', '-full_name']):
+            with self.subTest(ordering=ordering):
+                paginator = KeysetPaginator(AppUser.objects.all(), 5, ordering)
+                expected = list(AppUser.objects.order_by(*paginator.ordering).values_list('id', flat=True))
+                pages = self.walk(paginator)
+                self.assertEqual([user.id for page in pages for user in page], expected)
+                self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+                self.assertFalse(pages[0].has_previous())
+
+                # Назад по курсорам «предыдущая» — те же страницы в обратном порядке
+                page = pages[-1]
+                for previous in reversed(pages[:-1]):
+                    page = paginator.get_page(page.previous_cursor)
+                    self.assertEqual([user.id for user in page], [user.id for user in previous])
+                self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = KeysetPaginator(AppUser.objects.all(), 5, ['full_name'])
+        first = [user.id for user in paginator.get_page()]
+        for cursor in ('garbage', 'WyJuZXh0IiwgWzFdXQ', paginator.encode_cursor('next', AppUser.objects.first())[:-3]):
+            with self.subTest(cursor=cursor):
+                self.assertEqual([user.id for user in paginator.get_page(cursor)], first)
+
+    def test_count_is_computed_once(self):
+        paginator = KeysetPaginator(AppUser.objects.all(), 5, ['full_name'], count='exact')
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 23)
+            self.assertEqual(paginator.count, 23)
+
+
+class ListAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        AppUser.objects.bulk_create(
+            AppUser(full_name=f'Пользователь {index}', email=f'user{index}@example.com', age=30) for index in range(5)
+        )
+
+    def test_without_params_returns_plain_list(self):
+        response = self.client.get(reverse('api_user_list'))
+        self.assertEqual(response.status_code, 200)
+        users = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([user['ID'] for user in users], list(AppUser.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(users[0]['Full_Name'], 'Пользователь 0')
+
+    def test_page_size_returns_page(self):
+        response = self.client.get(reverse('api_user_list'), {'page_size': 2})
+        page = response.json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNone(page['previous'])
+        next_page = self.client.get(page['next']).json()
+        self.assertEqual(
+            [user['ID'] for user in page['results'] + next_page['results']],
+            list(AppUser.objects.order_by('id').values_list('id', flat=True)[:4]),
+        )
+
+
+class ListVersionTests(TestCase):
+    def setUp(self):
+        self.user = AppUser.objects.create(full_name='Иван', email='ivan@example.com', age=30)
+        self.url = reverse('api_user_list')
+
+    def etag(self):
+        return self.client.get(self.url, {'page_size': 10})['ETag']
+
+    def test_poll_is_answered_from_counter(self):
+        etag = self.etag()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'page_size': 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_change_etag(self):
+        etags = [self.etag()]
+        other = AppUser.objects.create(full_name='Анна', email='anna@example.com', age=25)
+        etags.append(self.etag())
+        self.user.age = 31
+        self.user.save()
+        etags.append(self.etag())
+        other.delete()
+        etags.append(self.etag())
+        self.assertEqual(len(set(etags)), len(etags))
+
+
+class StatsTests(TestCase):
+    """
+    Статистика, которую ведут сигналы приращениями, совпадает с полным пересчётом.
+    """
+
+    def setUp(self):
+        self.tests = [create_test(questions=1), create_test(questions=1)]
+        self.users = [
+            AppUser.objects.create(full_name=f'Пользователь {index}', email=f'user{index}@example.com', age=30)
+            for index in range(3)
+        ]
+
+    def add_result(self, user, test, score, approved=False):
+        return TestResult.objects.create_attempt(
+            user=user, test=test, test_date=datetime.date.today(), score_achieved=score,
+            status='passed' if score >= test.passing_score else 'failed', approved=approved,
+        )
+
+    @staticmethod
+    def snapshot():
+        tests = {
+            row['test_id']: row for row in
+            TestStats.objects.values('test_id', 'attempts', 'passed', 'approved', 'score_sum', 'histogram')
+        }
+        users = {
+            row['user_id']: row for row in
+            UserStats.objects.values('user_id', 'attempts', 'tests_taken', 'tests_passed', 'best_score', 'last_attempt')
+        }
+        return tests, users
+
+    def assertMatchesRebuild(self):
+        maintained = self.snapshot()
+        stats.rebuild_test_stats()
+        stats.refresh_user_stats(AppUser.objects.values_list('id', flat=True))
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_create_update_delete(self):
+        first, second = self.tests
+        results = [
+            self.add_result(self.users[0], first, 3),
+            self.add_result(self.users[0], first, 1),
+            self.add_result(self.users[1], first, 2, approved=True),
+            self.add_result(self.users[2], second, 0),
+        ]
+        self.assertMatchesRebuild()
+
+        results[1].score_achieved = 2
+        results[1].status = 'passed'
+        results[1].save()
+        # Перенос результата в другой тест и изменение без загруженных прежних значений
+        results[3].test = first
+        results[3].save()
+        stale = TestResult.objects.only('id', 'approved').get(pk=results[2].pk)
+        stale.approved = False
+        stale.save()
+        self.assertMatchesRebuild()
+
+        results[0].delete()
+        self.assertMatchesRebuild()
+
+    def test_bulk_delete_and_approve(self):
+        for index, user in enumerate(self.users):
+            for test in self.tests:
+                self.add_result(user, test, index)
+        stats.results_approved(TestResult.objects.filter(user=self.users[0]))
+        self.assertMatchesRebuild()
+
+        with transaction.atomic(), stats.batch():
+            TestResult.objects.filter(user=self.users[1]).delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(UserStats.objects.filter(user=self.users[1]).exists())
+
+    def test_decline_deletes_without_loading_rows(self):
+        first, second = self.tests
+        declined = [self.add_result(self.users[0], first, 1), self.add_result(self.users[1], second, 0)]
+        approved = self.add_result(self.users[0], first, 1, approved=True)
+        kept = self.add_result(self.users[2], first, 0)
+        for result in (*declined, approved, kept):
+            TestResultResponse.objects.create(result=result, question=result.test.questions.get(), is_correct=False)
+        session = start_session(self.users[1], second)
+        TestSession.objects.filter(pk=session.pk).update(result=declined[1], finished_at=timezone.now())
+
+        login(self.client, create_employee())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('bulk_review_test_results'), {
+                'action': 'decline', 'result_ids': [result.id for result in (*declined, approved)],
+            })
+        self.assertRedirects(response, reverse('pending_test_results'), fetch_redirect_response=False)
+        # Из результатов читаются только поля статистики, а не записи целиком, как в QuerySet.delete()
+        self.assertFalse([
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and '"Attempt Number"' in query['sql']
+        ])
+        self.assertEqual(set(TestResult.objects.values_list('id', flat=True)), {approved.id, kept.id})
+        self.assertEqual(set(TestResultResponse.objects.values_list('result_id', flat=True)), {approved.id, kept.id})
+        session.refresh_from_db()
+        self.assertIsNone(session.result)
+        self.assertMatchesRebuild()
+        self.assertFalse(UserStats.objects.filter(user=self.users[1]).exists())
+
+
+@skipUnless(item_analysis.np is not None, 'для анализа вопросов нужен numpy')
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ItemAnalysisTests(TestCase):
+    # Правильность ответов по вопросам; None — ответа на вопрос нет
+    rows = [
+        (1, 1, 1),
+        (1, 1, 0),
+        (1, 0, 0),
+        (0, 0, 0),
+        (1, 1, None),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.test = create_test(questions=3, answers=2)
+        self.user = AppUser.objects.create(full_name='Иван', email='ivan@example.com', age=30)
+        self.questions = list(self.test.questions.order_by('id'))
+        self.results = [self.add_result(row) for row in self.rows]
+
+    def add_result(self, row):
+        result = TestResult.objects.create_attempt(
+            user=self.user, test=self.test, test_date=datetime.date.today(),
+            score_achieved=sum(filter(None, row)), status='failed', approved=False,
+        )
+        for question, correct in zip(self.questions, row):
+            if correct is None:
+                continue
+            answers = list(question.answers.order_by('id'))
+            # Третий респондент пропустил последний вопрос: ответ неверный, вариантов не выбрано
+            skipped = result.attempt_number == 3 and question == self.questions[2]
+            selected = [] if skipped else [answers[0 if correct else 1].id]
+            TestResultResponse.objects.create(result=result, question=question, is_correct=bool(correct),
+                                              answer_ids=selected)
+        return result
+
+    def test_hand_computed_matrix(self):
+        matrix, selections, answer_key = item_analysis.load_response_matrix(self.test)
+        # Неполная пятая строка отброшена
+        self.assertEqual(matrix.tolist(), [list(row) for row in self.rows[:4]])
+        self.assertEqual(len(selections), 4)
+
+        analysis = item_analysis.analyze_matrix(matrix, selections, answer_key)
+        self.assertEqual(analysis.respondents, 4)
+        self.assertAlmostEqual(analysis.alpha, 0.75)
+        self.assertEqual([item.question_id for item in analysis.items], [question.id for question in self.questions])
+        self.assertEqual([item.difficulty for item in analysis.items], [0.75, 0.5, 0.25])
+        # 0.75 / sqrt(0.75 * 2.75) и 1 / sqrt(2)
+        for item, expected in zip(analysis.items, (0.522233, 0.707107, 0.522233)):
+            self.assertAlmostEqual(item.discrimination, expected, places=6)
+        rates = [
+            [item.selection_rates[answer.id] for answer in question.answers.order_by('id')]
+            for item, question in zip(analysis.items, self.questions)
+        ]
+        self.assertEqual(rates, [[0.75, 0.25], [0.5, 0.5], [0.25, 0.5]])
+        self.assertEqual(analysis.items[0].flags, [])
+        self.assertEqual(analysis.items[2].flags, [])
+
+    def test_cache_changes_when_result_replaced(self):
+        first = item_analysis.cached_analysis(self.test)
+        self.assertEqual(first.items[0].difficulty, 0.75)
+        # Число попыток то же, но набор ответов другой
+        self.results[3].delete()
+        self.add_result((1, 1, 1))
+        second = item_analysis.cached_analysis(self.test)
+        self.assertEqual(TestStats.objects.get(test=self.test).attempts, len(self.rows))
+        self.assertEqual(second.items[0].difficulty, 1.0)
+
+
+class ExportTests(TestCase):
+    columns = (('Имя', 'name'), ('Балл', 'score'), ('Дата', 'date'), ('Одобрен', 'approved'))
+    rows = [
+        ('=HYPERLINK("http://example.com")', 5, datetime.date(2024, 3, 1), True),
+        ('+7 999', -1, datetime.date(2024, 3, 2), False),
+        ('@SUM(A1)', 0, None, False),
+        ('Иван "Ваня"', 3, datetime.date(2024, 3, 3), True),
+    ]
+
+    def test_csv_escapes_formulas(self):
+        content = b''.join(stream_csv(iter(self.rows), self.columns, chunk_size=2)).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        parsed = list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual(parsed[0], ['Имя', 'Балл', 'Дата', 'Одобрен'])
+        self.assertEqual([row[0] for row in parsed[1:]], [
+            '\'=HYPERLINK("http://example.com")', "'+7 999", "'@SUM(A1)", 'Иван "Ваня"',
+        ])
+        # Числа не экранируются
+        self.assertEqual(parsed[2][1], '-1')
+
+    def read_xlsx(self, content):
+        namespace = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            sheets = sorted(name for name in archive.namelist() if name.startswith('xl/worksheets/'))
+            return [
+                [
+                    [''.join(cell.itertext()) for cell in row.findall('x:c', namespace)]
+                    for row in ElementTree.fromstring(archive.read(name)).find('x:sheetData', namespace)
+                ]
+                for name in sheets
+            ]
+
+    def test_xlsx_splits_sheets(self):
+        content = b''.join(stream_xlsx(iter(self.rows), self.columns, chunk_size=1, max_rows=3))
+        sheets = self.read_xlsx(content)
+        self.assertEqual(len(sheets), 2)
+        self.assertEqual([len(sheet) for sheet in sheets], [3, 3])
+        self.assertEqual(sheets[0][0], ['Имя', 'Балл', 'Дата', 'Одобрен'])
+        # Дата — число дней от эпохи Excel, в XLSX текст не экранируется: это не формула
+        self.assertEqual(sheets[0][1], ['=HYPERLINK("http://example.com")', '5', '45352', '1'])
+        self.assertEqual(sheets[1][2][0], 'Иван "Ваня"')
+
+    def test_empty_xlsx_has_header(self):
+        sheets = self.read_xlsx(b''.join(stream_xlsx(iter([]), self.columns)))
+        self.assertEqual(sheets, [[['Имя', 'Балл', 'Дата', 'Одобрен']]])
+
+    def test_export_view(self):
+        test = create_test(questions=1)
+        user = AppUser.objects.create(full_name='=cmd()', email='user@example.com', age=30)
+        TestResult.objects.create_attempt(
+            user=user, test=test, test_date=datetime.date.today(), score_achieved=1, status='failed', approved=False,
+        )
+        login(self.client, create_employee('admin'))
+        response = self.client.get(reverse('export_test_results'), {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        parsed = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(len(parsed), 2)
+        self.assertEqual(parsed[1][1], "'=cmd()")
+        self.assertEqual(self.client.get(reverse('export_test_results'), {'format': 'pdf'}).status_code, 400)
+
+
+def png(color, size=(40, 30)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile('image.png', buffer.getvalue(), content_type='image/png')
+
+
+class MediaReferenceTests(TestCase):
+    """
+    Счётчики ссылок MediaBlob совпадают с числом записей, ссылающихся на файл.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.test = create_test(questions=0)
+
+    def refcounts(self):
+        return dict(MediaBlob.objects.filter(refcount__gt=0).values_list('name', 'refcount'))
+
+    def assertMatchesTables(self):
+        self.assertEqual(self.refcounts(), dict(blobs.count_references()))
+
+    def test_same_content_is_stored_once(self):
+        questions = [
+            Question.objects.create(test=self.test, question_text=str(index), image=png('red')) for index in range(3)
+        ]
+        self.assertEqual(len({question.image.name for question in questions}), 1)
+        self.assertEqual(self.refcounts(), {questions[0].image.name: 3})
+        self.assertMatchesTables()
+
+    def test_change_and_delete_release_references(self):
+        question = Question.objects.create(test=self.test, question_text='Вопрос', image=png('red'))
+        answer = Answer.objects.create(question=question, answer_text='Ответ', image=png('red'))
+        red = question.image.name
+
+        question = Question.objects.get(pk=question.pk)
+        question.image = png('blue')
+        question.save()
+        blue = question.image.name
+        self.assertEqual(self.refcounts(), {red: 1, blue: 1})
+
+        answer.delete()
+        self.assertEqual(self.refcounts(), {blue: 1})
+        # Каскадное удаление вместе с тестом
+        self.test.delete()
+        self.assertEqual(self.refcounts(), {})
+        self.assertEqual(
+            dict(MediaBlob.objects.values_list('name', 'refcount')), {red: 0, blue: 0},
+        )
+        self.assertFalse(MediaBlob.objects.filter(released_at__isnull=True).exists())
+
+    def test_save_without_file_change_does_not_query_reference(self):
+        question = Question.objects.create(test=self.test, question_text='Вопрос', image=png('red'))
+        question = Question.objects.get(pk=question.pk)
+        question.question_text = 'Изменённый вопрос'
+        with CaptureQueriesContext(connection) as queries:
+            question.save()
+        selects = [query['sql'] for query in queries if query['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertFalse([sql for sql in selects if 'Image for the Question' in sql], selects)
+        question.question_text = 'Ещё раз'
+        question.image = None
+        question.save()
+        self.assertEqual(self.refcounts(), {})
+        self.assertMatchesTables()
+
+    def test_process_images_changes_employee_version(self):
+        employee = create_employee()
+        employee.photo = png('red')
+        employee.save()
+        stale = timezone.now() - datetime.timedelta(days=1)
+        Employee.objects.filter(pk=employee.pk).update(photo_width=None, photo_height=None, updated_at=stale)
+        version = ListVersion.objects.get(resource=Employee._meta.label).version
+
+        call_command('process_images', stdout=io.StringIO(), stderr=io.StringIO())
+        employee.refresh_from_db()
+        self.assertEqual((employee.photo_width, employee.photo_height), (40, 30))
+        self.assertGreater(employee.updated_at, stale)
+        self.assertEqual(ListVersion.objects.get(resource=Employee._meta.label).version, version + 1)
+        self.assertMatchesTables()
+
+
+class ImportPeopleTests(TestCase):
+    header = 'full_name,email,age\n'
+
+    def import_users(self, content, **kwargs):
+        return importers.import_people(AppUser, io.BytesIO(content.encode('utf-8')), **kwargs)
+
+    def test_detects_delimiter(self):
+        for content in ('\ufefffull_name;email;age\nИван;ivan@example.com;30\n',
+                        'full_name,email,age\r\n"Анна, старшая",anna@example.com,25\r\n'):
+            with self.subTest(content=content):
+                report = self.import_users(content)
+                self.assertEqual((report.created, report.errors), (1, []))
+        self.assertEqual(sorted(AppUser.objects.values_list('full_name', flat=True)), ['Анна, старшая', 'Иван'])
+
+    def test_duplicate_emails_are_checked_per_batch(self):
+        AppUser.objects.create(full_name='Иван', email='ivan@example.com', age=30)
+        rows = [f'Пользователь {index},user{index}@example.com,30' for index in range(4)]
+        rows[2:2] = ['Тёзка,user0@example.com,31', 'Иван,ivan@example.com,30']
+        content = self.header + '\n'.join(rows) + '\n'
+        version = ListVersion.objects.get(resource=AppUser._meta.label).version
+        # Пачки по 2 строки: 5 строк без повторов в файле — 3 запроса к базе
+        with mock.patch.object(importers, 'IMPORT_BATCH_SIZE', 2), self.assertNumQueries(3):
+            report = self.import_users(content, dry_run=True)
+        self.assertEqual(report.errors, [
+            (4, 'email: user0@example.com повторяется в файле.'),
+            (5, 'email: ivan@example.com уже зарегистрирован.'),
+        ])
+        self.assertEqual(report.created, 0)
+
+        report = self.import_users(content)
+        self.assertEqual((report.created, len(report.errors)), (0, 2))
+        self.assertEqual(AppUser.objects.count(), 1)
+
+        report = self.import_users(content, skip_invalid=True)
+        self.assertEqual((report.created, len(report.errors)), (4, 2))
+        self.assertEqual(AppUser.objects.count(), 5)
+        self.assertEqual(ListVersion.objects.get(resource=AppUser._meta.label).version, version + 1)
+
+    def test_invalid_rows(self):
+        content = (
+            'full_name,email,age,role,years_of_experience,position,salary\n'
+            'Сотрудник,staff@example.com,40,employee,5,HR,1000.50\n'
+            'Стажёр,intern@example.com,20,employee,25,HR,100\n'
+            'Без почты,,30,employee,1,HR,100\n'
+            'Директор,boss@example.com,50,king,10,CEO,100\n'
+        )
+        report = importers.import_people(Employee, io.BytesIO(content.encode()), skip_invalid=True)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, _ in report.errors], [3, 4, 5])
+        self.assertIn('years_of_experience', report.errors[0][1])
+        self.assertEqual(Employee.objects.get().salary, Decimal('1000.50'))
+
+        report = self.import_users('full_name,email\nИван,ivan@example.com\n')
+        self.assertEqual(report.errors, [(2, 'Нет колонок: age')])
+
+
+class ImportTestBankTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.media_root = media_root
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def image(self, color):
+        return {'name': 'image.png', 'data': base64.b64encode(png(color).read()).decode()}
+
+    def bank(self):
+        return [
+            {
+                'title': 'Python', 'passing_score': 1, 'time_to_complete': 10,
+                'questions': [{
+                    'text': 'Что выведет print(1)?', 'image': self.image('red'),
+                    'answers': [{'text': '1', 'correct': True, 'image': self.image('blue')}, {'text': '2'}],
+                }],
+            },
+            {
+                'title': 'SQL', 'passing_score': 0, 'time_to_complete': 5,
+                'questions': [{'text': 'SELECT 1?', 'answers': [{'text': '1', 'correct': True}]}],
+            },
+        ]
+
+    def import_bank(self, bank, **kwargs):
+        return importers.import_test_bank(io.BytesIO(json.dumps(bank).encode()), 'bank.json', **kwargs)
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def test_imports_whole_bank(self):
+        report = self.import_bank(self.bank(), dry_run=True)
+        self.assertEqual((report.created, report.errors), (0, []))
+        self.assertFalse(Test.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+        report = self.import_bank(self.bank())
+        self.assertEqual((report.created, report.errors), (2, []))
+        question = Question.objects.get(test__title='Python')
+        self.assertEqual((question.image_width, question.image_height), (40, 30))
+        self.assertEqual(question.answers.get(is_correct=True).image_width, 40)
+        self.assertEqual(Answer.objects.count(), 3)
+        self.assertEqual(dict(MediaBlob.objects.values_list('name', 'refcount')), dict(blobs.count_references()))
+
+    def test_any_error_rejects_bank(self):
+        bank = self.bank()
+        bank[1]['passing_score'] = 2
+        bank[1]['questions'][0]['answers'].append({'text': 'тоже 1', 'correct': True})
+        bank[0]['questions'][0]['answers'][1]['image'] = {'name': 'image.png', 'data': 'не base64'}
+        report = self.import_bank(bank)
+        self.assertEqual(report.created, 0)
+        self.assertEqual([location for location, _ in report.errors], [
+            'тест 1, вопрос 1, ответ 2', 'тест 2, вопрос 1', 'тест 2',
+        ])
+        self.assertFalse(Test.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_rollback_deletes_stored_images(self):
+        with mock.patch.object(Answer.objects, 'bulk_create', side_effect=IntegrityError('сбой')):
+            with self.assertRaises(IntegrityError):
+                self.import_bank(self.bank())
+        self.assertFalse(Test.objects.exists())
+        self.assertFalse(MediaBlob.objects.exists())
+        # Изображения и их варианты записаны до сбоя и удалены после отката
+        self.assertEqual(self.stored_files(), [])
+
+    def test_rollback_keeps_content_addressed_files(self):
+        with mock.patch.object(Answer.objects, 'bulk_create', side_effect=IntegrityError('сбой')):
+            with self.assertRaises(IntegrityError):
+                self.import_bank(self.bank())
+        self.assertFalse(Test.objects.exists())
+        # Файлы по хешу могут быть общими, их удалит collect_media
+        self.assertTrue(self.stored_files())
+        self.assertTrue(all(name.startswith('blobs') for name in self.stored_files()))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class NavbarFragmentTests(TestCase):
+    def setUp(self):
+        fragment_cache().clear()
+        self.addCleanup(fragment_cache().clear)
+
+    def test_cached_per_role_with_own_profile_link(self):
+        users = [
+            AppUser.objects.create(full_name=f'Пользователь {index}', email=f'user{index}@example.com', age=30)
+            for index in range(2)
+        ]
+        for user in users:
+            login(self.client, user)
+            html = self.client.get(reverse('index')).content.decode()
+            self.assertIn(reverse('user_detail', args=[user.id]), html)
+            self.assertIn('Мои результаты', html)
+        navbar_keys = [key for key in fragment_cache()._cache if ':navbar:' in key]
+        self.assertEqual(len(navbar_keys), 1)
+
+        admin = create_employee('admin', email='admin@example.com')
+        login(self.client, admin)
+        html = self.client.get(reverse('user_list')).content.decode()
+        self.assertIn(reverse('employee_detail', args=[admin.id]), html)
+        self.assertNotIn(reverse('user_detail', args=[users[1].id]), html)
+        self.assertInHTML(
+            '<li class="nav-item active"><a class="nav-link" href="%s">Пользователи</a></li>' % reverse('user_list'),
+            html,
+        )
+
+
+class FileServerTests(SimpleTestCase):
+    blob = 'blobs/ab/' + 'ab' * 32 + '.png'
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        files = {
+            'media/' + self.blob: b'blob',
+            'media/question_images/photo.png': b'photo',
+            'media/.secret': b'secret',
+            'media/question_images/.hidden.png': b'hidden',
+            'outside.txt': b'outside',
+            'static/app.css': b'body {}',
+            'static/app.css.br': b'br',
+            'static/app.css.gz': b'gzip',
+            'static/app.0123456789ab.css': b'body {}',
+            'static/staticfiles.json': json.dumps({'paths': {'app.css': 'app.0123456789ab.css'}}).encode(),
+        }
+        for name, content in files.items():
+            path = os.path.join(root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(content)
+        os.symlink(os.path.join(root, 'outside.txt'), os.path.join(root, 'media', 'link.txt'))
+        self.server = serving.FileServer(
+            static_root=os.path.join(root, 'static'), static_url='/static/',
+            media_root=os.path.join(root, 'media'), media_url='/media/',
+        )
+
+    def respond(self, path, **headers):
+        headers = {name.replace('_', '-'): value for name, value in headers.items()}
+        return self.server.respond(self.server.find(path), headers.get)
+
+    def test_rejects_paths_outside_media(self):
+        self.assertIsNotNone(self.server.find('/media/question_images/photo.png'))
+        for path in ('/media/../outside.txt', '/media/question_images/../../outside.txt', '/media/.secret',
+                     '/media/question_images/.hidden.png', '/media//etc/passwd', '/media/link.txt',
+                     '/media/question_images/', '/media/question_images\\photo.png', '/static/staticfiles.json.br'):
+            with self.subTest(path=path):
+                self.assertIsNone(self.server.find(path))
+
+    def test_cache_control(self):
+        expected = {
+            '/media/' + self.blob: serving.IMMUTABLE,
+            '/media/question_images/photo.png': serving.REVALIDATE,
+            '/static/app.0123456789ab.css': serving.IMMUTABLE,
+            '/static/app.css': serving.REVALIDATE,
+        }
+        for path, cache_control in expected.items():
+            with self.subTest(path=path):
+                self.assertEqual(dict(self.respond(path)[1])['Cache-Control'], cache_control)
+
+    def test_encoding_negotiation(self):
+        expected = {'gzip, deflate, br': 'br', 'gzip': 'gzip', 'br;q=0, gzip': 'gzip', 'identity': None, None: None}
+        for accept_encoding, encoding in expected.items():
+            with self.subTest(accept_encoding=accept_encoding):
+                status, headers, representation = self.respond('/static/app.css', accept_encoding=accept_encoding)
+                headers = dict(headers)
+                self.assertEqual(status, 200)
+                self.assertEqual(headers['Vary'], 'Accept-Encoding')
+                self.assertEqual(headers.get('Content-Encoding'), encoding)
+                self.assertEqual(representation.encoding, encoding)
+                self.assertEqual(headers['Content-Length'], str(representation.size))
+        # Сжатые копии есть только у статики
+        self.assertNotIn('Vary', dict(self.respond('/media/question_images/photo.png', accept_encoding='br')[1]))
+
+    def test_conditional_requests(self):
+        _, headers, _ = self.respond('/static/app.css', accept_encoding='br')
+        headers = dict(headers)
+        etag, last_modified = headers['ETag'], headers['Last-Modified']
+        not_modified = [
+            {'if_none_match': etag, 'accept_encoding': 'br'},
+            {'if_none_match': f'"other", W/{etag}', 'accept_encoding': 'br'},
+            {'if_none_match': '*'},
+            {'if_modified_since': last_modified},
+        ]
+        modified = [
+            # ETag сжатой копии не подходит к оригиналу
+            {'if_none_match': etag},
+            {'if_modified_since': 'Thu, 01 Jan 1970 00:00:00 GMT'},
+            {'if_modified_since': 'вчера'},
+            # If-None-Match важнее If-Modified-Since
+            {'if_none_match': '"other"', 'if_modified_since': last_modified},
+        ]
+        for headers in not_modified:
+            with self.subTest(headers=headers):
+                status, response_headers, representation = self.respond('/static/app.css', **headers)
+                self.assertEqual((status, representation), (304, None))
+                self.assertNotIn('Content-Length', dict(response_headers))
+        for headers in modified:
+            with self.subTest(headers=headers):
+                self.assertEqual(self.respond('/static/app.css', **headers)[0], 200)
+
+    def test_wsgi_and_asgi_bodies(self):
+        def application(environ, start_response):
+            start_response('404 Not Found', [])
+            return [b'django']
+
+        wsgi = serving.WSGIFileServer(application, self.server)
+        for method, body in (('GET', b'photo'), ('HEAD', b'')):
+            with self.subTest(method=method):
+                started = []
+                environ = {'REQUEST_METHOD': method, 'PATH_INFO': '/media/question_images/photo.png'}
+                response = wsgi(environ, lambda status, headers: started.append((status, dict(headers))))
+                self.assertEqual(b''.join(response), body)
+                if hasattr(response, 'close'):
+                    response.close()
+                self.assertEqual(started[0][0], '200 OK')
+                self.assertEqual(started[0][1]['Content-Length'], '5')
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/media/question_images/photo.png'}
+        self.assertEqual(wsgi(environ, lambda status, headers: None), [b'django'])
+
+        async def asgi_response(method, headers=()):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {'type': 'http', 'method': method, 'path': '/static/app.css', 'headers': list(headers)}
+            await serving.ASGIFileServer(None, self.server)(scope, None, send)
+            return messages
+
+        start, body = asyncio.run(asgi_response('HEAD', [(b'accept-encoding', b'gzip')]))
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-encoding', b'gzip'), start['headers'])
+        self.assertEqual(body['body'], b'')
+        start, body = asyncio.run(asgi_response('GET'))
+        self.assertEqual(body['body'], b'body {}')
+        etag = dict(start['headers'])[b'etag']
+        start, body = asyncio.run(asgi_response('GET', [(b'if-none-match', etag)]))
+        self.assertEqual((start['status'], body['body']), (304, b''))
+
+
+class QueryPlanTests(TestCase):
+    """
+    Запросы списков, поиска и очередей обслуживаются индексами (см. manage.py check_query_plans).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        check_query_plans.Command.seed(300)
+
+    def assertPlansUseIndexes(self, queries):
+        self.assertTrue(queries)
+        check_query_plans.disable_sequential_scans()
+        for name, index_names, queryset in queries:
+            with self.subTest(query=name):
+                plan = queryset.explain()
+                self.assertEqual(check_query_plans.plan_problems(plan, index_names), [], plan)
+
+    def test_list_and_approval_queries(self):
+        user_id = AppUser.objects.values_list('id', flat=True).first()
+        self.assertPlansUseIndexes(check_query_plans.hot_queries(user_id))
+
+    @skipUnless(connection.vendor == 'postgresql', 'триграммные GIN-индексы есть только в PostgreSQL')
+    def test_search_queries(self):
+        self.assertPlansUseIndexes(check_query_plans.search_queries())
@@ -0,0 +1,106 @@
+# app/timed_sessions.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import TestSession
+from .submissions import grade_result, save_results
+
+
+class SessionClosed(Exception):
+    """
+    Сессия уже завершена или время на прохождение истекло.
+    """
+
+
+def open_sessions(user, test):
+    return TestSession.objects.filter(user=user, test=test, finished_at__isnull=True)
+
+
+def start_session(user, test):
+    """
+    Возвращает незавершённую сессию пользователя по тесту или начинает новую.
+    Просроченная сессия сначала завершается с сохранёнными ответами.
+    """
+    session = open_sessions(user, test).first()
+    if session is not None and session.is_expired():
+        finalize_sessions(open_sessions(user, test).select_for_update(of=('self',)).select_related('test'))
+        session = None
+    if session is None:
+        started_at = timezone.now()
+        try:
+            with transaction.atomic():
+                session = TestSession.objects.create(
+                    user=user, test=test, started_at=started_at,
+                    deadline=started_at + timedelta(minutes=test.time_to_complete),
+                )
+        except IntegrityError:
+            # Сессию одновременно начал другой запрос (например, вторая вкладка)
+            session = open_sessions(user, test).get()
+    return session
+
+
+def apply_answer_diff(session, answer_key, added, removed):
+    """
+    Применяет изменения выбранных ответов к сессии и сохраняет только колонки ответов.
+    Вызывается внутри транзакции для сессии, заблокированной select_for_update.
+    """
+    if session.finished_at is not None or session.is_expired():
+        raise SessionClosed
+    unknown = [answer_id for answer_id in (*added, *removed) if answer_id not in answer_key.answer_questions]
+    if unknown:
+        raise ValueError(unknown)
+    answers = (set(session.answers) | set(added)) - set(removed)
+    session.answers = sorted(answers)
+    session.saved_at = timezone.now()
+    session.save(update_fields=['answers', 'saved_at'])
+    return session
+
+
+def close_session(session, answers, result=None):
+    """
+    Отмечает сессию завершённой с итоговыми ответами и (если уже есть) результатом.
+    Результат отправки из очереди в сессию записывает обработчик (TestSubmission.session).
+    """
+    session.answers = sorted(answers)
+    session.finished_at = timezone.now()
+    session.result = result
+    session.save(update_fields=['answers', 'finished_at', 'result'])
+
+
+def finalize_sessions(queryset):
+    """
+    Завершает сессии queryset (с select_related('test')) с сохранёнными ответами:
+    результаты пишутся одним bulk_create. Возвращает число завершённых сессий.
+    """
+    with transaction.atomic():
+        sessions = list(queryset)
+        if not sessions:
+            return 0
+        pending = []
+        for session in sessions:
+            result, _ = grade_result(session.user_id, session.test, session.answers, session.deadline.date())
+            pending.append((session, result))
+        finished_at = timezone.now()
+        for (session, _), result in zip(pending, save_results(pending)):
+            session.result = result
+            session.finished_at = finished_at
+        TestSession.objects.bulk_update(sessions, ['result', 'finished_at'])
+    return len(sessions)
+
+
+def finalize_expired_sessions(batch_size=200):
+    """
+    Завершает одну пачку просроченных сессий. На PostgreSQL сессии, которые в этот момент
+    завершает сам пользователь или другой обработчик, пропускаются (SKIP LOCKED).
+    """
+    grace = getattr(settings, 'TEST_SESSION_GRACE_SECONDS', 30)
+    expired = (
+        TestSession.objects.filter(finished_at__isnull=True, deadline__lt=timezone.now() - timedelta(seconds=grace))
+        .select_for_update(skip_locked=True, of=('self',))
+        .select_related('test')
+        .order_by('deadline')[:batch_size]
+    )
+    return finalize_sessions(expired)
@@ -5,6 +5,7 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('set_user/', views.set_user, name='set_user'),
+    path('set_user/autocomplete/', views.user_autocomplete, name='user_autocomplete'),
     path('users/', views.user_list, name='user_list'),
     path('users/<int:user_id>/', views.user_detail, name='user_detail'),
     path('users/delete/<int:user_id>/', views.delete_user, name='delete_user'),
@@ -16,18 +17,23 @@ urlpatterns = [
 
     path('users/add/', views.add_user, name='add_user'),
     path('employees/add/', views.add_employee, name='add_employee'),
+    path('admin1/import/', views.import_data, name='import_data'),
 
     path('tests/', views.test_list, name='test_list'),
     path('tests/start/<int:test_id>/', views.start_test, name='start_test'),
+    path('tests/session/<int:session_id>/autosave/', views.autosave_test_session, name='autosave_test_session'),
     path('tests/result/<int:result_id>/', views.test_result_detail, name='test_result_detail'),
     path('tests/results/', views.test_results, name='test_results'),
     path('tests/request_delete/<int:test_id>/', views.request_test_deletion, name='request_test_deletion'),
     path('tests/add/', views.add_test, name='add_test'),
     path('admin1/test_results/', views.admin_test_results, name='admin_test_results'),
+    path('admin1/test_results/export/', views.export_test_results, name='export_test_results'),
+    path('admin1/statistics/', views.statistics, name='statistics'),
     path('admin1/test_deletion_requests/', views.test_deletion_requests, name='test_deletion_requests'),
     path('admin1/approve_test_deletion/<int:request_id>/', views.approve_test_deletion, name='approve_test_deletion'),
 
     path('employee/pending_test_results/', views.pending_test_results, name='pending_test_results'),
+    path('employee/pending_test_results/bulk/', views.bulk_review_test_results, name='bulk_review_test_results'),
     path('employee/approve_test_result/<int:result_id>/', views.approve_test_result, name='approve_test_result'),
 
     # API
@@ -35,9 +41,12 @@ urlpatterns = [
     path('api/users/<int:user_id>/', views.UserDetailAPI.as_view(), name='api_user_detail'),
     path('api/employees/', views.EmployeeListAPI.as_view(), name='api_employee_list'),
     path('api/employees/<int:employee_id>/', views.EmployeeDetailAPI.as_view(), name='api_employee_detail'),
+    path('api/stats/tests/', views.TestStatsAPI.as_view(), name='api_test_stats'),
+    path('api/stats/users/<int:user_id>/', views.UserStatsAPI.as_view(), name='api_user_stats'),
 
     # Редактирование тестов (для employee/admin)
     path('tests/edit/<int:test_id>/', views.edit_test, name='edit_test'),
+    path('tests/edit/<int:test_id>/analysis/', views.item_analysis, name='item_analysis'),
     path('tests/<int:test_id>/add_question/', views.add_question, name='add_question'),
     path('question/edit/<int:question_id>/', views.edit_question, name='edit_question'),
     path('question/<int:question_id>/add_answer/', views.add_answer, name='add_answer'),
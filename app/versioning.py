@@ -0,0 +1,76 @@
+# app/versioning.py
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import ListVersion
+
+
+def bump_list_version(model):
+    """
+    Увеличивает версию списка записей модели. Вызывается сигналами и после массовых
+    операций (bulk_create, update), которые сигналы не отправляют.
+    """
+    resource = model._meta.label
+    now = timezone.now()
+    if not ListVersion.objects.filter(resource=resource).update(version=F('version') + 1, updated_at=now):
+        ListVersion.objects.get_or_create(resource=resource, defaults={'updated_at': now})
+
+
+class ResourceVersion:
+    """
+    Дешёвое определение версии ресурса для условных запросов (ETag / Last-Modified):
+    для записи — её updated_at, для списка — счётчик ListVersion (одно чтение по ключу,
+    без просмотра таблицы). Версия вычисляется один раз за запрос и используется обеими проверками.
+    """
+
+    def __init__(self, model, lookup_kwarg=None):
+        self.model = model
+        self.lookup_kwarg = lookup_kwarg
+
+    def get(self, request, *args, **kwargs):
+        cache_attr = f'_resource_version_{self.model.__name__}'
+        if not hasattr(request, cache_attr):
+            setattr(request, cache_attr, self.load(kwargs))
+        return getattr(request, cache_attr)
+
+    def load(self, kwargs):
+        if self.lookup_kwarg:
+            updated_at = self.model.objects.filter(pk=kwargs[self.lookup_kwarg]).values_list(
+                'updated_at', flat=True
+            ).first()
+            if updated_at is None:
+                return None
+            return f'{self.model.__name__}-{kwargs[self.lookup_kwarg]}-{updated_at.timestamp()}', updated_at
+        version = ListVersion.objects.filter(resource=self.model._meta.label).values_list(
+            'version', 'updated_at'
+        ).first()
+        if version is None:
+            return None
+        return f'{self.model._meta.label}-{version[0]}', version[1]
+
+    def etag(self, request, *args, **kwargs):
+        version = self.get(request, *args, **kwargs)
+        if version is None:
+            return None
+        tag = version[0]
+        if not self.lookup_kwarg:
+            # Разные страницы и форматы одного списка — разные представления
+            tag += '?' + request.META.get('QUERY_STRING', '') + '|' + request.META.get('HTTP_ACCEPT', '')
+        return hashlib.sha1(tag.encode()).hexdigest()
+
+    def last_modified(self, request, *args, **kwargs):
+        if not self.lookup_kwarg:
+            # ETag списка учитывает страницу и формат ответа, поэтому списки проверяются только по нему
+            return None
+        version = self.get(request, *args, **kwargs)
+        return version[1] if version is not None else None
+
+    def decorator(self):
+        """
+        Декоратор для метода get у APIView: отвечает 304, если у клиента актуальная версия.
+        """
+        return method_decorator(condition(etag_func=self.etag, last_modified_func=self.last_modified))
@@ -1,42 +1,66 @@
 # app/views.py
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import HttpResponse, HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.core.exceptions import ValidationError
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Sum
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
-from .models import AppUser, Employee, Question, Test, Answer, TestResult, TestDeletionRequest
+from .bundles import load_test_bundle, load_question_bundle, review_queryset
+from .middleware import resolve_current_user
+from .fragments import render_question_cards
+from .exports import EXPORT_FORMATS, export_rows
+from .importers import run_import
+from .item_analysis import ItemAnalysisUnavailable, cached_analysis
+from .pagination import KeysetPaginator
+from .scoring import get_answer_key, grade_submission
+from . import stats
+from .submissions import queue_enabled, enqueue_submission, build_responses
+from .timed_sessions import SessionClosed, open_sessions, start_session, apply_answer_diff, close_session
+from .sorting import USER_LIST_SORTS, EMPLOYEE_LIST_SORTS, TEST_LIST_SORTS, USER_RESULT_SORTS, ADMIN_RESULT_SORTS
+from .versioning import ResourceVersion
+from .search import search_users, search_employees, search_tests, search_results
+from .models import (
+    AppUser, Employee, Question, Test, Answer, TestResult, TestDeletionRequest, TestSession, TestStats, UserStats,
+    TestResultResponse,
+)
 from .forms import (
     AppUserForm, EmployeeForm, UserSelectionForm, EmployeeAdminForm, AppUserAdminForm,
-    TestDeletionRequestForm, AddTestForm, AnswerForm, QuestionForm
+    TestDeletionRequestForm, AddTestForm, AnswerForm, QuestionForm, ImportForm
 )
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import UserSerializer, EmployeeSerializer
+from rest_framework.settings import api_settings
+from .renderers import NDJSONRenderer
+from .serializers import (
+    UserSerializer, EmployeeSerializer, TestStatsSerializer, UserStatsSerializer, user_encoder, employee_encoder
+)
 
 
 def get_current_user(request):
-    user_id = request.session.get('user_id')
-    user_type = request.session.get('user_type')
-    if not user_id or not user_type:
-        return None, None
-    if user_type == 'AppUser':
-        try:
-            app_user = AppUser.objects.get(id=user_id)
-            return app_user, request.session.get('user_role', None)
-        except AppUser.DoesNotExist:
-            return None, None
-    else:
-        try:
-            employee = Employee.objects.get(id=user_id)
-            return employee, request.session.get('user_role', None)
-        except Employee.DoesNotExist:
-            return None, None
+    """
+    Возвращает (пользователь, роль) текущего запроса.
+    Результат определяется при первом вызове (см. CurrentUserMiddleware) и переиспользуется.
+    """
+    if not hasattr(request, 'current_identity'):
+        request.current_identity = resolve_current_user(request)
+    current_user, role_name = request.current_identity
+    return current_user, role_name
+
+
+def ranked(request, search_query, ordering):
+    """
+    Порядок сортировки списка: при поиске без явной сортировки сначала самые релевантные записи.
+    """
+    if search_query and 'sort' not in request.GET:
+        return ['-search_rank', *ordering]
+    return ordering
 
 
 def login_required(view_func):
@@ -62,37 +86,39 @@ def set_user(request):
     if request.method == 'POST':
         form = UserSelectionForm(request.POST)
         if form.is_valid():
-            selected = form.cleaned_data['user_or_employee']
-            try:
-                # Разделяем тип пользователя и его ID
-                user_type, user_id = selected.split('-')
-                user_id = int(user_id)
-
-                if user_type == 'AppUser':
-                    app_user = AppUser.objects.get(id=user_id)
-                    role = "user"
-                    request.session['user_id'] = app_user.id
-                    request.session['user_role'] = role
-                    request.session['user_type'] = 'AppUser'
-                    messages.success(request, f'Вы вошли как {app_user.full_name} ({role})')
-                    return redirect('index')
-                elif user_type == 'Employee':
-                    employee = Employee.objects.get(id=user_id)
-                    role = employee.role
-                    request.session['user_id'] = employee.id
-                    request.session['user_role'] = role
-                    request.session['user_type'] = 'Employee'
-                    messages.success(request, f'Вы вошли как {employee.full_name} ({role})')
-                    return redirect('index')
-                else:
-                    return HttpResponse('Некорректный тип пользователя.', status=400)
-            except (ValueError, AppUser.DoesNotExist, Employee.DoesNotExist):
-                return HttpResponse('Некорректный выбор пользователя или сотрудника.', status=400)
+            principal = form.principal
+            role = 'user' if form.user_type == 'AppUser' else principal.role
+            request.session['user_id'] = principal.id
+            request.session['user_role'] = role
+            request.session['user_type'] = form.user_type
+            messages.success(request, f'Вы вошли как {principal.full_name} ({role})')
+            return redirect('index')
     else:
         form = UserSelectionForm()
     return render(request, 'set_user.html', {'form': form})
 
 
+def user_autocomplete(request):
+    """
+    Варианты для формы входа: пользователи и сотрудники, чьё ФИО начинается с ?q=.
+    Поиск по префиксу обслуживается индексами по ФИО, выдача ограничена.
+    """
+    query = request.GET.get('q', '').strip()
+    limit = 20
+    matches = []
+    for user_type, (model, _) in UserSelectionForm.USER_TYPES.items():
+        rows = model.objects.all()
+        if query:
+            rows = rows.filter(full_name__istartswith=query)
+        rows = rows.order_by('full_name', 'id').values_list('full_name', 'id')[:limit]
+        matches.extend((full_name, user_type, user_id) for full_name, user_id in rows)
+    matches.sort()
+    return JsonResponse({'results': [
+        {'id': f'{user_type}-{user_id}', 'label': UserSelectionForm.choice_label(user_type, full_name)}
+        for full_name, user_type, user_id in matches[:limit]
+    ]})
+
+
 @login_required
 def user_list(request):
     app_user, role_name = get_current_user(request)
@@ -100,21 +126,16 @@ def user_list(request):
         return HttpResponse('У вас нет доступа к этой странице', status=403)
 
     search_query = request.GET.get('search', '').strip()
-    sort_by = request.GET.get('sort', 'id')
-    order = request.GET.get('order', 'asc')
 
-    user_list = AppUser.objects.filter(
-        Q(full_name__icontains=search_query) | Q(email__icontains=search_query)
-    )
-    if order == 'desc':
-        sort_by = '-' + sort_by
-    user_list = user_list.order_by(sort_by)
-
-    paginator = Paginator(user_list, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    user_list = search_users(AppUser.objects.all(), search_query)
+    sort_key, order, ordering = USER_LIST_SORTS.resolve(request)
+    paginator = KeysetPaginator(user_list, 10, ranked(request, search_query, ordering), count='approximate')
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     return render(request, 'user_list.html', {
         'page_obj': page_obj,
+        'sort': sort_key,
+        'order': order,
         'role': role_name
     })
 
@@ -139,6 +160,7 @@ def user_detail(request, user_id):
     return render(request, 'user_detail.html', {
         'form': form,
         'app_user': target_user,
+        'user_stats': UserStats.objects.filter(user=target_user).first(),
         'role': role_name
     })
 
@@ -150,22 +172,16 @@ def employee_list(request):
         return HttpResponse('У вас нет доступа к этой странице', status=403)
 
     search_query = request.GET.get('search', '').strip()
-    sort_by = request.GET.get('sort', 'id')
-    order = request.GET.get('order', 'asc')
-
-    if role_name == 'admin':
-        employee_list = Employee.objects.filter(
-            Q(full_name__icontains=search_query) | Q(email__icontains=search_query)
-        )
-    if order == 'desc':
-        sort_by = '-' + sort_by
-    employee_list = employee_list.order_by(sort_by)
 
-    paginator = Paginator(employee_list, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    employee_list = search_employees(Employee.objects.all(), search_query)
+    sort_key, order, ordering = EMPLOYEE_LIST_SORTS.resolve(request)
+    paginator = KeysetPaginator(employee_list, 10, ranked(request, search_query, ordering), count='approximate')
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     return render(request, 'employee_list.html', {
         'page_obj': page_obj,
+        'sort': sort_key,
+        'order': order,
         'role': role_name
     })
 
@@ -233,6 +249,34 @@ def add_employee(request):
     return render(request, 'add_employee.html', {'form': form, 'role': role_name})
 
 
+@login_required
+def import_data(request):
+    """
+    Массовый импорт: пользователи и сотрудники из CSV, тесты с вопросами и ответами из JSON/YAML.
+    """
+    app_user, role_name = get_current_user(request)
+    if role_name != 'admin':
+        return HttpResponse('У вас нет доступа к этой странице', status=403)
+
+    report = None
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            report = run_import(
+                form.cleaned_data['kind'], upload, upload.name,
+                skip_invalid=form.cleaned_data['skip_invalid'], dry_run=form.cleaned_data['dry_run'],
+            )
+            if report.created:
+                messages.success(request, f'Импортировано записей: {report.created}')
+            elif report.ok:
+                messages.info(request, 'Файл проверен, ошибок нет.')
+    else:
+        form = ImportForm()
+
+    return render(request, 'import_data.html', {'form': form, 'report': report, 'role': role_name})
+
+
 @login_required
 def delete_user(request, user_id):
     app_user, role_name = get_current_user(request)
@@ -292,22 +336,17 @@ def delete_fired_employee(request, employee_id):
 def test_list(request):
     app_user, role_name = get_current_user(request)
     search_query = request.GET.get('search', '').strip()
-    sort_by = request.GET.get('sort', 'title')
-    order = request.GET.get('order', 'asc')
-
-    test_list = Test.objects.filter(
-        Q(title__icontains=search_query) | Q(description__icontains=search_query)
-    )
 
-    if order == 'desc':
-        sort_by = '-' + sort_by
-    test_list = test_list.order_by(sort_by)
+    test_list = search_tests(Test.objects.all(), search_query)
 
-    paginator = Paginator(test_list, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    sort_key, order, ordering = TEST_LIST_SORTS.resolve(request)
+    paginator = KeysetPaginator(test_list, 10, ranked(request, search_query, ordering), count='approximate')
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     return render(request, 'test_list.html', {
         'page_obj': page_obj,
+        'sort': sort_key,
+        'order': order,
         'role': role_name
     })
 
@@ -316,42 +355,100 @@ def test_list(request):
 @login_required
 def start_test(request, test_id):
     app_user, role_name = get_current_user(request)
+    # Сессии и результаты тестов есть только у пользователей, не у сотрудников
+    if not isinstance(app_user, AppUser):
+        return HttpResponse('Проходить тесты могут только пользователи', status=403)
 
-
-    test = get_object_or_404(Test, id=test_id)
-    questions = test.questions.all()
-    print(questions)
     if request.method == 'POST':
-        selected_answers = request.POST.getlist('answers')
-        correct_answers = Answer.objects.filter(question__test=test, is_correct=True).values_list('id', flat=True)
-        score = sum(1 for ans_id in selected_answers if int(ans_id) in correct_answers)
-        status = 'passed' if score >= test.passing_score else 'failed'
-        attempt_number = app_user.test_results.filter(test=test).count() + 1
-
-        TestResult.objects.create(
-            user=app_user,
-            test=test,
-            test_date=timezone.now().date(),
-            score_achieved=score,
-            status=status,
-            attempt_number=attempt_number,
-            approved=False,
-        )
-
-        messages.success(request, 'Ваш результат отправлен на проверку.')
+        test = get_object_or_404(Test, id=test_id)
+        answer_key = get_answer_key(test)
+        with transaction.atomic():
+            session = open_sessions(app_user, test).select_for_update(of=('self',)).first()
+            if session is None:
+                messages.warning(request, 'Время на прохождение теста истекло или тест уже завершён.')
+                return redirect('test_results')
+            expired = session.is_expired()
+            if expired:
+                # После истечения времени засчитываются только автосохранённые ответы
+                submitted_values = [answer_id for answer_id in session.answers if answer_id in answer_key.answer_questions]
+            else:
+                submitted_values = request.POST.getlist('answers')
+            graded = grade_submission(answer_key, submitted_values)
+            if not graded.is_valid:
+                return HttpResponse('Некорректные ответы в отправленной форме.', status=400)
+            if queue_enabled():
+                # Результат сохранит обработчик очереди (manage.py process_submissions)
+                enqueue_submission(app_user, test, submitted_values, session)
+                result = None
+            else:
+                score = graded.score
+                result = TestResult.objects.create_attempt(
+                    user=app_user,
+                    test=test,
+                    test_date=timezone.now().date(),
+                    score_achieved=score,
+                    status='passed' if score >= test.passing_score else 'failed',
+                    approved=False,
+                )
+                TestResultResponse.objects.bulk_create(build_responses(result, answer_key, graded))
+            close_session(session, graded.selected_answers, result)
+
+        if expired:
+            messages.warning(request, 'Время на прохождение теста истекло, засчитаны сохранённые ответы.')
+        elif result is None:
+            messages.success(request, 'Ваши ответы приняты и будут проверены в ближайшее время.')
+        else:
+            messages.success(request, 'Ваш результат отправлен на проверку.')
         return redirect('test_results')
 
+    # Ответы загружаются только для вопросов, карточек которых нет в кэше
+    test = load_test_bundle(test_id, with_answers=False)
+    session = start_session(app_user, test)
     return render(request, 'start_test.html', {
         'test': test,
-        'questions': questions,
+        'question_cards': render_question_cards(test.questions.all()),
+        'session': session,
+        'remaining_seconds': session.remaining_seconds(),
     })
 
 
+@login_required
+@require_POST
+def autosave_test_session(request, session_id):
+    """
+    Автосохранение ответов: тело запроса {"add": [id, ...], "remove": [id, ...]}
+    содержит только изменения с прошлого сохранения.
+    """
+    app_user, role_name = get_current_user(request)
+    try:
+        payload = json.loads(request.body)
+        added = [int(value) for value in payload.get('add', [])]
+        removed = [int(value) for value in payload.get('remove', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Некорректные данные автосохранения.'}, status=400)
+
+    with transaction.atomic():
+        session = get_object_or_404(
+            TestSession.objects.select_for_update(of=('self',)).select_related('test'),
+            id=session_id, user=app_user if isinstance(app_user, AppUser) else None
+        )
+        try:
+            apply_answer_diff(session, get_answer_key(session.test), added, removed)
+        except SessionClosed:
+            return JsonResponse({'error': 'Время на прохождение теста истекло.'}, status=409)
+        except ValueError:
+            return JsonResponse({'error': 'Ответы не относятся к этому тесту.'}, status=400)
+    return JsonResponse({'saved': len(session.answers), 'remaining': session.remaining_seconds()})
+
+
 @login_required
 def test_result_detail(request, result_id):
     app_user, role_name = get_current_user(request)
     # Здесь предполагается, что user в TestResult - это AppUser
-    test_result = get_object_or_404(TestResult, id=result_id, user=app_user if isinstance(app_user, AppUser) else None)
+    test_result = get_object_or_404(
+        review_queryset(),
+        id=result_id, user=app_user if isinstance(app_user, AppUser) else None
+    )
     return render(request, 'test_result_detail.html', {'test_result': test_result})
 
 
@@ -364,22 +461,19 @@ def test_results(request):
         return HttpResponse('У вас нет пользовательских результатов тестов', status=403)
 
     search_query = request.GET.get('search', '').strip()
-    sort_by = request.GET.get('sort', 'test_date')
-    order = request.GET.get('order', 'desc')
 
-    test_results = app_user.test_results.filter(approved=True).select_related('test').filter(
-        Q(test__title__icontains=search_query)
+    test_results = search_results(
+        app_user.test_results.filter(approved=True).select_related('test'), search_query, by_user=False
     )
 
-    if order == 'desc':
-        sort_by = '-' + sort_by
-    test_results = test_results.order_by(sort_by)
-
-    paginator = Paginator(test_results, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    sort_key, order, ordering = USER_RESULT_SORTS.resolve(request)
+    paginator = KeysetPaginator(test_results, 10, ordering, count='approximate')
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     return render(request, 'test_results.html', {
         'page_obj': page_obj,
+        'sort': sort_key,
+        'order': order,
         'role': role_name
     })
 
@@ -415,7 +509,7 @@ def test_deletion_requests(request):
     if role_name != 'admin':
         return HttpResponse('У вас нет доступа к этой странице', status=403)
 
-    deletion_requests = TestDeletionRequest.objects.filter(approved__isnull=True).select_related('test', 'requested_by')
+    deletion_requests = TestDeletionRequest.objects.filter(approved__isnull=True).select_related('test', 'requested_by').order_by('requested_at', 'id')
     return render(request, 'test_deletion_requests.html', {
         'deletion_requests': deletion_requests,
         'role': role_name
@@ -456,19 +550,67 @@ def pending_test_results(request):
         return HttpResponse('У вас нет доступа к этой странице', status=403)
 
     test_results = TestResult.objects.filter(approved=False).select_related('test', 'user')
+    paginator = KeysetPaginator(test_results, 50, ['id'], count='approximate')
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    # Тесты, для которых можно одним действием одобрить все пройденные попытки
+    passed_by_test = (
+        TestResult.objects.filter(approved=False, status='passed', test__isnull=False)
+        .values('test_id', 'test__title').annotate(pending=Count('id')).order_by('test__title')
+    )
     return render(request, 'pending_test_results.html', {
-        'test_results': test_results,
+        'page_obj': page_obj,
+        'test_results': page_obj.object_list,
+        'passed_by_test': passed_by_test,
         'role': role_name
     })
 
 
+@login_required
+@require_POST
+def bulk_review_test_results(request):
+    """
+    Пакетная проверка результатов: одобрение выбранных результатов одним UPDATE,
+    удаление без загрузки записей (stats.results_deleted), либо одобрение всех пройденных попыток теста.
+    """
+    app_user, role_name = get_current_user(request)
+    if role_name != 'employee':
+        return HttpResponse('У вас нет доступа к этой странице', status=403)
+
+    action = request.POST.get('action')
+    pending = TestResult.objects.filter(approved=False)
+    if action == 'approve_passed':
+        test_id = request.POST.get('test_id', '')
+        if not test_id.isdigit():
+            return HttpResponse('Некорректный тест.', status=400)
+        approved = stats.results_approved(pending.filter(test_id=int(test_id), status='passed'))
+        messages.success(request, f'Одобрено пройденных результатов: {approved}.')
+        return redirect('pending_test_results')
+
+    result_ids = request.POST.getlist('result_ids')
+    if not all(result_id.isdigit() for result_id in result_ids):
+        return HttpResponse('Некорректный список результатов.', status=400)
+    selected = pending.filter(id__in=[int(result_id) for result_id in result_ids])
+    if not result_ids:
+        messages.warning(request, 'Не выбрано ни одного результата.')
+    elif action == 'approve':
+        approved = stats.results_approved(selected)
+        messages.success(request, f'Одобрено результатов: {approved}.')
+    elif action == 'decline':
+        declined = stats.results_deleted(selected)
+        messages.info(request, f'Отклонено и удалено результатов: {declined}.')
+    else:
+        return HttpResponse('Неизвестное действие.', status=400)
+    return redirect('pending_test_results')
+
+
 @login_required
 def approve_test_result(request, result_id):
     app_user, role_name = get_current_user(request)
     if role_name != 'employee':
         return HttpResponse('У вас нет доступа к этой странице', status=403)
 
-    test_result = get_object_or_404(TestResult, id=result_id)
+    test_result = get_object_or_404(review_queryset(), id=result_id)
     if request.method == 'POST':
         if 'approve' in request.POST:
             test_result.approved = True
@@ -485,6 +627,26 @@ def approve_test_result(request, result_id):
     })
 
 
+@login_required
+def statistics(request):
+    """
+    Сводная статистика по тестам: читает только таблицу TestStats (строка на тест).
+    """
+    app_user, role_name = get_current_user(request)
+    if role_name not in ['employee', 'admin']:
+        return HttpResponse('У вас нет доступа к этой странице', status=403)
+
+    paginator = KeysetPaginator(TestStats.objects.select_related('test'), 50, ['pk'])
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    totals = TestStats.objects.aggregate(attempts=Sum('attempts'), passed=Sum('passed'), approved=Sum('approved'))
+    return render(request, 'statistics.html', {
+        'page_obj': page_obj,
+        'totals': totals,
+        'users_with_results': UserStats.objects.count(),
+        'role': role_name
+    })
+
+
 @login_required
 def add_test(request):
     app_user, role_name = get_current_user(request)
@@ -510,32 +672,50 @@ def admin_test_results(request):
         return HttpResponse('У вас нет доступа', status=403)
 
     search_query = request.GET.get('search', '').strip()
-    sort_by = request.GET.get('sort', 'test_date')
-    order = request.GET.get('order', 'desc')
-
-    test_results = TestResult.objects.select_related('test', 'user').filter(
-        Q(test__title__icontains=search_query) | Q(user__full_name__icontains=search_query)
-    )
-    if order == 'desc':
-        sort_by = '-' + sort_by
-    test_results = test_results.order_by(sort_by)
 
-    paginator = Paginator(test_results, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    test_results = search_results(TestResult.objects.select_related('test', 'user'), search_query)
+    sort_key, order, ordering = ADMIN_RESULT_SORTS.resolve(request)
+    paginator = KeysetPaginator(test_results, 10, ordering, count='approximate')
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     return render(request, 'admin_test_results.html', {
         'page_obj': page_obj,
+        'sort': sort_key,
+        'order': order,
         'role': role_name
     })
 
 
+@login_required
+def export_test_results(request):
+    """
+    Полная выгрузка результатов (с тем же поиском, что и на странице) в CSV или XLSX.
+    Ответ формируется по мере чтения строк, поэтому память не зависит от их числа.
+    """
+    app_user, role_name = get_current_user(request)
+    if role_name != 'admin':
+        return HttpResponse('У вас нет доступа', status=403)
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse('Неизвестный формат выгрузки.', status=400)
+    search_query = request.GET.get('search', '').strip()
+    rows = export_rows(search_results(TestResult.objects.all(), search_query))
+
+    writer, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(writer(rows), content_type=content_type)
+    filename = f'test_results_{timezone.now():%Y%m%d_%H%M}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def edit_test(request, test_id):
     app_user, role_name = get_current_user(request)
     if role_name not in ['employee', 'admin']:
         return HttpResponse('Нет доступа', status=403)
 
-    test = get_object_or_404(Test, id=test_id)
+    test = load_test_bundle(test_id, with_answers=False)
 
     if request.method == 'POST':
         form = AddTestForm(request.POST, instance=test)
@@ -546,8 +726,36 @@ def edit_test(request, test_id):
     else:
         form = AddTestForm(instance=test)
 
-    questions = test.questions.all()
-    return render(request, 'edit_test.html', {'form': form, 'test': test, 'questions': questions})
+    return render(request, 'edit_test.html', {'form': form, 'test': test, 'questions': test.questions.all()})
+
+
+@login_required
+def item_analysis(request, test_id):
+    """
+    Отчёт по вопросам теста: трудность, различающая способность и выбор вариантов ответа.
+    """
+    app_user, role_name = get_current_user(request)
+    if role_name not in ['employee', 'admin']:
+        return HttpResponse('Нет доступа', status=403)
+
+    test = load_test_bundle(test_id)
+    try:
+        analysis = cached_analysis(test)
+    except ItemAnalysisUnavailable as error:
+        return render(request, 'item_analysis.html', {'test': test, 'error': str(error), 'role': role_name})
+
+    items = {item.question_id: item for item in analysis.items}
+    rows = []
+    for question in test.questions.all():
+        item = items.get(question.id)
+        rates = item.selection_rates if item else {}
+        rows.append((question, item, [(answer, rates.get(answer.id)) for answer in question.answers.all()]))
+    return render(request, 'item_analysis.html', {
+        'test': test,
+        'analysis': analysis,
+        'rows': rows,
+        'role': role_name
+    })
 
 
 @login_required
@@ -577,7 +785,7 @@ def edit_question(request, question_id):
     if role_name not in ['employee', 'admin']:
         return HttpResponse('Нет доступа', status=403)
 
-    question = get_object_or_404(Question, id=question_id)
+    question = load_question_bundle(question_id)
     if request.method == 'POST':
         form = QuestionForm(request.POST, request.FILES, instance=question)
         if form.is_valid():
@@ -630,14 +838,87 @@ def edit_answer(request, answer_id):
 
 
 # API Views
-class UserListAPI(APIView):
+class StreamingListAPI(APIView):
+    """
+    Список записей модели. Без параметров — весь список JSON-массивом, как раньше
+    (выдаётся потоком); с ?cursor= или ?page_size= — страница keyset-пагинации
+    {next, previous, results}; ?format=ndjson (или Accept: application/x-ndjson) — поток NDJSON.
+    Потоки читают таблицу через .values_list().iterator(), поэтому память не зависит от размера таблицы.
+    Записи кодируются ValuesEncoder-ом, минуя поля DRF-сериализатора.
+    """
+    pagination_params = ('cursor', 'page_size')
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+    model = None
+    encoder = None
+    page_size = 100
+    max_page_size = 1000
+    stream_chunk_size = 2000
+
+    def get(self, request):
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return self.stream(request)
+        if not any(param in request.query_params for param in self.pagination_params):
+            return self.full_list(request)
+
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            page_size = self.page_size
+        queryset = self.model.objects.values(*self.encoder.sources)
+        paginator = KeysetPaginator(queryset, max(page_size, 1), ['id'])
+        page = paginator.get_page(request.query_params.get('cursor'))
+        return Response({
+            'next': self.page_url(request, page.next_cursor),
+            'previous': self.page_url(request, page.previous_cursor),
+            'results': [self.encoder.encode_mapping(row) for row in page.object_list],
+        })
+
+    def encoded_rows(self):
+        rows = self.encoder.values_list(self.model.objects.order_by('id')).iterator(chunk_size=self.stream_chunk_size)
+        encode = self.encoder.encode
+        return (json.dumps(encode(row), ensure_ascii=False) for row in rows)
+
+    def stream(self, request):
+        lines = (line + '\n' for line in self.encoded_rows())
+        return StreamingHttpResponse(lines, content_type=f'{NDJSONRenderer.media_type}; charset=utf-8')
+
+    def full_list(self, request):
+        """
+        Прежний формат ответа — массив всех записей — для клиентов без пагинации.
+        """
+        if request.accepted_renderer.format != 'json':
+            # Браузерный API DRF отрисовывает готовый список
+            rows = self.encoder.values_list(self.model.objects.order_by('id'))
+            return Response([self.encoder.encode(row) for row in rows])
+
+        def array():
+            yield '['
+            for index, item in enumerate(self.encoded_rows()):
+                yield item if index == 0 else ',' + item
+            yield ']'
+
+        return StreamingHttpResponse(array(), content_type='application/json')
+
+    @staticmethod
+    def page_url(request, cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+class UserListAPI(StreamingListAPI):
+    model = AppUser
+    encoder = user_encoder
+
+    @ResourceVersion(AppUser).decorator()
     def get(self, request):
-        app_users = AppUser.objects.all()
-        serializer = UserSerializer(app_users, many=True)
-        return Response(serializer.data)
+        return super().get(request)
 
 
 class UserDetailAPI(APIView):
+    @ResourceVersion(AppUser, 'user_id').decorator()
     def get(self, request, user_id):
         try:
             app_user = AppUser.objects.get(id=user_id)
@@ -647,14 +928,17 @@ class UserDetailAPI(APIView):
             return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class EmployeeListAPI(APIView):
+class EmployeeListAPI(StreamingListAPI):
+    model = Employee
+    encoder = employee_encoder
+
+    @ResourceVersion(Employee).decorator()
     def get(self, request):
-        employees = Employee.objects.all()
-        serializer = EmployeeSerializer(employees, many=True)
-        return Response(serializer.data)
+        return super().get(request)
 
 
 class EmployeeDetailAPI(APIView):
+    @ResourceVersion(Employee, 'employee_id').decorator()
     def get(self, request, employee_id):
         try:
             employee = Employee.objects.get(id=employee_id)
@@ -662,3 +946,33 @@ class EmployeeDetailAPI(APIView):
             return Response(serializer.data)
         except Employee.DoesNotExist:
             return Response({'error': 'Сотрудник не найден'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class TestStatsAPI(APIView):
+    """
+    Статистика тестов постранично (?cursor=, ?page_size=), из сводной таблицы.
+    """
+    page_size = 100
+    max_page_size = 1000
+
+    def get(self, request):
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            page_size = self.page_size
+        paginator = KeysetPaginator(TestStats.objects.select_related('test'), max(page_size, 1), ['pk'])
+        page = paginator.get_page(request.query_params.get('cursor'))
+        return Response({
+            'next': StreamingListAPI.page_url(request, page.next_cursor),
+            'previous': StreamingListAPI.page_url(request, page.previous_cursor),
+            'results': TestStatsSerializer(page.object_list, many=True).data,
+        })
+
+
+class UserStatsAPI(APIView):
+    def get(self, request, user_id):
+        try:
+            user_stats = UserStats.objects.get(user_id=user_id)
+        except UserStats.DoesNotExist:
+            return Response({'error': 'Статистика пользователя не найдена'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UserStatsSerializer(user_stats).data)
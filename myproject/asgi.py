@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
-application = get_asgi_application()
+# Статика (после collectstatic) и загруженные файлы отдаются до Django, с долгим кэшированием
+from app.serving import ASGIFileServer  # noqa: E402
+
+application = ASGIFileServer(get_asgi_application())
@@ -52,22 +52,35 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.TemplateTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.CurrentUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'myproject.urls'
 
+# Профиль шаблонов: production — без отладочной информации шаблонов (подсветка строки ошибки),
+# development — с ней. Скомпилированные шаблоны кэшируются в обоих профилях (runserver сбрасывает
+# кэш при изменении файла шаблона), после изменения шаблонов процессы нужно перезапустить.
+TEMPLATE_PROFILE = os.getenv('TEMPLATE_PROFILE', 'development' if DEBUG else 'production')
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'debug': TEMPLATE_PROFILE != 'production',
+            'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -134,13 +147,66 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# Сюда collectstatic собирает статику с хешами в именах и сжатыми копиями (отдаёт app/serving.py)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'  # Перенаправление после успешного входа
 LOGOUT_REDIRECT_URL = '/login/'  # Перенаправление после выхода
 
+# Время (в секундах) хранения текущего пользователя в процессном кэше, 0 — без кэша
+CURRENT_USER_CACHE_TTL = int(os.getenv('CURRENT_USER_CACHE_TTL', '0'))
+
+# Кэш ключей ответов тестов: размер LRU в памяти процесса и (необязательно) алиас общего кэша из CACHES
+ANSWER_KEY_CACHE_SIZE = 256
+ANSWER_KEY_CACHE_ALIAS = os.getenv('ANSWER_KEY_CACHE_ALIAS') or None
+
+# Очередь отправок тестов: ответы сохраняются в TestSubmission, результаты пишет manage.py process_submissions
+TEST_SUBMISSION_QUEUE = os.getenv('TEST_SUBMISSION_QUEUE', '') == '1'
+
+# Запас времени (в секундах) после срока сдачи теста на задержки сети при отправке
+TEST_SESSION_GRACE_SECONDS = 30
+
+# Замер времени отрисовки шаблонов за запрос (лог app.template_timing и заголовок Server-Timing)
+# и число самых медленных шаблонов в отчёте
+TEMPLATE_TIMING = os.getenv('TEMPLATE_TIMING', '') == '1'
+TEMPLATE_TIMING_LIMIT = 10
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app.template_timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'app.submissions': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Кэш отрисованных фрагментов страниц (карточки вопросов, меню): алиас из CACHES и время хранения в секундах
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Время (в секундах) хранения отчёта анализа вопросов в кэше
+ITEM_ANALYSIS_CACHE_TIMEOUT = 3600
+
+# Обработка загруженных изображений (app/images.py): большая сторона оригинала,
+# ширины вариантов для srcset и качество сжатия JPEG/WebP
+IMAGE_MAX_SIZE = 2048
+IMAGE_VARIANT_WIDTHS = (320, 640, 1024)
+IMAGE_QUALITY = 82
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Загруженные файлы хранятся по хешу содержимого (app/storage.py), неиспользуемые удаляет manage.py collect_media
+STORAGES = {
+    'default': {'BACKEND': 'app.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'app.storage.CompressedManifestStaticFilesStorage'},
+}
+# Сколько (в часах) хранить файл после удаления последней ссылки на него
+MEDIA_GC_GRACE_HOURS = 24
 #AUTH_USER_MODEL = 'app.User'
 
 # Default primary key field type
@@ -13,4 +13,7 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
-application = get_wsgi_application()
+# Статика (после collectstatic) и загруженные файлы отдаются до Django, с долгим кэшированием
+from app.serving import WSGIFileServer  # noqa: E402
+
+application = WSGIFileServer(get_wsgi_application())